@@ -125,6 +125,9 @@ USE_TZ = True
 
 STATIC_URL = '/static/'
 
+# Uploaded files waiting for `run_import_worker`
+IMPORT_UPLOAD_DIR = BASE_DIR / 'data' / 'uploads'
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -1,7 +1,7 @@
 from django.contrib import admin
 from core.order_raw.models import OrderRaw, SupplierOrderRaw
 from core.supplier_order.models import SupplierOrder
-from core.client_order.models import ClientOrder
+#TMP from core.client_order.models import ClientOrder
 
 
 # admin.site.register(SupplierOrderRaw)
@@ -1,6 +1,12 @@
 from django.apps import AppConfig
+from django.db.models.signals import class_prepared, post_migrate
 
 
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
+
+    def ready(self):
+        from core.common.services.filters.plan import clear_field_plans
+        post_migrate.connect(clear_field_plans, dispatch_uid='core_clear_field_plans_migrate')
+        class_prepared.connect(clear_field_plans, dispatch_uid='core_clear_field_plans_prepared')
@@ -0,0 +1,36 @@
+from django.db import IntegrityError, transaction
+
+
+def bulk_create_isolating(model, objs, batch_size=None):
+    """
+    `bulk_create` the objects, and on an IntegrityError split them in two halves and
+    insert each one again, down to the rows in conflict : k bad rows among n cost
+    O(k log n) inserts instead of the whole batch. Each insert runs in its own
+    savepoint, so the good rows are kept.
+
+    Returns:
+        list of (obj, IntegrityError) : the objects not inserted, in their order.
+    """
+    rejected = []
+    fresh = {id(obj) for obj in objs if obj.pk is None}
+
+    def insert(chunk):
+        try:
+            with transaction.atomic():
+                model.objects.bulk_create(chunk, batch_size)
+        except IntegrityError as e:
+            # Insertion annulée : les pk reçues par une partie du batch ne valent plus
+            for obj in chunk:
+                if id(obj) in fresh:
+                    obj.pk = None
+                    obj._state.adding = True
+            if len(chunk) == 1:
+                rejected.append((chunk[0], e))
+                return
+            middle = len(chunk) // 2
+            insert(chunk[:middle])
+            insert(chunk[middle:])
+
+    if objs:
+        insert(list(objs))
+    return rejected
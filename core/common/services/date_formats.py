@@ -0,0 +1,51 @@
+from core.common.tools.parse import convert_dates, infer_date_format
+from core.common.tools.row import resolve_columns
+
+# Rows read per sheet to infer (and pre-convert) the dates of a column
+DATE_SAMPLE_SIZE = 2000
+
+
+def _sheet_columns(queryset, header_id):
+    raw = queryset.first()
+    if raw is None:
+        return []
+    if header_id is not None:
+        return list(raw.header.columns)
+    return list(raw.payload)
+
+
+def infer_sheet_date_formats(queryset, field_mapping, date_fields, sample_size=DATE_SAMPLE_SIZE):
+    """
+    Infer once per sheet column the format of the dates of a raw queryset, from the
+    values of its first rows (only the JSON column is read, not the raw objects).
+
+    Returns:
+        dict (source_file, sheet_name) -> {field: (fmt, ambiguous, converted)}
+        where `converted` maps the sampled values to their datetime (see `convert_dates`).
+    """
+    samples = {}
+    groups = queryset.order_by().values_list('source_file', 'sheet_name', 'header_id').distinct()
+    for source_file, sheet_name, header_id in groups:
+        sheet_qs = queryset.filter(source_file=source_file, sheet_name=sheet_name, header_id=header_id)
+        columns = _sheet_columns(sheet_qs, header_id)
+        resolved, _ = resolve_columns(columns, date_fields, field_mapping)
+        if not resolved:
+            continue
+        # Clé JSON de chaque colonne : position dans `cells` ou nom dans `data`
+        json_field = 'cells' if header_id is not None else 'data'
+        keys = [
+            (field, str(columns.index(column)) if header_id is not None else column)
+            for field, column in resolved
+        ]
+        rows = sheet_qs.order_by('row_index').values_list(json_field, flat=True)[:sample_size]
+        sheet_samples = samples.setdefault((source_file, sheet_name), {})
+        for row in rows:
+            for field, key in keys:
+                sheet_samples.setdefault(field, set()).add((row or {}).get(key))
+
+    formats = {}
+    for key, fields in samples.items():
+        for field, values in fields.items():
+            fmt, ambiguous = infer_date_format(values)
+            formats.setdefault(key, {})[field] = (fmt, ambiguous, convert_dates(values, fmt))
+    return formats
@@ -45,3 +45,24 @@ class BaseTransformFilter(ABC):
     @abstractmethod
     def apply(self, ctx: FilterContext) -> bool:
         pass
+
+    def apply_frame(self, frame):
+        """
+        Column-wise version of `apply` on a `FrameContext`.
+        By default `apply` is run row by row on the valid rows.
+        """
+        columns = set(frame.attrs.columns)
+        for i in frame.alive():
+            ctx = FilterContext(frame.raws[i], frame.model_class)
+            ctx.attrs.update(frame.attrs.iloc[i].to_dict())
+            try:
+                ok = self.apply(ctx)
+            except Exception as e:
+                frame.fail(i, str(e), **(ctx.failure or {}))
+                continue
+            if not ok:
+                frame.reject(i, ctx.error, self, **(ctx.failure or {}))
+                continue
+            for name, value in ctx.attrs.items():
+                if name in columns:
+                    frame.attrs.at[i, name] = value
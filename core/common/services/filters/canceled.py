@@ -3,20 +3,63 @@ import pandas as pd
 from django.db.models import Field
 from core.common.services.filters.base import BaseTransformFilter
 
+CANCELED_WORDS = {'canceled', 'cancel', 'cancelled'}
+
+
+def canceled_word(val):
+    """The 'canceled' key word of a cell, None if the cell does not cancel the row."""
+    if val == "" or not isinstance(val, str):
+        return None
+    val = val.lower()
+    val = re.sub('[^a-z]',"", val)
+    return val if val in CANCELED_WORDS else None
+
+
+def find_canceled(payload):
+    """First (column, word) of a row that cancels it, or None."""
+    for key, val in payload.items():
+        word = canceled_word(val)
+        if word is not None:
+            return key, word
+    return None
+
+
 class CanceledFieldFilter(BaseTransformFilter):
     """ Filter row that contains a 'canceled' key word in it.
     """
     stage = BaseTransformFilter.FilterLevel.SECOND_STAGE
+
+    def _canceled_word(self, val):
+        return canceled_word(val)
     
     def apply(self, ctx):                
-        for key,val in ctx.raw.data.items():
-            if val == "":
-                continue
-            val = val.lower()
-            val = re.sub('[^a-z]',"", val)
-            if val in {'canceled', 'cancel', 'cancelled'}:
-                ctx.error = f"Row canceled in {key} : {val}"
-                return False
+        found = find_canceled(ctx.raw.payload)
+        if found is not None:
+            ctx.error = f"Row canceled in {found[0]} : {found[1]}"
+            ctx.failure = {'field': found[0], 'value': ctx.raw.payload[found[0]]}
+            return False
         return True
+
+    def apply_frame(self, frame):
+        groups = frame.groups(lambda raw, payload: raw.header_id or tuple(payload))
+        for rows in groups.values():
+            columns = list(frame.payloads[rows[0]])
+            cells = pd.DataFrame([list(frame.payloads[i].values()) for i in rows], index=rows, columns=range(len(columns)))
+            # Le mot n'est cherché qu'une fois par valeur distincte
+            hits = {
+                value: word
+                for value in pd.unique(cells.to_numpy().ravel())
+                if isinstance(value, str) and (word := self._canceled_word(value)) is not None
+            }
+            if not hits:
+                continue
+            found = cells.isin(list(hits))
+            for i in found.index[found.any(axis=1)]:
+                position = int(found.loc[i].to_numpy().argmax())
+                value = cells.at[i, position]
+                frame.reject(
+                    i, f"Row canceled in {columns[position]} : {hits[value]}", self,
+                    field=columns[position], value=value,
+                )
+    
     
-    
\ No newline at end of file
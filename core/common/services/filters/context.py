@@ -1,18 +1,18 @@
-from django.db.models import Field
+from core.common.services.filters.plan import get_field_plan
 
 
 class FilterContext:
+    __slots__ = ('raw', 'order', 'error', 'failure', 'plan', '_attrs')
+
     def __init__(self, raw, model_class):
         self.raw = raw
         self.order = None
         self.error = None
-        self._model_class = model_class
-        fields = [
-            f.name
-            for f in model_class._meta.get_fields()
-            if isinstance(f, Field) and f.concrete and not f.auto_created
-        ]        
-        self._attrs = {f: None for f in fields}
+        # {'filter', 'field', 'value'} of the error, see `errors.failure_details`
+        self.failure = None
+        # Les champs du modèle sont calculés une seule fois par modèle
+        self.plan = get_field_plan(model_class)
+        self._attrs = self.plan.new_attrs()
 
     @property
     def attrs(self):
@@ -20,11 +20,10 @@ class FilterContext:
     
     @property
     def model_class(self):
-        return self._model_class
+        return self.plan.model
     
     
     def instantiate_order(self):
         self._attrs['raw'] = self.raw
         self.order = self.model_class(**self.attrs)
 
-
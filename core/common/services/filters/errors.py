@@ -0,0 +1,47 @@
+from core.order_raw.models import RawStatus
+
+# Start of the messages of the filters / transformer -> stable error code
+ERROR_CODES = (
+    ("Not a purchase", "not_purchase"),
+    ("Row canceled", "canceled"),
+    ("Row is empty", "empty"),
+    ("Required field missing", "required"),
+    ("Duplicated row", "duplicate"),
+    ("Insert conflict", "conflict"),
+)
+
+# Rows that will never give an order : skipped, not failed
+SKIP_CODES = {"not_purchase", "canceled", "empty"}
+
+
+def error_code(message: str) -> str:
+    """Stable code of a transform error message, stored on the raw (`error_code`)."""
+    for prefix, code in ERROR_CODES:
+        if message.startswith(prefix):
+            return code
+    if "already exists" in message:
+        return "duplicate"
+    if message.startswith("{"):
+        # ValidationError de full_clean() / clean_fields() : {'field': [...]}
+        return "validation"
+    return "parse"
+
+
+def error_status(code: str) -> str:
+    return RawStatus.SKIPPED if code in SKIP_CODES else RawStatus.FAILED
+
+
+def failure_details(exc, ctx, filt=None) -> dict:
+    """
+    Filter, field and value of the error of a row : the filters give the field and the
+    value (`ctx.failure`), a ValidationError gives its first field.
+    """
+    details = {'filter': type(filt).__name__ if filt is not None else 'validation', 'field': None, 'value': None}
+    details.update(ctx.failure or {})
+    error_dict = getattr(exc, 'error_dict', None)
+    if details['field'] is None and error_dict:
+        field = next((name for name in error_dict if name != '__all__'), None)
+        if field is not None:
+            details['field'] = field
+            details['value'] = ctx.attrs.get(field)
+    return details
@@ -0,0 +1,117 @@
+import pandas as pd
+
+from core.common.services.filters.context import FilterContext
+from core.common.services.filters.errors import failure_details
+from core.common.services.filters.plan import get_field_plan
+
+
+class FrameContext:
+    """
+    Column-wise counterpart of `FilterContext` : a chunk of raws transformed together.
+
+    `attrs` is a DataFrame (one row per raw, one object column per model field) and
+    `errors` holds the error of each row, None while the row is still valid, and
+    `failures` its details (see `FilterContext.failure`). The filters only work on
+    the valid rows (`alive`).
+    """
+    def __init__(self, raws, model_class):
+        self.raws = list(raws)
+        self.plan = get_field_plan(model_class)
+        self.payloads = [raw.payload for raw in self.raws]
+        n = len(self.raws)
+        self.attrs = pd.DataFrame(
+            {name: pd.Series([None] * n, dtype=object) for name in self.plan.field_names}
+        )
+        self.errors = [None] * n
+        self.failures = [None] * n
+        # Filter running, for the details of the rows it fails
+        self.filter = None
+
+    @property
+    def model_class(self):
+        return self.plan.model
+
+    def alive(self, rows=None):
+        rows = range(len(self.raws)) if rows is None else rows
+        return [i for i in rows if self.errors[i] is None]
+
+    def groups(self, key):
+        """Valid rows grouped by `key(raw, payload)`, in the order of the rows."""
+        groups = {}
+        for i in self.alive():
+            groups.setdefault(key(self.raws[i], self.payloads[i]), []).append(i)
+        return groups
+
+    def column(self, rows, column) -> list:
+        return [self.payloads[i].get(column) for i in rows]
+
+    def reject(self, row, message, filt, field=None, value=None):
+        """Row refused by a filter (same message as `transform_one`)."""
+        self.errors[row] = f"{message} from {filt}"
+        self.failures[row] = {'filter': type(filt).__name__, 'field': field, 'value': value}
+
+    def fail(self, row, message, field=None, value=None):
+        """Row whose filter raised an exception."""
+        self.errors[row] = message
+        name = type(self.filter).__name__ if self.filter is not None else None
+        self.failures[row] = {'filter': name, 'field': field, 'value': value}
+
+
+def map_unique(values, func):
+    """
+    Apply `func` once per distinct value (typed : 1, 1.0 and True are not merged).
+
+    Returns:
+        list of (result, error) in the order of `values`, `error` being the message
+        of the exception raised by `func` (or None).
+    """
+    done = {}
+    out = []
+    for value in values:
+        key = (type(value), value)
+        try:
+            result = done.get(key)
+        except TypeError:
+            # Valeur non hashable : pas de cache
+            key, result = None, None
+        if result is None:
+            try:
+                result = (func(value), None)
+            except Exception as e:
+                result = (None, str(e))
+            if key is not None:
+                done[key] = result
+        out.append(result)
+    return out
+
+
+def run_frame(filters, raws, model_class, exclude=('raw',)):
+    """
+    Run the filters column-wise on a chunk of raws, then build the orders of the rows
+    still valid. Gives the same contexts (order / error) as `transform_one` row by row,
+    without the uniqueness check (see `SupplierOrderTransformer._validate_batch`).
+
+    Returns:
+        list of FilterContext, in the order of `raws`.
+    """
+    frame = FrameContext(raws, model_class)
+    for filt in filters:
+        frame.filter = filt
+        filt.apply_frame(frame)
+
+    records = frame.attrs.to_dict('records')
+    contexts = []
+    for i, raw in enumerate(frame.raws):
+        ctx = FilterContext(raw, model_class)
+        ctx.error = frame.errors[i]
+        ctx.failure = frame.failures[i]
+        if ctx.error is None:
+            ctx.attrs.update(records[i])
+            try:
+                ctx.instantiate_order()
+                ctx.order.clean_fields(exclude=list(exclude))
+            except Exception as e:
+                ctx.error = str(e)
+                ctx.failure = failure_details(e, ctx)
+        contexts.append(ctx)
+    return contexts
@@ -1,19 +1,90 @@
+import pandas as pd
+
 from core.common.services.filters.base import BaseTransformFilter
 
-from core.common.tools.row import get_value_mapped
+from core.common.tools.row import resolve_columns
 
 class FieldMappingFilter(BaseTransformFilter):
+    """
+    Fill `ctx.attrs` from the raw columns, using the aliases of `field_mapping`.
+
+    The alias -> column resolution is done once per header (all the rows of a sheet
+    share it) and cached, each row is then mapped with direct key lookups.
+    The mapped fields without any column are kept per file and sheet in `missing_columns`
+    (file -> sheet -> fields), the union of the headers of the sheet.
+    """
     stage = BaseTransformFilter.FilterLevel.FIRST_STAGE
 
     def __init__(self, field_mapping):
         self.field_mapping = field_mapping
+        self._resolved = {}
+        self.missing_columns = {}
+        # (source_file, sheet_name, header) already added to `missing_columns`
+        self._noted = set()
+
+    def reset_missing(self):
+        self.missing_columns = {}
+        self._noted.clear()
+
+    def merge_missing(self, missing_columns):
+        """Add the `missing_columns` of another run of the filter (e.g. a worker)."""
+        for source_file, sheets in missing_columns.items():
+            for sheet_name, fields in sheets.items():
+                self._add_missing(source_file, sheet_name, fields)
+
+    def _add_missing(self, source_file, sheet_name, fields):
+        known = self.missing_columns.setdefault(source_file, {}).setdefault(sheet_name, [])
+        known.extend(field for field in fields if field not in known)
+
+    def _note_missing(self, raw, signature, missing):
+        # Une fois par en-tête de chaque feuille : les lignes suivantes ne coûtent qu'un lookup
+        key = (raw.source_file, raw.sheet_name, signature)
+        if key not in self._noted:
+            self._noted.add(key)
+            self._add_missing(raw.source_file, raw.sheet_name, missing)
+
+    def _signature(self, raw, payload):
+        # Compact raws share their header row, dict raws are keyed on their columns
+        if raw.header_id is not None:
+            return raw.header_id
+        return tuple(payload)
 
     def apply(self, ctx):
-        for field in ctx.attrs.keys():
-            ctx.attrs[field] = get_value_mapped(ctx.raw.data, field, self.field_mapping) 
-                    
+        raw = ctx.raw
+        payload = raw.payload
+        signature = self._signature(raw, payload)
+        plan = self._resolved.get(signature)
+        if plan is None:
+            plan = self._resolved[signature] = resolve_columns(payload, ctx.attrs, self.field_mapping)
+        resolved, missing = plan
+        self._note_missing(raw, signature, missing)
+
+        attrs = ctx.attrs
+        for field, column in resolved:
+            value = payload[column]
+            # NaN venant de pandas (float('nan') != float('nan'))
+            attrs[field] = None if type(value) is float and value != value else value
         return True
 
+    def apply_frame(self, frame):
+        plans = {}
+        for i in frame.alive():
+            raw, payload = frame.raws[i], frame.payloads[i]
+            signature = self._signature(raw, payload)
+            plan = self._resolved.get(signature)
+            if plan is None:
+                plan = self._resolved[signature] = resolve_columns(payload, frame.plan.field_names, self.field_mapping)
+            self._note_missing(raw, signature, plan[1])
+            plans.setdefault(signature, (plan, []))[1].append(i)
+
+        # Une affectation par colonne et par en-tête
+        for (resolved, _), rows in plans.values():
+            for field, column in resolved:
+                frame.attrs.loc[rows, field] = pd.Series([
+                    None if type(v) is float and v != v else v
+                    for v in frame.column(rows, column)
+                ], index=rows, dtype=object)
+
 
 class ValueMappingFilter(BaseTransformFilter):
     # TODO : mapping of 
@@ -27,4 +98,4 @@ class ValueMappingFilter(BaseTransformFilter):
     
     def apply(self, ctx):
         return super().apply(ctx)
-    
\ No newline at end of file
+    
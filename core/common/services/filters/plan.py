@@ -0,0 +1,122 @@
+import re
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.db import models
+from django.db.models import Field
+
+from core.common.tools.parse import memoized, parse_int, parse_decimal, parse_date
+
+NOT_DECIMAL_CHARS = re.compile(r"[^\d\.\-]")
+
+# Model -> FieldPlan, emptied on migration or model reload
+_PLANS = {}
+
+
+def _is_plain_number(value: str) -> bool:
+    """'12', '-3.5' ... : strings that Decimal / int read as is, without cleaning."""
+    if value[:1] == "-":
+        value = value[1:]
+    return value.replace(".", "", 1).isdigit() and value.isascii()
+
+
+@memoized()
+def to_decimal(cleaned: str, quantum: Decimal) -> Decimal:
+    if _is_plain_number(cleaned):
+        # Fast path : already clean, no regex
+        return Decimal(cleaned).quantize(quantum, rounding=ROUND_HALF_UP)
+    s = NOT_DECIMAL_CHARS.sub("", cleaned)
+    if s == "":
+        raise ValueError(f"Decimal contains no number : {cleaned}")
+    return Decimal(s).quantize(quantum, rounding=ROUND_HALF_UP)
+
+
+def _to_int(value):
+    if type(value) is str and value.isdigit() and value.isascii():
+        return int(value)
+    return parse_int(value)
+
+
+def _to_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _decimal_parser(field):
+    quantum = Decimal("1").scaleb(-field.decimal_places)
+    def parse(value):
+        if isinstance(value, str):
+            return to_decimal(value, quantum)
+        return parse_decimal(value)
+    return parse
+
+
+# Field class -> factory of the parser of its raw values (first match wins,
+# DateTimeField before DateField as it is a subclass)
+FIELD_PARSERS = (
+    (models.IntegerField, lambda field: _to_int),
+    (models.DecimalField, _decimal_parser),
+    (models.DateTimeField, lambda field: parse_date),
+    (models.DateField, lambda field: parse_date),
+    (models.FloatField, lambda field: _to_float),
+)
+
+
+def _field_parser(field):
+    """Parser of the raw values of a field, None if they are kept as is."""
+    for field_class, factory in FIELD_PARSERS:
+        if isinstance(field, field_class):
+            return factory(field)
+    return None
+
+
+class FieldPlan:
+    """
+    What the filters need to know about the fields of a model, computed once per model.
+
+    Attributes:
+        field_names (tuple): Concrete fields filled by the filters (no auto fields).
+        required (tuple): Fields neither nullable nor blank (except `raw`).
+        parsers (tuple): (field_name, parser) for the fields whose raw value is parsed.
+        quantums (dict): Decimal field -> quantum of its decimal places.
+        date_fields (tuple): Date and datetime fields.
+    """
+    __slots__ = ('model', 'field_names', 'required', 'parsers', 'quantums', 'date_fields', '_attrs')
+
+    def __init__(self, model):
+        fields = [
+            f for f in model._meta.get_fields()
+            if isinstance(f, Field) and f.concrete and not f.auto_created
+        ]
+        self.model = model
+        self.field_names = tuple(f.name for f in fields)
+        self.required = tuple(
+            f.name for f in fields
+            if f.name != 'raw' and not getattr(f, 'null', False) and not getattr(f, 'blank', False)
+        )
+        self.parsers = tuple(
+            (f.name, parser) for f in fields if (parser := _field_parser(f)) is not None
+        )
+        self.quantums = {
+            f.name: Decimal("1").scaleb(-f.decimal_places)
+            for f in fields if isinstance(f, models.DecimalField)
+        }
+        self.date_fields = tuple(f.name for f in fields if isinstance(f, models.DateField))
+        self._attrs = dict.fromkeys(self.field_names)
+
+    def new_attrs(self) -> dict:
+        """Empty attrs of a row (every field to None)."""
+        return self._attrs.copy()
+
+
+def get_field_plan(model) -> FieldPlan:
+    plan = _PLANS.get(model)
+    if plan is None:
+        plan = _PLANS[model] = FieldPlan(model)
+    return plan
+
+
+def clear_field_plans(**kwargs):
+    """Receiver of `post_migrate` / `class_prepared` : the fields may have changed."""
+    _PLANS.clear()
@@ -1,26 +1,36 @@
 import pandas as pd
-from django.db.models import Field
 from core.common.services.filters.base import BaseTransformFilter
 
 class RequiredFieldFilter(BaseTransformFilter):
     
     def apply(self, ctx):
-        missing = []
         if all(pd.isna(value) for value in ctx.attrs.values()):
             ctx.error = f"Row is empty"
             return False
         
         # Check required field
-        for f in ctx.model_class._meta.get_fields():
-            if not isinstance(f, Field) or not f.concrete or f.auto_created:
-                continue
-            if f.name == 'raw':
-                continue
-            if not getattr(f, 'null', False) and not getattr(f, 'blank', False):
-                val = ctx.attrs.get(f.name)
-                if val in (None, ''):
-                    missing.append(f.name)
+        attrs = ctx.attrs
+        missing = [name for name in ctx.plan.required if attrs.get(name) in (None, '')]
         if missing:
             ctx.error = f"Required field missing : {', '.join(sorted(missing))}"
+            # Le premier champ manquant : `transform_errors --field` filtre sur un seul nom
+            ctx.failure = {'field': min(missing)}
             return False
-        return True
\ No newline at end of file
+        return True
+
+    def apply_frame(self, frame):
+        rows = frame.alive()
+        if not rows:
+            return
+        attrs = frame.attrs.loc[rows]
+        empty = attrs.isna().all(axis=1)
+        required = list(frame.plan.required)
+        missing = attrs[required].map(lambda v: v is None or v == '')
+        flagged = empty | missing.any(axis=1)
+        for i in flagged.index[flagged]:
+            if empty.at[i]:
+                frame.reject(i, "Row is empty", self)
+            else:
+                names = [name for name, is_missing in zip(required, missing.loc[i]) if is_missing]
+                frame.reject(i, f"Required field missing : {', '.join(sorted(names))}", self,
+                             field=min(names))
@@ -1,52 +1,54 @@
-from decimal import Decimal, ROUND_HALF_UP
-import re
+import pandas as pd
 
-from django.db import models
 from core.common.services.filters.base import BaseTransformFilter
-from core.common.tools.parse import (
-    parse_int, parse_decimal, parse_date,
-)
-
-def to_decimal(cleaned: str, field: models.DecimalField) -> Decimal:
-    s = re.sub(r"[^\d\.\-]", "", cleaned)
-    if s == "":
-        raise ValueError(f"Decimal contains no number : {cleaned}")
-    dec = Decimal(s or "0")
-    quantum = Decimal("1").scaleb(-field.decimal_places)
-    
-    return dec.quantize(quantum, rounding=ROUND_HALF_UP)
+from core.common.services.filters.frame import map_unique
+from core.common.services.filters.plan import get_field_plan
 
 class TypeParsingFilter(BaseTransformFilter):
     """Sparse the value of the 'context'."""
     def __init__(self, order_model):
         self._opts = order_model._meta
+        # (field_name, parser) compilés une fois (voir FieldPlan / FIELD_PARSERS)
+        self._parsers = get_field_plan(order_model).parsers
+        # (source_file, sheet_name) -> parsers avec ceux propres à la feuille (ex. format de date)
+        self._sheet_parsers = {}
 
-    def apply(self, ctx):
-        for field_name, raw_val in list(ctx.attrs.items()):
-            if raw_val is None:
-                continue
-
-            model_field = self._opts.get_field(field_name)
-
-            if isinstance(model_field, models.IntegerField):
-                ctx.attrs[field_name] = parse_int(raw_val)
+    def set_sheet_parsers(self, source_file, sheet_name, parsers: dict):
+        """Use `parsers` (field -> parser) instead of the default ones for the rows of a sheet."""
+        self._sheet_parsers[(source_file, sheet_name)] = tuple(
+            (field_name, parsers.get(field_name, parse)) for field_name, parse in self._parsers
+        )
 
-            # DecimalField
-            elif isinstance(model_field, models.DecimalField):
-                if isinstance(raw_val, str):
-                    ctx.attrs[field_name] = to_decimal(raw_val, model_field)
-                else:
-                    ctx.attrs[field_name] = parse_decimal(raw_val)
-
-            elif isinstance(model_field, (models.DateTimeField, models.DateField)):
-                ctx.attrs[field_name] = parse_date(raw_val)
-
-            # FloatField
-            elif isinstance(model_field, models.FloatField):
+    def apply(self, ctx):
+        attrs = ctx.attrs
+        parsers = self._parsers
+        if self._sheet_parsers:
+            parsers = self._sheet_parsers.get((ctx.raw.source_file, ctx.raw.sheet_name), parsers)
+        for field_name, parse in parsers:
+            raw_val = attrs[field_name]
+            if raw_val is not None:
                 try:
-                    ctx.attrs[field_name] = float(raw_val)
-                except (TypeError, ValueError):
-                    ctx.attrs[field_name] = None
-            else:
-                ctx.attrs[field_name] = raw_val
-        return True
\ No newline at end of file
+                    attrs[field_name] = parse(raw_val)
+                except Exception:
+                    ctx.failure = {'field': field_name, 'value': raw_val}
+                    raise
+        return True
+
+    def apply_frame(self, frame):
+        groups = frame.groups(lambda raw, payload: (raw.source_file, raw.sheet_name))
+        for key, rows in groups.items():
+            parsers = self._sheet_parsers.get(key, self._parsers)
+            for field_name, parse in parsers:
+                rows = frame.alive(rows)
+                column = frame.attrs.loc[rows, field_name]
+                todo = [i for i, v in zip(rows, column) if v is not None]
+                if not todo:
+                    continue
+                # Chaque valeur distincte n'est parsée qu'une fois
+                values = frame.attrs.loc[todo, field_name].tolist()
+                parsed = []
+                for i, raw_val, (value, error) in zip(todo, values, map_unique(values, parse)):
+                    if error is not None:
+                        frame.fail(i, error, field=field_name, value=raw_val)
+                    parsed.append(value)
+                frame.attrs.loc[todo, field_name] = pd.Series(parsed, index=todo, dtype=object)
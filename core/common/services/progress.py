@@ -0,0 +1,76 @@
+import time
+
+
+class ProgressTracker:
+    """
+    Count the rows of a long run (import, transform) and publish progress events.
+
+    The events are dicts sent to `callback`, at most once per `interval` seconds
+    (plus one at the end of each sheet) :
+        {'stage', 'sheet', 'rows_read', 'rows_qualified', 'batches_flushed',
+         'rows_per_second', 'elapsed', 'done'}
+
+    Args:
+        callback (callable, optional): Receive each event. Nothing is published if None.
+        stage (str, optional): Name of the run, e.g. 'import' or 'transform'.
+        interval (float, optional): Minimum delay in seconds between two events. Defaults to 1.
+    """
+    def __init__(self, callback=None, stage="", interval=1.0):
+        self.callback = callback
+        self.stage = stage
+        self.interval = interval
+        self.sheet = None
+        self._reset()
+
+    def _reset(self):
+        self.rows_read = 0
+        self.rows_qualified = 0
+        self.batches_flushed = 0
+        self._started = time.monotonic()
+        self._last_publish = self._started
+
+    def start_sheet(self, sheet):
+        """Close the current sheet (if any) and start counting a new one."""
+        if self.sheet is not None:
+            self.publish(done=True)
+        self.sheet = sheet
+        self._reset()
+
+    def add(self, rows_read=0, rows_qualified=0, batches_flushed=0):
+        self.rows_read += rows_read
+        self.rows_qualified += rows_qualified
+        self.batches_flushed += batches_flushed
+        if self.callback is not None and time.monotonic() - self._last_publish >= self.interval:
+            self.publish()
+
+    def event(self, done=False) -> dict:
+        elapsed = time.monotonic() - self._started
+        return {
+            'stage': self.stage,
+            'sheet': self.sheet,
+            'rows_read': self.rows_read,
+            'rows_qualified': self.rows_qualified,
+            'batches_flushed': self.batches_flushed,
+            'rows_per_second': round(self.rows_read / elapsed, 1) if elapsed > 0 else 0.0,
+            'elapsed': round(elapsed, 2),
+            'done': done,
+        }
+
+    def publish(self, done=False):
+        self._last_publish = time.monotonic()
+        if self.callback is not None:
+            self.callback(self.event(done=done))
+
+    def finish(self):
+        if self.sheet is not None:
+            self.publish(done=True)
+            self.sheet = None
+
+
+def format_progress(event: dict) -> str:
+    """One line summary of a progress event, for the CLI."""
+    return (
+        f"[{event['stage']}] {event['sheet']} : "
+        f"{event['rows_read']} read, {event['rows_qualified']} kept, "
+        f"{event['batches_flushed']} batches, {event['rows_per_second']} rows/s"
+    )
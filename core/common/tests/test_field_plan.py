@@ -0,0 +1,42 @@
+from decimal import Decimal
+
+from django.test import SimpleTestCase
+
+from core.common.services.filters.context import FilterContext
+from core.common.services.filters.plan import clear_field_plans, get_field_plan
+from core.supplier_order.models import SupplierOrder
+
+
+class FieldPlanTests(SimpleTestCase):
+    def test_plan_built_once_per_model(self):
+        plan = get_field_plan(SupplierOrder)
+        self.assertIs(get_field_plan(SupplierOrder), plan)
+        self.assertIn('carats', plan.field_names)
+        self.assertNotIn('id', plan.field_names)
+        self.assertNotIn('raw', plan.required)
+        self.assertEqual(plan.quantums['carats'], Decimal('0.001'))
+
+    def test_plan_cleared_on_migrate(self):
+        plan = get_field_plan(SupplierOrder)
+        clear_field_plans()
+        self.assertIsNot(get_field_plan(SupplierOrder), plan)
+
+    def test_context_attrs_not_shared(self):
+        first = FilterContext(None, SupplierOrder)
+        second = FilterContext(None, SupplierOrder)
+        first.attrs['carats'] = '1.00'
+        self.assertIsNone(second.attrs['carats'])
+        self.assertIs(first.model_class, SupplierOrder)
+
+    def test_parsers_fast_path_matches_cleaning(self):
+        parsers = dict(get_field_plan(SupplierOrder).parsers)
+        carats, number = parsers['carats'], parsers['number']
+        self.assertEqual(carats('1.2345'), Decimal('1.235'))
+        self.assertEqual(carats('-2'), Decimal('-2.000'))
+        self.assertEqual(carats('1,234.5 ct'), Decimal('1234.500'))
+        self.assertEqual(carats(2), Decimal('2'))
+        with self.assertRaises(ValueError):
+            carats('n/a')
+        self.assertEqual(number('12'), 12)
+        self.assertEqual(number('3.0'), 3)
+        self.assertEqual(number('12 pcs'), 12)
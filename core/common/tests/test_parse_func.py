@@ -3,11 +3,12 @@ import pandas as pd
 import numpy as np
 from decimal import Decimal
 from datetime import datetime
-from django.test import SimpleTestCase
+from django.test import SimpleTestCase, override_settings
 from django.utils import timezone
 
 from core.common.tools.parse import (
-    parse_int, parse_decimal, parse_date, parse_currency, parse_unit
+    parse_int, parse_decimal, parse_date, parse_currency, parse_unit,
+    clear_parse_caches, parse_cache_stats, infer_date_format, convert_dates, column_date_parser, EXCEL_SERIAL,
 )
 from core.common.tools.row import get_value_mapped, is_fully_invalid_row
 from core.common.models import Currency
@@ -104,6 +105,61 @@ class ParseUnitTests(SimpleTestCase):
             parse_unit('UNKNOWN_UNIT')
 
 
+class DateFormatInferenceTests(SimpleTestCase):
+    def test_iso_and_excel(self):
+        self.assertEqual(infer_date_format(['2025-05-06']), ('%Y-%m-%d', False))
+        self.assertEqual(infer_date_format([45783, '43500', None]), (EXCEL_SERIAL, False))
+
+    def test_day_first_when_a_day_is_above_12(self):
+        self.assertEqual(infer_date_format(['06/05/2025', '13/05/2025']), ('%d/%m/%Y', False))
+
+    def test_ambiguous_column_read_month_first(self):
+        self.assertEqual(infer_date_format(['06/05/2025', '01/02/2025']), ('%m/%d/%Y', True))
+
+    def test_no_common_format(self):
+        self.assertEqual(infer_date_format(['2025-05-06', '13/05/2025']), (None, False))
+
+    def test_convert_dates_in_bulk(self):
+        converted = convert_dates(['13/05/2025', 'oops'], '%d/%m/%Y')
+        self.assertEqual(list(converted), ['13/05/2025'])
+        self.assertTrue(timezone.is_aware(converted['13/05/2025']))
+        self.assertEqual(convert_dates([45783], EXCEL_SERIAL)[45783].date().isoformat(), '2025-05-06')
+
+    def test_column_parser_reads_unsampled_values_with_the_format(self):
+        parse = column_date_parser(convert_dates(['13/05/2025'], '%d/%m/%Y'), '%d/%m/%Y')
+        self.assertEqual(parse('05/03/2024').date().isoformat(), '2024-03-05')
+        self.assertEqual(column_date_parser({}, EXCEL_SERIAL)(45783).date().isoformat(), '2025-05-06')
+        # Ne suit pas le format : parse_date
+        self.assertEqual(parse('2024-03-05').date().isoformat(), '2024-03-05')
+
+
+class MemoizedParserTests(SimpleTestCase):
+    def setUp(self):
+        clear_parse_caches()
+
+    def test_repeated_value_hits_cache(self):
+        first = parse_date('2025-05-06')
+        self.assertEqual(parse_date('2025-05-06'), first)
+        self.assertEqual(parse_cache_stats()['parse_date'], (1, 1))
+
+    def test_failure_cached_and_raised_again(self):
+        for _ in range(2):
+            with self.assertRaisesMessage(ValueError, "Unknown unit: 'XYZ'"):
+                parse_unit('XYZ')
+        self.assertEqual(parse_cache_stats()['parse_unit'], (1, 1))
+
+    def test_typed_and_nan_values(self):
+        self.assertEqual(str(parse_decimal(1)), '1')
+        self.assertEqual(str(parse_decimal(1.0)), '1.0')
+        self.assertIsNone(parse_decimal(float('nan')))
+        self.assertEqual(parse_cache_stats()['parse_decimal'], (0, 2))
+
+    def test_cache_cleared_on_timezone_change(self):
+        parse_date('2025-05-06')
+        with override_settings(TIME_ZONE='Asia/Bangkok'):
+            self.assertEqual(parse_cache_stats()['parse_date'], (0, 0))
+
+
 class RowToolsTests(SimpleTestCase):
 
     def test_get_value_mapped_missing_returns_none(self):
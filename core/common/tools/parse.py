@@ -1,5 +1,8 @@
 import math
+from datetime import datetime, timedelta
 from decimal import Decimal, InvalidOperation
+from functools import lru_cache, wraps
+from django.core.signals import setting_changed
 from django.utils import timezone
 import pandas as pd
 
@@ -7,6 +10,69 @@ from core.common.models import Currency
 from core.common.mappings.units import UNIT_MAPPING
 from core.common.mappings.currency import CURRENCY_MAPPING
 
+PARSE_CACHE_SIZE = 4096
+
+# name -> memoized parser, for the stats and the invalidation
+MEMOIZED_PARSERS = {}
+
+
+def memoized(name=None, maxsize=PARSE_CACHE_SIZE):
+    """
+    Bounded LRU cache for a parser : sheets repeat the same values on many lines.
+    Failures are cached too (the exception is raised again with the same message)
+    so a bad value is only diagnosed once. Unhashable values and NaN are not cached.
+    """
+    def decorator(func):
+        @lru_cache(maxsize=maxsize, typed=True)
+        def cached(*args, **kwargs):
+            try:
+                return False, func(*args, **kwargs)
+            except Exception as e:
+                return True, (type(e), e.args)
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            value = args[0] if args else None
+            if type(value) is float and value != value:
+                return func(*args, **kwargs)
+            try:
+                failed, result = cached(*args, **kwargs)
+            except TypeError:
+                # Unhashable value
+                return func(*args, **kwargs)
+            if failed:
+                cls, error_args = result
+                raise cls(*error_args)
+            return result
+
+        wrapper.cache_info = cached.cache_info
+        wrapper.cache_clear = cached.cache_clear
+        MEMOIZED_PARSERS[name or func.__name__] = wrapper
+        return wrapper
+    return decorator
+
+
+def parse_cache_stats() -> dict:
+    """name -> (hits, misses) of the memoized parsers."""
+    return {
+        name: (parser.cache_info().hits, parser.cache_info().misses)
+        for name, parser in MEMOIZED_PARSERS.items()
+    }
+
+
+def clear_parse_caches(**kwargs):
+    for parser in MEMOIZED_PARSERS.values():
+        parser.cache_clear()
+
+
+def _clear_on_timezone_change(setting, **kwargs):
+    # parse_date returns aware datetimes : they depend on the time zone
+    if setting in ('TIME_ZONE', 'USE_TZ'):
+        clear_parse_caches()
+
+
+setting_changed.connect(_clear_on_timezone_change, dispatch_uid='core_clear_parse_caches')
+
 # def parse_int(value): 
     
 #     if isinstance(value, str):
@@ -24,6 +90,7 @@ def parse_int(value):
             return int(digits) if digits else None
     return int(value)
 
+@memoized()
 def parse_date(value, expected_year=None):
     """Safely parse a date value and make it timezone-aware if needed."""
     if value is None or (isinstance(value, float) and pd.isna(value)):
@@ -51,6 +118,128 @@ def parse_date(value, expected_year=None):
         
     return parsed
 
+EXCEL_ORIGIN = '1899-12-30'
+EXCEL_SERIAL = 'excel'
+# Excel serials between 1900 and ~2173
+EXCEL_SERIAL_RANGE = (1, 100000)
+
+DATE_FORMATS = (
+    '%Y-%m-%d', '%Y-%m-%d %H:%M:%S', '%Y-%m-%dT%H:%M:%S', '%Y/%m/%d',
+    '%m/%d/%Y', '%d/%m/%Y', '%m-%d-%Y', '%d-%m-%Y', '%m.%d.%Y', '%d.%m.%Y',
+    '%m/%d/%y', '%d/%m/%y',
+)
+# Month-first format -> its day-first twin : both read '06/05/2025'
+DAY_FIRST_TWINS = {
+    '%m/%d/%Y': '%d/%m/%Y', '%m-%d-%Y': '%d-%m-%Y', '%m.%d.%Y': '%d.%m.%Y', '%m/%d/%y': '%d/%m/%y',
+}
+
+
+def _is_excel_serial(value) -> bool:
+    if isinstance(value, str):
+        try:
+            value = float(value)
+        except ValueError:
+            return False
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return False
+    return EXCEL_SERIAL_RANGE[0] <= value <= EXCEL_SERIAL_RANGE[1]
+
+
+def _matches(value: str, fmt: str) -> bool:
+    try:
+        datetime.strptime(value, fmt)
+        return True
+    except ValueError:
+        return False
+
+
+def infer_date_format(values):
+    """
+    Guess the format of a date column from a sample of its values.
+    When the day and the month can be swapped on every value, month-first is
+    kept (as `pd.to_datetime` does) and the column is flagged ambiguous.
+
+    Returns:
+        (fmt, ambiguous) : `fmt` is a strptime format, EXCEL_SERIAL or None (no common format).
+    """
+    values = [v for v in values if v not in (None, '')]
+    if not values:
+        return None, False
+    if all(_is_excel_serial(v) for v in values):
+        return EXCEL_SERIAL, False
+    strings = [str(v).strip() for v in values]
+    candidates = [fmt for fmt in DATE_FORMATS if all(_matches(s, fmt) for s in strings)]
+    if not candidates:
+        return None, False
+    fmt = candidates[0]
+    return fmt, DAY_FIRST_TWINS.get(fmt) in candidates
+
+
+def convert_dates(values, fmt) -> dict:
+    """
+    Convert in one pass the values of a date column whose format is known.
+
+    Returns:
+        dict value -> aware datetime (values that do not fit `fmt` are left out).
+    """
+    values = [v for v in set(values) if v not in (None, '')]
+    if not values or fmt is None:
+        return {}
+    if fmt == EXCEL_SERIAL:
+        parsed = pd.to_datetime(
+            pd.to_numeric(pd.Series(values, dtype=object), errors='coerce'),
+            origin=EXCEL_ORIGIN, unit='D', errors='coerce',
+        )
+    else:
+        parsed = pd.to_datetime(
+            pd.Series([str(v).strip() for v in values], dtype=object), format=fmt, errors='coerce'
+        )
+    converted = {}
+    for value, ts in zip(values, parsed):
+        if pd.isna(ts):
+            continue
+        dt = ts.to_pydatetime()
+        converted[value] = timezone.make_aware(dt) if timezone.is_naive(dt) else dt
+    return converted
+
+
+def convert_date(value, fmt):
+    """
+    Convert one value of a date column whose format is known.
+
+    Returns:
+        aware datetime, or None when the value does not fit `fmt`.
+    """
+    if value in (None, '') or fmt is None:
+        return None
+    try:
+        if fmt == EXCEL_SERIAL:
+            if not _is_excel_serial(value):
+                return None
+            dt = datetime.fromisoformat(EXCEL_ORIGIN) + timedelta(days=float(value))
+        else:
+            dt = datetime.strptime(str(value).strip(), fmt)
+    except (TypeError, ValueError):
+        return None
+    return timezone.make_aware(dt)
+
+
+def column_date_parser(converted: dict, fmt=None):
+    """
+    Parser of a date column : converted values first, then the values out of the sample
+    with the format of the column, `parse_date` only for those that do not fit it.
+    """
+    def parse(value):
+        try:
+            dt = converted.get(value)
+        except TypeError:
+            dt = None
+        if dt is None:
+            dt = convert_date(value, fmt)
+        return dt if dt is not None else parse_date(value)
+    return parse
+
+@memoized()
 def parse_decimal(value, default=Decimal('0.0')):
     """Convert to Decimal safely. Return default if value is invalid."""
     if value is None:
@@ -66,6 +255,7 @@ def parse_decimal(value, default=Decimal('0.0')):
     except (InvalidOperation, ValueError):
         return None
 
+@memoized()
 def parse_currency(raw: str) -> Currency:
     """
     Normalize a notation for a currency
@@ -84,6 +274,7 @@ def parse_currency(raw: str) -> Currency:
 
 
 
+@memoized()
 def parse_unit(raw: str) -> str:
     """
     Clean `raw` and send back a canonical unit :
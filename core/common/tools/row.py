@@ -1,4 +1,10 @@
+import hashlib
+import json
+from datetime import datetime, timezone
+from decimal import Decimal
+
 import pandas as pd
+from django.core.serializers.json import DjangoJSONEncoder
 
 def get_value_mapped(row, field_name, mapping):
     possible_columns = mapping.get(field_name, [])
@@ -10,6 +16,58 @@ def get_value_mapped(row, field_name, mapping):
     return None
 
 
+def resolve_columns(columns, field_names, mapping):
+    """
+    Resolve once, for a given header, the column read for each field
+    (the first alias of `mapping` present in `columns`, like `get_value_mapped`).
+
+    Returns:
+        (resolved, missing) : list of (field, column) and list of the mapped fields without column.
+    """
+    columns = set(columns)
+    resolved, missing = [], []
+    for field in field_names:
+        aliases = mapping.get(field)
+        if not aliases:
+            continue
+        column = next((col for col in aliases if col in columns), None)
+        if column is None:
+            missing.append(field)
+        else:
+            resolved.append((field, column))
+    return resolved, missing
+
+
+def hash_row(payload: dict) -> str:
+    """Stable sha256 of a raw row payload (independent of the keys order)."""
+    normalized = {str(k): v for k, v in payload.items()}
+    dumped = json.dumps(normalized, sort_keys=True, ensure_ascii=False, cls=DjangoJSONEncoder)
+    return hashlib.sha256(dumped.encode()).hexdigest()
+
+
+def hash_columns(columns) -> str:
+    """Stable sha256 of a list of column names."""
+    dumped = json.dumps([str(c) for c in columns], ensure_ascii=False)
+    return hashlib.sha256(dumped.encode()).hexdigest()
+
+
+def compact_row(payload: dict):
+    """
+    Split a raw row into its column names and its non empty cells.
+
+    Returns:
+        (columns, cells) where `cells` maps the column position (as str) to the value.
+    """
+    columns = [str(k) for k in payload.keys()]
+    cells = {str(i): v for i, v in enumerate(payload.values()) if v != ""}
+    return columns, cells
+
+
+def expand_row(columns, cells: dict) -> dict:
+    """Rebuild the dict of a raw row from `compact_row` output."""
+    return {col: cells.get(str(i), "") for i, col in enumerate(columns)}
+
+
 def is_fully_invalid_row(row):
     return all(pd.isna(value) for value in row.values)
 
@@ -19,11 +77,15 @@ def is_duplicate_object(obj, fields=None):
     
     Args:
         obj: Django model instance (not yet saved)
-        fields: list of field names to check uniqueness (default : Meta.unique_together)
+        fields: list of field names to check uniqueness (default : the lot fingerprint
+            of the model if it has one, else Meta.unique_together)
         
     Returns:
         bool
     """
+    if fields is None and hasattr(obj, 'make_lot_fingerprint'):
+        # Une seule recherche sur l'index du fingerprint
+        return obj.__class__.objects.filter(lot_fingerprint=obj.make_lot_fingerprint()).exists()
     if fields is None:
         # Try to detect fields from Meta.unique_together
         meta = getattr(obj._meta, 'unique_together', None)
@@ -34,4 +96,26 @@ def is_duplicate_object(obj, fields=None):
             raise ValueError("No fields provided and no unique_together defined in Meta.")
 
     filter_kwargs = {field: getattr(obj, field) for field in fields}
-    return obj.__class__.objects.filter(**filter_kwargs).exists()
\ No newline at end of file
+    return obj.__class__.objects.filter(**filter_kwargs).exists()
+
+
+def normalize_key(key) -> tuple:
+    """
+    Unique key of an order with the values written the same way whether they come
+    from the filters or from the database (UTC datetimes, decimals without trailing zeros).
+    """
+    normalized = []
+    for value in key:
+        if isinstance(value, datetime) and value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        if isinstance(value, datetime):
+            value = value.isoformat()
+        elif isinstance(value, Decimal):
+            value = format(value.normalize(), 'f')
+        normalized.append(value)
+    return tuple(normalized)
+
+
+def key_digest(key) -> bytes:
+    """Fixed size digest (16 bytes) of a normalized unique key."""
+    return hashlib.blake2b(repr(normalize_key(key)).encode(), digest_size=16).digest()
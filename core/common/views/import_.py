@@ -1,19 +1,81 @@
+import json
+import time
+
 from django.contrib import messages
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import JsonResponse, StreamingHttpResponse
 from django.shortcuts import redirect
+from django.urls import reverse
+
+from core.order_raw.models import ImportJob
+from core.order_raw.services.jobs import enqueue_import
+
+# Seconds an events stream holds a request worker, then the browser reconnects after EVENTS_RETRY_MS
+EVENTS_MAX_DURATION = 30
+EVENTS_RETRY_MS = 2000
+
+
+def orders_import_enqueue(request, order_type, order_name):
+    """Save the uploaded file and queue its import for `run_import_worker`."""
+    if request.method == 'POST' and request.FILES.get('file'):
+        job = enqueue_import(request.FILES['file'], order_type=order_type)
+        messages.success(request, f"Import queued (job #{job.id}): {job.original_name}.")
+        # The import page follows the job progress
+        return redirect(f"{reverse(f'{order_name}_orders_import_page')}?job={job.id}")
+    messages.error(request, "No file selected.")
+    return redirect(f'{order_name}_orders_import_page')
+
+
+def import_job_status(request, job_id):
+    try:
+        job = ImportJob.objects.get(id=job_id)
+    except ImportJob.DoesNotExist:
+        return JsonResponse({"error": "Job not found"}, status=404)
+    return JsonResponse({
+        "id": job.id,
+        "file": job.original_name,
+        "status": job.status,
+        "progress": job.progress,
+        "report": job.report,
+        "error": job.error,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at,
+    })
+
+
+def _sse(data, event=None):
+    message = f"event: {event}\n" if event else ""
+    return message + f"data: {json.dumps(data, cls=DjangoJSONEncoder)}\n\n"
+
 
+def import_job_events(request, job_id, interval=1.0, max_duration=EVENTS_MAX_DURATION):
+    """
+    Server-sent events stream of a job progress (the worker saves it on `job.progress`).
+    A `progress` event is sent each time it changes, then one `end` event with the report.
+    The stream holds a request worker : it is closed after `max_duration` seconds with
+    a `retry:` hint, and the browser reconnects (a pending job may wait long for a worker).
+    """
+    if not ImportJob.objects.filter(id=job_id).exists():
+        return JsonResponse({"error": "Job not found"}, status=404)
 
+    def stream():
+        last = None
+        deadline = time.monotonic() + max_duration
+        while True:
+            job = ImportJob.objects.get(id=job_id)
+            if job.progress != last:
+                last = job.progress
+                yield _sse(job.progress, event="progress")
+            if job.status in (ImportJob.Status.DONE, ImportJob.Status.FAILED):
+                yield _sse({"status": job.status, "report": job.report, "error": job.error}, event="end")
+                return
+            if time.monotonic() + interval > deadline:
+                yield f"retry: {EVENTS_RETRY_MS}\n\n"
+                return
+            time.sleep(interval)
 
-def orders_import_upload(request, import_order_func, order_name):
-    if request.method == 'POST' and request.FILES['file']:
-        file = request.FILES['file']
-        try:
-            report = import_order_func(file)
-            messages.success(request, f"Import completed: {report['imported']} orders added.")
-            return redirect(f'{order_name}_orders_list')  
-        except Exception as e:
-            messages.error(request, f"Import failed: {str(e)}")
-            return redirect(f'{order_name}_orders_import_page')
-    else:
-        messages.error(request, "No file selected.")
-        return redirect(f'{order_name}_orders_import_page')
-    
+    response = StreamingHttpResponse(stream(), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
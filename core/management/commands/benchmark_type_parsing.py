@@ -0,0 +1,122 @@
+import re
+import time
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.core.management.base import BaseCommand
+from django.db import models
+
+from core.common.services.filters.context import FilterContext
+from core.common.services.filters.mapping import FieldMappingFilter
+from core.common.services.filters.type_parsing import TypeParsingFilter
+from core.common.tools.parse import parse_int, parse_decimal, parse_date
+from core.order_raw.models import SupplierOrderRaw
+from core.supplier_order.mapping import SUPPLIER_COLUMN_MAPPING
+from core.supplier_order.models import SupplierOrder
+
+# Raws used when the database has none
+SAMPLE_ROWS = [
+    {'Date': '2019-03-12', 'No.': '12', 'Client': 'SUPPLIER A', 'PC': '3', 'Stone': 'Ruby',
+     'Carats': '1.25', 'Weight per piece': '0.416', 'Price $/ct': '1250.5', 'Total $': '1,563.13'},
+    {'Date': '2020-11-02', 'No.': 'A-7', 'Client': 'SUPPLIER B', 'PC': '12 pcs', 'Stone': 'Sapphire',
+     'Carats': '3.10 ct', 'Weight per piece': '0.258', 'Price $/ct': '$ 800', 'Total $': '2480'},
+]
+
+
+def _legacy_parse(attrs, opts):
+    """Type parsing as it was done before the compiled parsers (isinstance chain per value)."""
+    for field_name, raw_val in list(attrs.items()):
+        if raw_val is None:
+            continue
+        model_field = opts.get_field(field_name)
+        if isinstance(model_field, models.IntegerField):
+            attrs[field_name] = parse_int(raw_val)
+        elif isinstance(model_field, models.DecimalField):
+            if isinstance(raw_val, str):
+                s = re.sub(r"[^\d\.\-]", "", raw_val)
+                if s == "":
+                    raise ValueError(f"Decimal contains no number : {raw_val}")
+                quantum = Decimal("1").scaleb(-model_field.decimal_places)
+                attrs[field_name] = Decimal(s).quantize(quantum, rounding=ROUND_HALF_UP)
+            else:
+                attrs[field_name] = parse_decimal(raw_val)
+        elif isinstance(model_field, (models.DateTimeField, models.DateField)):
+            attrs[field_name] = parse_date(raw_val)
+        elif isinstance(model_field, models.FloatField):
+            try:
+                attrs[field_name] = float(raw_val)
+            except (TypeError, ValueError):
+                attrs[field_name] = None
+
+
+class Command(BaseCommand):
+    help = "Compare the type parsing of the transform (legacy isinstance chain vs compiled parsers)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=5000,
+            help="Number of supplier raws used as corpus."
+        )
+        parser.add_argument(
+            '--no-dates',
+            action='store_true',
+            help="Leave the dates out (their parsing is the same on both sides and dominates)."
+        )
+
+    def _corpus(self, limit):
+        raws = list(SupplierOrderRaw.objects.order_by('id')[:limit])
+        if not raws:
+            self.stdout.write(self.style.WARNING("No raw in database, using sample rows."))
+            raws = [
+                SupplierOrderRaw(sheet_name='sample', row_index=i, data=SAMPLE_ROWS[i % len(SAMPLE_ROWS)])
+                for i in range(limit)
+            ]
+        mapping = FieldMappingFilter(field_mapping=SUPPLIER_COLUMN_MAPPING)
+        corpus = []
+        for raw in raws:
+            ctx = FilterContext(raw, SupplierOrder)
+            mapping.apply(ctx)
+            corpus.append(ctx.attrs)
+        return corpus
+
+    def _time(self, corpus, parse):
+        failed = 0
+        start = time.perf_counter()
+        for attrs in corpus:
+            try:
+                parse(dict(attrs))
+            except Exception:
+                failed += 1
+        return time.perf_counter() - start, failed
+
+    def handle(self, *args, **kwargs):
+        corpus = self._corpus(kwargs['limit'])
+        if kwargs['no_dates']:
+            for attrs in corpus:
+                attrs['date'] = None
+
+        opts = SupplierOrder._meta
+        compiled = TypeParsingFilter(order_model=SupplierOrder)
+
+        class _Ctx:
+            __slots__ = ('attrs',)
+
+        ctx = _Ctx()
+
+        def parse_compiled(attrs):
+            ctx.attrs = attrs
+            compiled.apply(ctx)
+
+        legacy_time, legacy_failed = self._time(corpus, lambda attrs: _legacy_parse(attrs, opts))
+        compiled_time, compiled_failed = self._time(corpus, parse_compiled)
+
+        n = len(corpus)
+        self.stdout.write(f"Rows : {n}")
+        self.stdout.write(
+            f"  legacy   : {legacy_time:.3f}s ({legacy_time / n * 1e6:.1f} µs/row, {legacy_failed} failed)"
+        )
+        self.stdout.write(
+            f"  compiled : {compiled_time:.3f}s ({compiled_time / n * 1e6:.1f} µs/row, {compiled_failed} failed)"
+        )
+        self.stdout.write(self.style.SUCCESS(f"Speedup : x{legacy_time / compiled_time:.2f}"))
@@ -30,28 +30,16 @@ class Command(BaseCommand):
         report = {}
 
         # 1) DUPLICATE SupplierOrder
-        dup_so = (
-            SupplierOrder.objects
-            .values(
-                "supplier", "order_no", "number",
-                "stone", "shape", "color",
-                "size", "carats"
-            )
-            .annotate(cnt=Count("id"))
-            .filter(cnt__gt=1)
-        )
+        # Le fingerprint du lot est unique : seuls les doublons antérieurs n'en ont pas
         report["duplicate_supplier_orders"] = []
-        for entry in dup_so:
-            filters = {
-                k: entry[k] for k in entry.keys() if k != "cnt"
-            }
-            qs = SupplierOrder.objects.filter(**filters)
-            for so in qs:
-                report["duplicate_supplier_orders"].append({
-                    "id": so.id,
-                    "order_no": so.order_no,
-                    "fields": filters
-                })
+        for so in SupplierOrder.objects.filter(lot_fingerprint__isnull=True):
+            fingerprint = so.make_lot_fingerprint()
+            original = SupplierOrder.objects.filter(lot_fingerprint=fingerprint).values_list("id", flat=True).first()
+            report["duplicate_supplier_orders"].append({
+                "id": so.id,
+                "order_no": so.order_no,
+                "fields": {"lot_fingerprint": fingerprint, "duplicate_of": original}
+            })
 
         # 2) DUPLICATE ClientOrder
         dup_co = (
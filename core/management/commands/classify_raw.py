@@ -0,0 +1,54 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from core.order_raw.models import OrderRaw, SupplierOrderRaw, ClientOrderRaw
+from core.order_raw.services.classify import CLASSIFICATION_FIELDS, classify_row
+
+class Command(BaseCommand):
+    help = "Set the is_purchase / is_canceled / is_empty flags of raws imported before they existed."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--type',
+            type=str,
+            help="Type of order [supplier, client, other].",
+            default="supplier"
+        )
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help="Classify every raw again, not only the unclassified ones."
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help="Number of raws updated per batch."
+        )
+
+    def handle(self, *args, **kwargs):
+        if kwargs['type'] == 'supplier':
+            order_model = SupplierOrderRaw
+        elif kwargs['type'] == 'client':
+            order_model = ClientOrderRaw
+        else:
+            order_model = OrderRaw
+
+        queryset = order_model.objects.select_related('header').order_by('pk')
+        if not kwargs['all']:
+            queryset = queryset.filter(is_canceled__isnull=True)
+
+        # Pagination par pk : les lignes mises à jour ne sont pas relues pendant le parcours
+        batch_size = kwargs['batch_size']
+        last_pk, total = 0, 0
+        while True:
+            batch = list(queryset.filter(pk__gt=last_pk)[:batch_size])
+            if not batch:
+                break
+            for raw in batch:
+                for field, value in classify_row(raw.payload).items():
+                    setattr(raw, field, value)
+            with transaction.atomic():
+                order_model.objects.bulk_update(batch, CLASSIFICATION_FIELDS)
+            last_pk = batch[-1].pk
+            total += len(batch)
+        self.stdout.write(self.style.SUCCESS(f"[DONE] {total} raws classified."))
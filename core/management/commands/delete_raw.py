@@ -1,5 +1,5 @@
 from django.core.management.base import BaseCommand
-from core.order_raw.models import OrderRaw, SupplierOrderRaw, ClientOrderRaw
+from core.order_raw.models import OrderRaw, SupplierOrderRaw, ClientOrderRaw, RawImportManifest
 
 class Command(BaseCommand):
     help = "Delete supplier orders database."
@@ -21,5 +21,7 @@ class Command(BaseCommand):
             kwargs['type'] = ""
         size = len(order_model.objects.all())
         order_model.objects.all().delete()
+        # Sans fingerprints : le prochain import relit toutes les feuilles
+        RawImportManifest.objects.filter(raw_model=order_model._meta.model_name).delete()
         self.stdout.write(self.style.SUCCESS(f"[DONE] Raw orders {kwargs['type']} has been cleared ({size} elements have been deleted)."))
         
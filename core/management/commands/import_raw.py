@@ -1,14 +1,15 @@
 from django.core.management.base import BaseCommand, CommandError
 from core.order_raw.services.imports import OrderRawImportService
+from core.common.services.progress import format_progress
 
 class Command(BaseCommand):
-    help = "Import raw orders from an Excel file."
+    help = "Import raw orders from an Excel or CSV/TSV file."
 
     def add_arguments(self, parser):
         parser.add_argument(
             'file_path',
             type=str,
-            help="Path to the Excel file to import."
+            help="Path to the Excel (.xls, .xlsx) or CSV (.csv, .tsv) file to import."
         )
         parser.add_argument(
             '--type',
@@ -16,19 +17,75 @@ class Command(BaseCommand):
             help="Type of order [supplier, client].",
             default="supplier"
         )
+        parser.add_argument(
+            '--streaming',
+            action='store_true',
+            help="Read the workbook row by row instead of loading it in memory."
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help="Number of rows saved per batch."
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help="Number of processes parsing the sheets in parallel."
+        )
+        parser.add_argument(
+            '--no-compact',
+            action='store_true',
+            help="Store each row as a full JSON dict instead of the compact header + cells format."
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help="Import every sheet, even the ones unchanged since the last import."
+        )
+        parser.add_argument(
+            '--no-progress',
+            action='store_true',
+            help="Do not print the progress line of each sheet."
+        )
+
+    def _show_progress(self, event):
+        self.stdout.write("\r" + format_progress(event), ending="\n" if event['done'] else "")
+        self.stdout.flush()
 
     def handle(self, *args, **kargs):
         file_path = kargs['file_path']
         order_type = kargs['type']
-        service = OrderRawImportService(file_path, order_type)
+        service = OrderRawImportService(
+            file_path,
+            order_type,
+            streaming=kargs['streaming'],
+            batch_size=kargs['batch_size'],
+            force=kargs['force'],
+            workers=kargs['workers'],
+            compact=not kargs['no_compact'],
+            progress=None if kargs['no_progress'] else self._show_progress,
+        )
         try:
             report = service.run()
         except RuntimeError as e:
             raise CommandError(str(e))
 
         self.stdout.write(self.style.SUCCESS(
-            f"Imported {report['imported']} raw {order_type} rows."
+            f"Imported {report['imported']} raw {order_type} rows "
+            f"({report['inserted']} inserted, {report['updated']} updated, {report['unchanged']} unchanged)."
         ))
+        if report['removed']:
+            self.stdout.write(self.style.WARNING(
+                f"{report['removed']} raw rows no longer in the file deleted "
+                f"(with {report['removed_orders']} orders transformed from them)."
+            ))
+        if report['unchanged_sheets']:
+            self.stdout.write(self.style.WARNING(
+                f"{len(report['unchanged_sheets'])} sheets unchanged since last import (skipped): "
+                f"{', '.join(report['unchanged_sheets'])}"
+            ))
         if report['failed']:
             self.stdout.write(self.style.ERROR(
                 f"{len(report['failed'])} rows {order_type} failed to import:"
@@ -0,0 +1,56 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.order_raw.models import ImportJob
+from core.order_raw.services.jobs import claim_next_job, run_job
+
+
+class Command(BaseCommand):
+    help = "Run the queued imports (uploaded from the web UI)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help="Run the pending jobs then exit instead of waiting for new ones."
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=2.0,
+            help="Seconds to wait between two polls of the queue."
+        )
+        parser.add_argument(
+            '--requeue-running',
+            action='store_true',
+            help="Put back in the queue the jobs left running by a crashed worker."
+        )
+
+    def handle(self, *args, **kwargs):
+        if kwargs['requeue_running']:
+            n = ImportJob.objects.filter(status=ImportJob.Status.RUNNING).update(
+                status=ImportJob.Status.PENDING, started_at=None
+            )
+            self.stdout.write(self.style.WARNING(f"{n} running jobs put back in the queue."))
+
+        self.stdout.write("Waiting for import jobs...")
+        try:
+            while True:
+                job = claim_next_job()
+                if job is None:
+                    if kwargs['once']:
+                        break
+                    time.sleep(kwargs['interval'])
+                    continue
+
+                self.stdout.write(f"[RUN] Job #{job.id} : {job.original_name}")
+                run_job(job)
+                if job.status == ImportJob.Status.DONE:
+                    self.stdout.write(self.style.SUCCESS(
+                        f"[DONE] Job #{job.id} : {job.report['import']['imported']} raw rows imported."
+                    ))
+                else:
+                    self.stdout.write(self.style.ERROR(f"[FAILED] Job #{job.id} : {job.error}"))
+        except KeyboardInterrupt:
+            self.stdout.write(self.style.WARNING("Worker stopped."))
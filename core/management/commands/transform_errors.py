@@ -0,0 +1,51 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+
+from core.supplier_order.models import TransformError
+
+GROUP_FIELDS = ['code', 'filter', 'field', 'sheet_name', 'source_file', 'value']
+
+
+class Command(BaseCommand):
+    help = "Count the errors of the last transform attempts, grouped by code, field, sheet..."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--by",
+            nargs="+",
+            choices=GROUP_FIELDS,
+            default=["code", "field"],
+            help="Columns of the group by."
+        )
+        parser.add_argument("--code", type=str, help="Only the errors with this code.")
+        parser.add_argument("--field", type=str, help="Only the errors on this field.")
+        parser.add_argument("--filter", type=str, help="Only the errors raised by this filter.")
+        parser.add_argument("--sheet", type=str, help="Only the errors of this sheet.")
+        parser.add_argument(
+            "--samples",
+            type=int,
+            default=0,
+            help="Also print this number of errors (raw, row, value, message) of each group."
+        )
+
+    def handle(self, *args, **kwargs):
+        qs = TransformError.objects.all()
+        for option, field in (("code", "code"), ("field", "field"), ("filter", "filter"), ("sheet", "sheet_name")):
+            if kwargs[option] is not None:
+                qs = qs.filter(**{field: kwargs[option]})
+
+        by = kwargs["by"]
+        groups = qs.values(*by).annotate(count=Count("id")).order_by("-count", *by)
+        total = 0
+        for group in groups:
+            total += group["count"]
+            label = " | ".join(f"{name}={group[name]}" for name in by)
+            self.stdout.write(f"{group['count']:>8}  {label}")
+            if kwargs["samples"]:
+                samples = qs.filter(**{name: group[name] for name in by}).order_by("raw_id")
+                for error in samples[:kwargs["samples"]]:
+                    self.stdout.write(
+                        f"          raw #{error.raw_id} ({error.sheet_name} - Index {error.row_index}) "
+                        f"[{error.value}] {error.message}"
+                    )
+        self.stdout.write(self.style.SUCCESS(f"{total} errors"))
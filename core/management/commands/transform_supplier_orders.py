@@ -1,6 +1,9 @@
-from django.core.management.base import BaseCommand
-from core.order_raw.models import SupplierOrderRaw
-from core.supplier_order.services.transform import SupplierOrderTransformer
+from django.core.management.base import BaseCommand, CommandError
+from core.order_raw.models import RawStatus, SupplierOrderRaw
+from core.supplier_order.models import TransformCheckpoint
+from core.supplier_order.services.transform import CheckpointMismatch, SupplierOrderTransformer
+from core.supplier_order.services.config_version import failed_since_change
+from core.common.services.progress import format_progress
 
 class Command(BaseCommand):
     help = "Transforme les raws fournisseurs en SupplierOrder."
@@ -17,11 +20,109 @@ class Command(BaseCommand):
             default=1000,
             help="Size of the flunch (higher is quicker but use more memory)."
         )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=1,
+            help="Number of processes running the filters (by shards of --batch-size raws)."
+        )
+        parser.add_argument(
+            "--engine",
+            choices=["row", "frame"],
+            default="row",
+            help="Run the filters row by row or column-wise on DataFrames of --batch-size raws."
+        )
+        parser.add_argument(
+            "--row-validation",
+            action="store_true",
+            help="Run full_clean() on every row (uniqueness queried per row) instead of once per batch."
+        )
+        parser.add_argument(
+            "--retry-failed",
+            action="store_true",
+            help="Also transform again the raws that failed on a previous run."
+        )
+        parser.add_argument(
+            "--retry-failed-since-change",
+            action="store_true",
+            help="Also transform again the failed raws that the changed mappings or filters may fix."
+        )
+        parser.add_argument(
+            "--spill-seen-keys",
+            action="store_true",
+            help="Keep the keys used to find duplicates in a temporary SQLite database (large runs)."
+        )
+        parser.add_argument(
+            "--resume",
+            action="store_true",
+            help="Continue the last run, interrupted, from its last committed batch."
+        )
+        parser.add_argument(
+            "--no-progress",
+            action="store_true",
+            help="Do not print the progress line of each sheet."
+        )
+
+    def _show_progress(self, event):
+        self.stdout.write("\r" + format_progress(event), ending="\n" if event['done'] else "")
+        self.stdout.flush()
+
+    def _checkpoint(self, transformer, resume, selection):
+        if not resume:
+            return TransformCheckpoint.objects.create(config_version=transformer.config['version'], selection=selection)
+        checkpoint = TransformCheckpoint.objects.order_by('-started_at', '-id').first()
+        if checkpoint is None or checkpoint.finished_at is not None:
+            raise CommandError("No interrupted transform run to resume.")
+        if checkpoint.config_version != transformer.config['version']:
+            raise CommandError(
+                "The mappings or filters changed since the interrupted run : run the transform without --resume."
+            )
+        if checkpoint.selection != selection:
+            raise CommandError(
+                f"The interrupted run was started with other options ({checkpoint.selection}) : resume it with the same ones."
+            )
+        self.stdout.write(f"Resuming after raw #{checkpoint.last_raw_id}")
+        return checkpoint
 
     def handle(self, *args, **kwargs):
-        transformer = SupplierOrderTransformer(dry_run=kwargs["dry_run"])
-        qs = SupplierOrderRaw.objects.filter(interpreted__isnull=True)
-        stats = transformer.run(queryset=qs, batch_size=kwargs["batch_size"])
+        transformer = SupplierOrderTransformer(
+            dry_run=kwargs["dry_run"],
+            batch_validation=not kwargs["row_validation"],
+            progress=None if kwargs["no_progress"] else self._show_progress,
+        )
+        statuses = [RawStatus.PENDING, RawStatus.STALE]
+        if kwargs["retry_failed"]:
+            statuses.append(RawStatus.FAILED)
+        qs = SupplierOrderRaw.objects.filter(status__in=statuses)
+        if kwargs["retry_failed_since_change"]:
+            retry = failed_since_change(SupplierOrderRaw.objects.all(), transformer.config)
+            self.stdout.write(f"Failed raws retried after a config change : {retry.count()}")
+            qs = qs | retry
+        # Options qui choisissent les raws (et leur ordre de traitement) : identiques à la reprise
+        selection = {name: kwargs[name] for name in ("retry_failed", "retry_failed_since_change", "engine")}
+        checkpoint = None if kwargs["dry_run"] else self._checkpoint(transformer, kwargs["resume"], selection)
+        try:
+            stats = transformer.run(queryset=qs, batch_size=kwargs["batch_size"], workers=kwargs["workers"],
+                                    engine=kwargs["engine"], checkpoint=checkpoint,
+                                    spill_seen_keys=kwargs["spill_seen_keys"])
+        except CheckpointMismatch as e:
+            raise CommandError(str(e))
+        skipped = stats['skipped']
+        if any(skipped.values()):
+            self.stdout.write(
+                f"Skipped from import flags : {skipped['not_purchase']} not purchase, "
+                f"{skipped['canceled']} canceled, {skipped['empty']} empty"
+            )
+        for name, cache in stats['parse_cache'].items():
+            self.stdout.write(f"Parser {name} : {cache['hit_rate']:.0%} cache hits ({cache['hits']}/{cache['hits'] + cache['misses']})")
+        for source_file, sheets in stats['ambiguous_dates'].items():
+            for sheet, fields in sheets.items():
+                self.stdout.write(self.style.WARNING(
+                    f"{source_file} - Sheet {sheet} : ambiguous day/month in {', '.join(fields)} (read month-first)"
+                ))
+        for source_file, sheets in stats['missing_columns'].items():
+            for sheet, fields in sheets.items():
+                self.stdout.write(self.style.WARNING(f"{source_file} - Sheet {sheet} : no column for {', '.join(fields)}"))
         if stats["orders_created"] == 0:
             self.stdout.write(self.style.ERROR(
                 f"Transform error (0 orders created) :\n"
@@ -0,0 +1,30 @@
+# Generated by Django 5.2 on 2026-10-18 14:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_alter_supplierorder_book_no_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RawImportManifest',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('raw_model', models.CharField(max_length=50)),
+                ('source_file', models.CharField(max_length=255)),
+                ('sheet_name', models.CharField(max_length=255)),
+                ('file_hash', models.CharField(max_length=64)),
+                ('sheet_hash', models.CharField(max_length=64)),
+                ('imported_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Raw Import Manifest',
+                'verbose_name_plural': 'Raw Import Manifests',
+                'constraints': [models.UniqueConstraint(fields=('raw_model', 'source_file', 'sheet_name'), name='unique_raw_import_manifest')],
+            },
+        ),
+    ]
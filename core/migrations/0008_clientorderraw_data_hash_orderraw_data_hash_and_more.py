@@ -0,0 +1,28 @@
+# Generated by Django 5.2 on 2026-10-18 14:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_rawimportmanifest'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='clientorderraw',
+            name='data_hash',
+            field=models.CharField(blank=True, help_text='Sha256 of the raw data, to detect edited rows on re-import', max_length=64, null=True),
+        ),
+        migrations.AddField(
+            model_name='orderraw',
+            name='data_hash',
+            field=models.CharField(blank=True, help_text='Sha256 of the raw data, to detect edited rows on re-import', max_length=64, null=True),
+        ),
+        migrations.AddField(
+            model_name='supplierorderraw',
+            name='data_hash',
+            field=models.CharField(blank=True, help_text='Sha256 of the raw data, to detect edited rows on re-import', max_length=64, null=True),
+        ),
+    ]
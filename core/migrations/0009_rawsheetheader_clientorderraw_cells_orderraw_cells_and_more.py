@@ -0,0 +1,72 @@
+# Generated by Django 5.2 on 2026-10-18 14:15
+
+import django.core.serializers.json
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_clientorderraw_data_hash_orderraw_data_hash_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RawSheetHeader',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('digest', models.CharField(max_length=64, unique=True)),
+                ('columns', models.JSONField(help_text='Column names, in the sheet order')),
+            ],
+            options={
+                'verbose_name': 'Raw Sheet Header',
+                'verbose_name_plural': 'Raw Sheet Headers',
+            },
+        ),
+        migrations.AddField(
+            model_name='clientorderraw',
+            name='cells',
+            field=models.JSONField(blank=True, help_text='Compact raw data : non empty cells keyed by their column position', null=True),
+        ),
+        migrations.AddField(
+            model_name='orderraw',
+            name='cells',
+            field=models.JSONField(blank=True, help_text='Compact raw data : non empty cells keyed by their column position', null=True),
+        ),
+        migrations.AddField(
+            model_name='supplierorderraw',
+            name='cells',
+            field=models.JSONField(blank=True, help_text='Compact raw data : non empty cells keyed by their column position', null=True),
+        ),
+        migrations.AlterField(
+            model_name='clientorderraw',
+            name='data',
+            field=models.JSONField(blank=True, encoder=django.core.serializers.json.DjangoJSONEncoder, help_text='Raw data from Excel line', null=True),
+        ),
+        migrations.AlterField(
+            model_name='orderraw',
+            name='data',
+            field=models.JSONField(blank=True, encoder=django.core.serializers.json.DjangoJSONEncoder, help_text='Raw data from Excel line', null=True),
+        ),
+        migrations.AlterField(
+            model_name='supplierorderraw',
+            name='data',
+            field=models.JSONField(blank=True, encoder=django.core.serializers.json.DjangoJSONEncoder, help_text='Raw data from Excel line', null=True),
+        ),
+        migrations.AddField(
+            model_name='clientorderraw',
+            name='header',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='core.rawsheetheader'),
+        ),
+        migrations.AddField(
+            model_name='orderraw',
+            name='header',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='core.rawsheetheader'),
+        ),
+        migrations.AddField(
+            model_name='supplierorderraw',
+            name='header',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='core.rawsheetheader'),
+        ),
+    ]
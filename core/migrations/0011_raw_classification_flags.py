@@ -0,0 +1,58 @@
+# Generated by Django 5.2 on 2026-10-18 14:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_importjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='clientorderraw',
+            name='is_canceled',
+            field=models.BooleanField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='clientorderraw',
+            name='is_empty',
+            field=models.BooleanField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='clientorderraw',
+            name='is_purchase',
+            field=models.BooleanField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='orderraw',
+            name='is_canceled',
+            field=models.BooleanField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='orderraw',
+            name='is_empty',
+            field=models.BooleanField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='orderraw',
+            name='is_purchase',
+            field=models.BooleanField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='supplierorderraw',
+            name='is_canceled',
+            field=models.BooleanField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='supplierorderraw',
+            name='is_empty',
+            field=models.BooleanField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='supplierorderraw',
+            name='is_purchase',
+            field=models.BooleanField(blank=True, db_index=True, null=True),
+        ),
+    ]
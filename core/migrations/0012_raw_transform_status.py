@@ -0,0 +1,77 @@
+# Generated by Django 5.2 on 2026-10-18 14:32
+
+from django.db import migrations, models
+
+
+def mark_transformed(apps, schema_editor):
+    # Raws already turned into a SupplierOrder leave the queue
+    SupplierOrderRaw = apps.get_model('core', 'SupplierOrderRaw')
+    SupplierOrderRaw.objects.filter(interpreted__isnull=False).update(status='transformed')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_raw_classification_flags'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='clientorderraw',
+            name='error_code',
+            field=models.CharField(blank=True, max_length=32, null=True),
+        ),
+        migrations.AddField(
+            model_name='clientorderraw',
+            name='last_attempt_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='clientorderraw',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('transformed', 'Transformed'), ('failed', 'Failed'), ('skipped', 'Skipped')], default='pending', max_length=16),
+        ),
+        migrations.AddField(
+            model_name='orderraw',
+            name='error_code',
+            field=models.CharField(blank=True, max_length=32, null=True),
+        ),
+        migrations.AddField(
+            model_name='orderraw',
+            name='last_attempt_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='orderraw',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('transformed', 'Transformed'), ('failed', 'Failed'), ('skipped', 'Skipped')], default='pending', max_length=16),
+        ),
+        migrations.AddField(
+            model_name='supplierorderraw',
+            name='error_code',
+            field=models.CharField(blank=True, max_length=32, null=True),
+        ),
+        migrations.AddField(
+            model_name='supplierorderraw',
+            name='last_attempt_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='supplierorderraw',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('transformed', 'Transformed'), ('failed', 'Failed'), ('skipped', 'Skipped')], default='pending', max_length=16),
+        ),
+        migrations.AddIndex(
+            model_name='clientorderraw',
+            index=models.Index(fields=['status', 'id'], name='client_raw_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='orderraw',
+            index=models.Index(fields=['status', 'id'], name='raw_order_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='supplierorderraw',
+            index=models.Index(fields=['status', 'id'], name='supplier_raw_status_idx'),
+        ),
+        migrations.RunPython(mark_transformed, migrations.RunPython.noop),
+    ]
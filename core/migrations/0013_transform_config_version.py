@@ -0,0 +1,42 @@
+# Generated by Django 5.2 on 2026-10-18 14:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_raw_transform_status'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SupplierTransformConfig',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.CharField(max_length=16, unique=True)),
+                ('mapping', models.JSONField(help_text='Column mappings of the transform')),
+                ('parsers_digest', models.CharField(help_text='Sha256 of the filters and parsers source', max_length=64)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Supplier Transform Config',
+                'verbose_name_plural': 'Supplier Transform Configs',
+            },
+        ),
+        migrations.AddField(
+            model_name='clientorderraw',
+            name='config_version',
+            field=models.CharField(blank=True, help_text='Version of the transform config of the last attempt', max_length=16, null=True),
+        ),
+        migrations.AddField(
+            model_name='orderraw',
+            name='config_version',
+            field=models.CharField(blank=True, help_text='Version of the transform config of the last attempt', max_length=16, null=True),
+        ),
+        migrations.AddField(
+            model_name='supplierorderraw',
+            name='config_version',
+            field=models.CharField(blank=True, help_text='Version of the transform config of the last attempt', max_length=16, null=True),
+        ),
+    ]
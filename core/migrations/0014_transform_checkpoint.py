@@ -0,0 +1,31 @@
+# Generated by Django 5.2 on 2026-10-18 14:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_transform_config_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TransformCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('started_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('config_version', models.CharField(max_length=16)),
+                ('last_raw_id', models.BigIntegerField(blank=True, help_text='Every raw up to this id has been processed (the raws are read by id)', null=True)),
+                ('counters', models.JSONField(default=dict, help_text='Counters and error aggregates of the report')),
+                ('seen_count', models.IntegerField(default=0)),
+                ('seen_digest', models.CharField(blank=True, help_text='Digest of the unique keys accepted, checked when resuming', max_length=64)),
+            ],
+            options={
+                'verbose_name': 'Transform Checkpoint',
+                'verbose_name_plural': 'Transform Checkpoints',
+            },
+        ),
+    ]
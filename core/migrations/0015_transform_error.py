@@ -0,0 +1,47 @@
+# Generated by Django 5.2 on 2026-10-18 14:38
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_transform_checkpoint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TransformError',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source_file', models.CharField(max_length=255)),
+                ('sheet_name', models.CharField(blank=True, max_length=255, null=True)),
+                ('row_index', models.IntegerField(blank=True, null=True)),
+                ('code', models.CharField(help_text='Stable code, see `errors.error_code`', max_length=32)),
+                ('filter', models.CharField(blank=True, help_text='Filter or step that rejected the raw', max_length=64, null=True)),
+                ('field', models.CharField(blank=True, max_length=255, null=True)),
+                ('value', models.CharField(blank=True, help_text='Offending value, as text', max_length=255, null=True)),
+                ('message', models.TextField()),
+                ('config_version', models.CharField(blank=True, max_length=16, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('raw', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='transform_errors', to='core.supplierorderraw')),
+            ],
+            options={
+                'verbose_name': 'Transform Error',
+                'verbose_name_plural': 'Transform Errors',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='transformerror',
+            index=models.Index(fields=['code', 'field'], name='transform_error_code_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transformerror',
+            index=models.Index(fields=['sheet_name', 'field'], name='transform_error_sheet_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transformerror',
+            index=models.Index(fields=['filter', 'field'], name='transform_error_filter_idx'),
+        ),
+    ]
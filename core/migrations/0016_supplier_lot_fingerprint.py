@@ -0,0 +1,78 @@
+# Generated by Django 5.2 on 2026-10-18 14:41
+
+import hashlib
+from datetime import datetime, timezone
+from decimal import Decimal
+
+from django.db import migrations, models
+
+UNIQUE_SUPPLIER_LOT = (
+    'date', 'supplier', 'order_no', 'number',
+    'stone', 'shape', 'color', 'size', 'carats',
+    'weight_per_piece', 'price_usd_per_ct',
+)
+
+
+# Copies of core.common.tools.row as of this migration : the backfill must not follow their changes
+def normalize_key(key) -> tuple:
+    normalized = []
+    for value in key:
+        if isinstance(value, datetime) and value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        if isinstance(value, datetime):
+            value = value.isoformat()
+        elif isinstance(value, Decimal):
+            value = format(value.normalize(), 'f')
+        normalized.append(value)
+    return tuple(normalized)
+
+
+def key_digest(key) -> bytes:
+    return hashlib.blake2b(repr(normalize_key(key)).encode(), digest_size=16).digest()
+
+
+def backfill_fingerprints(apps, schema_editor):
+    # La première commande d'un lot reçoit le fingerprint, les doublons restent à NULL
+    SupplierOrder = apps.get_model('core', 'SupplierOrder')
+    seen = set()
+    batch = []
+    rows = SupplierOrder.objects.order_by('pk').values_list('pk', *UNIQUE_SUPPLIER_LOT)
+    for pk, *values in rows.iterator(chunk_size=2000):
+        fingerprint = key_digest(tuple(values)).hex()
+        if fingerprint in seen:
+            continue
+        seen.add(fingerprint)
+        batch.append(SupplierOrder(pk=pk, lot_fingerprint=fingerprint))
+        if len(batch) >= 2000:
+            SupplierOrder.objects.bulk_update(batch, ['lot_fingerprint'])
+            batch.clear()
+    SupplierOrder.objects.bulk_update(batch, ['lot_fingerprint'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_transform_error'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='supplierorder',
+            name='lot_fingerprint',
+            field=models.CharField(blank=True, editable=False, help_text='Hash of the normalized UNIQUE_SUPPLIER_LOT fields', max_length=32, null=True),
+        ),
+        migrations.RunPython(backfill_fingerprints, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='supplierorder',
+            name='lot_fingerprint',
+            field=models.CharField(blank=True, editable=False, help_text='Hash of the normalized UNIQUE_SUPPLIER_LOT fields', max_length=32, null=True, unique=True),
+        ),
+        migrations.RemoveConstraint(
+            model_name='supplierorder',
+            name='unique_supplier_lot',
+        ),
+        migrations.AlterUniqueTogether(
+            name='supplierorder',
+            unique_together=set(),
+        ),
+    ]
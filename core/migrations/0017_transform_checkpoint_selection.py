@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-18 14:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_supplier_lot_fingerprint'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='transformcheckpoint',
+            name='selection',
+            field=models.JSONField(blank=True, default=dict, help_text='Options selecting the raws of the run, the same are required to resume it'),
+        ),
+    ]
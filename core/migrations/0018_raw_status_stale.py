@@ -0,0 +1,28 @@
+# Generated by Django 5.2 on 2026-10-18 14:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0017_transform_checkpoint_selection'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='clientorderraw',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('transformed', 'Transformed'), ('failed', 'Failed'), ('skipped', 'Skipped'), ('stale', 'Stale')], default='pending', max_length=16),
+        ),
+        migrations.AlterField(
+            model_name='orderraw',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('transformed', 'Transformed'), ('failed', 'Failed'), ('skipped', 'Skipped'), ('stale', 'Stale')], default='pending', max_length=16),
+        ),
+        migrations.AlterField(
+            model_name='supplierorderraw',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('transformed', 'Transformed'), ('failed', 'Failed'), ('skipped', 'Skipped'), ('stale', 'Stale')], default='pending', max_length=16),
+        ),
+    ]
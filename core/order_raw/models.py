@@ -1,9 +1,63 @@
 from django.db import models
 from django.core.serializers.json import DjangoJSONEncoder
 
+from core.common.tools.row import expand_row, hash_columns
+
 UNIQUE_SUPPLIER_LOT =('source_file', 'sheet_name', 'row_index')
 
-class OrderRaw(models.Model):
+
+class RawStatus(models.TextChoices):
+    """Transform state of a raw row (the work queue of `transform_supplier_orders`)."""
+    PENDING     = 'pending', 'Pending'
+    TRANSFORMED = 'transformed', 'Transformed'
+    FAILED      = 'failed', 'Failed'
+    SKIPPED     = 'skipped', 'Skipped'
+    # Transformed, then changed by a re-import : its order is out of date
+    STALE       = 'stale', 'Stale'
+
+
+class RawSheetHeader(models.Model):
+    """
+    Column names of an imported sheet, stored once and shared by its compact raw rows.
+    """
+    class Meta:
+        verbose_name = "Raw Sheet Header"
+        verbose_name_plural = "Raw Sheet Headers"
+
+    digest      = models.CharField(max_length=64, unique=True)
+    columns     = models.JSONField(help_text="Column names, in the sheet order")
+
+    @classmethod
+    def for_columns(cls, columns):
+        columns = [str(c) for c in columns]
+        header, _ = cls.objects.get_or_create(
+            digest=hash_columns(columns),
+            defaults={'columns': columns},
+        )
+        return header
+
+    def __str__(self):
+        return f"Header #{self.id} ({len(self.columns)} columns)"
+
+
+class CompactRawMixin:
+    """
+    Give access to the row as a dict, whether it is stored as `data`
+    or compacted as `header` + `cells`.
+    """
+    @property
+    def payload(self) -> dict:
+        if self.data is not None:
+            return self.data
+        cache = self.__dict__.get('_payload_cache')
+        if cache is None or cache[0] is not self.cells:
+            columns = self.header.columns if self.header_id else []
+            cache = (self.cells, expand_row(columns, self.cells or {}))
+            self.__dict__['_payload_cache'] = cache
+        return cache[1]
+
+
+class OrderRaw(CompactRawMixin, models.Model):
     """
     Raw data just as the file imported.
     """
@@ -15,15 +69,39 @@ class OrderRaw(models.Model):
                 name='unique_raw_order_lot'
             )
         ]
+        indexes = [models.Index(fields=['status', 'id'], name='raw_order_status_idx')]
         
     source_file = models.CharField(max_length=255)
     sheet_name  = models.CharField(max_length=255, blank=True, null=True)
     row_index   = models.IntegerField(blank=True, null=True)
     data        = models.JSONField(
                     help_text="Raw data from Excel line",
-                    encoder=DjangoJSONEncoder)
+                    encoder=DjangoJSONEncoder,
+                    blank=True, null=True)
+    header      = models.ForeignKey(
+                    RawSheetHeader,
+                    on_delete=models.PROTECT,
+                    related_name='+',
+                    blank=True, null=True)
+    cells       = models.JSONField(
+                    help_text="Compact raw data : non empty cells keyed by their column position",
+                    blank=True, null=True)
+    data_hash   = models.CharField(
+                    max_length=64, blank=True, null=True,
+                    help_text="Sha256 of the raw data, to detect edited rows on re-import")
+    # Verdicts computed at import (None : not classified yet, see `classify_raw`)
+    is_purchase = models.BooleanField(blank=True, null=True, db_index=True)
+    is_canceled = models.BooleanField(blank=True, null=True, db_index=True)
+    is_empty    = models.BooleanField(blank=True, null=True, db_index=True)
+    # Transform outcome : pending rows are the work queue, failed ones are retried on demand
+    status          = models.CharField(max_length=16, choices=RawStatus.choices, default=RawStatus.PENDING)
+    error_code      = models.CharField(max_length=32, blank=True, null=True)
+    last_attempt_at = models.DateTimeField(blank=True, null=True)
+    config_version  = models.CharField(
+                        max_length=16, blank=True, null=True,
+                        help_text="Version of the transform config of the last attempt")
 
-class SupplierOrderRaw(models.Model):
+class SupplierOrderRaw(CompactRawMixin, models.Model):
     class Meta:
         unique_together = UNIQUE_SUPPLIER_LOT
         constraints = [
@@ -32,6 +110,7 @@ class SupplierOrderRaw(models.Model):
                 name='unique_supplier_raw_order_lot'
             )
         ]
+        indexes = [models.Index(fields=['status', 'id'], name='supplier_raw_status_idx')]
         verbose_name = "Raw Supplier Order"
         verbose_name_plural = "Raw Supplier Orders"
         
@@ -40,13 +119,36 @@ class SupplierOrderRaw(models.Model):
     row_index   = models.IntegerField(blank=True, null=True)
     data        = models.JSONField(
                     help_text="Raw data from Excel line",
-                    encoder=DjangoJSONEncoder)
+                    encoder=DjangoJSONEncoder,
+                    blank=True, null=True)
+    header      = models.ForeignKey(
+                    RawSheetHeader,
+                    on_delete=models.PROTECT,
+                    related_name='+',
+                    blank=True, null=True)
+    cells       = models.JSONField(
+                    help_text="Compact raw data : non empty cells keyed by their column position",
+                    blank=True, null=True)
+    data_hash   = models.CharField(
+                    max_length=64, blank=True, null=True,
+                    help_text="Sha256 of the raw data, to detect edited rows on re-import")
+    # Verdicts computed at import (None : not classified yet, see `classify_raw`)
+    is_purchase = models.BooleanField(blank=True, null=True, db_index=True)
+    is_canceled = models.BooleanField(blank=True, null=True, db_index=True)
+    is_empty    = models.BooleanField(blank=True, null=True, db_index=True)
+    # Transform outcome : pending rows are the work queue, failed ones are retried on demand
+    status          = models.CharField(max_length=16, choices=RawStatus.choices, default=RawStatus.PENDING)
+    error_code      = models.CharField(max_length=32, blank=True, null=True)
+    last_attempt_at = models.DateTimeField(blank=True, null=True)
+    config_version  = models.CharField(
+                        max_length=16, blank=True, null=True,
+                        help_text="Version of the transform config of the last attempt")
 
     def __str__(self):
         return f"RawSupplier #{self.id} – row {self.row_index}"
 
 
-class ClientOrderRaw(models.Model):
+class ClientOrderRaw(CompactRawMixin, models.Model):
     class Meta:
         unique_together = UNIQUE_SUPPLIER_LOT
         constraints = [
@@ -55,6 +157,7 @@ class ClientOrderRaw(models.Model):
                 name='unique_client_raw_order_lot'
             )
         ]
+        indexes = [models.Index(fields=['status', 'id'], name='client_raw_status_idx')]
         verbose_name = "Raw Client Order"
         verbose_name_plural = "Raw Client Orders"
 
@@ -63,10 +166,96 @@ class ClientOrderRaw(models.Model):
     row_index   = models.IntegerField(blank=True, null=True)
     data        = models.JSONField(
                     help_text="Raw data from Excel line",
-                    encoder=DjangoJSONEncoder)
+                    encoder=DjangoJSONEncoder,
+                    blank=True, null=True)
+    header      = models.ForeignKey(
+                    RawSheetHeader,
+                    on_delete=models.PROTECT,
+                    related_name='+',
+                    blank=True, null=True)
+    cells       = models.JSONField(
+                    help_text="Compact raw data : non empty cells keyed by their column position",
+                    blank=True, null=True)
+    data_hash   = models.CharField(
+                    max_length=64, blank=True, null=True,
+                    help_text="Sha256 of the raw data, to detect edited rows on re-import")
+    # Verdicts computed at import (None : not classified yet, see `classify_raw`)
+    is_purchase = models.BooleanField(blank=True, null=True, db_index=True)
+    is_canceled = models.BooleanField(blank=True, null=True, db_index=True)
+    is_empty    = models.BooleanField(blank=True, null=True, db_index=True)
+    # Transform outcome : pending rows are the work queue, failed ones are retried on demand
+    status          = models.CharField(max_length=16, choices=RawStatus.choices, default=RawStatus.PENDING)
+    error_code      = models.CharField(max_length=32, blank=True, null=True)
+    last_attempt_at = models.DateTimeField(blank=True, null=True)
+    config_version  = models.CharField(
+                        max_length=16, blank=True, null=True,
+                        help_text="Version of the transform config of the last attempt")
 
 
        
     def __str__(self):
         return f"RawClient #{self.id} – row {self.row_index}"
 
+
+
+class RawImportManifest(models.Model):
+    """
+    Fingerprint of an imported sheet, used to skip unchanged sheets on re-import.
+    """
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['raw_model', 'source_file', 'sheet_name'],
+                name='unique_raw_import_manifest'
+            )
+        ]
+        verbose_name = "Raw Import Manifest"
+        verbose_name_plural = "Raw Import Manifests"
+
+    raw_model   = models.CharField(max_length=50)
+    source_file = models.CharField(max_length=255)
+    sheet_name  = models.CharField(max_length=255)
+    file_hash   = models.CharField(max_length=64)
+    sheet_hash  = models.CharField(max_length=64)
+    imported_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Manifest {self.source_file} – {self.sheet_name}"
+
+
+class ImportJob(models.Model):
+    """
+    Import of an uploaded file, queued by the web UI and run by `run_import_worker`.
+    """
+    class Status(models.TextChoices):
+        PENDING = 'pending', 'Pending'
+        RUNNING = 'running', 'Running'
+        DONE    = 'done', 'Done'
+        FAILED  = 'failed', 'Failed'
+
+    class Meta:
+        constraints = [
+            # Two imports of the same file can not run at once
+            models.UniqueConstraint(
+                fields=['lock_key'],
+                condition=models.Q(status='running'),
+                name='unique_running_import_job'
+            )
+        ]
+        verbose_name = "Import Job"
+        verbose_name_plural = "Import Jobs"
+
+    file_path     = models.CharField(max_length=500, help_text="Where the uploaded file is saved")
+    original_name = models.CharField(max_length=255)
+    order_type    = models.CharField(max_length=20, default='supplier')
+    lock_key      = models.CharField(max_length=300)
+    status        = models.CharField(max_length=10, choices=Status.choices, default=Status.PENDING, db_index=True)
+    progress      = models.JSONField(default=dict, blank=True, encoder=DjangoJSONEncoder)
+    report        = models.JSONField(blank=True, null=True, encoder=DjangoJSONEncoder)
+    error         = models.TextField(blank=True, default="")
+    created_at    = models.DateTimeField(auto_now_add=True)
+    started_at    = models.DateTimeField(blank=True, null=True)
+    finished_at   = models.DateTimeField(blank=True, null=True)
+
+    def __str__(self):
+        return f"ImportJob #{self.id} – {self.original_name} ({self.status})"
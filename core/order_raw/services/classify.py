@@ -0,0 +1,36 @@
+from core.common.services.filters.canceled import find_canceled
+from core.common.tools.row import get_value_mapped
+from core.supplier_order.mapping import RAW_SUPPLIER_COLUMN_MAPPING, SUPPLIER_COLUMN_MAPPING
+from core.supplier_order.services.filters.is_purchase import memo_error
+
+CLASSIFICATION_FIELDS = ['is_purchase', 'is_canceled', 'is_empty']
+
+# Every column read by the transform
+MAPPED_COLUMNS = {alias for aliases in SUPPLIER_COLUMN_MAPPING.values() for alias in aliases}
+
+
+def _has_value(value) -> bool:
+    return value not in (None, "") and not (type(value) is float and value != value)
+
+
+def classify_row(payload: dict) -> dict:
+    """
+    Verdicts of the transform filters that only depend on the raw row, stored at
+    import so the transform can leave these rows out in SQL.
+
+    Returns:
+        dict with `is_purchase` (IsPurchaseFilter), `is_canceled` (CanceledFieldFilter)
+        and `is_empty` (no value in any mapped column). None when unknown.
+    """
+    try:
+        is_purchase = memo_error(
+            get_value_mapped(payload, "client_memo", RAW_SUPPLIER_COLUMN_MAPPING)
+        ) is None
+    except AttributeError:
+        # Mémo non textuel : laissé au filtre, qui donnera l'erreur
+        is_purchase = None
+    return {
+        'is_purchase': is_purchase,
+        'is_canceled': find_canceled(payload) is not None,
+        'is_empty': not any(_has_value(payload[col]) for col in MAPPED_COLUMNS if col in payload),
+    }
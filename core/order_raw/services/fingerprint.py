@@ -0,0 +1,77 @@
+import hashlib
+import posixpath
+import re
+import zipfile
+import xml.etree.ElementTree as ET
+
+NS_MAIN = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+NS_REL = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+NS_PKG_REL = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+
+# Cells of type shared string : <c r="A1" t="s"><v>12</v></c>
+SHARED_STRING_REF = re.compile(rb'<(?:\w+:)?c\b[^>]*?\bt="s"[^>]*>\s*<(?:\w+:)?v>(\d+)<')
+
+
+def file_digest(file_path, chunk_size=1 << 20) -> str:
+    """Sha256 of the whole file content."""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _sheet_parts(zf):
+    """Map sheet name -> worksheet part path inside the xlsx archive."""
+    workbook = ET.fromstring(zf.read('xl/workbook.xml'))
+    rels = ET.fromstring(zf.read('xl/_rels/workbook.xml.rels'))
+    targets = {
+        rel.get('Id'): rel.get('Target')
+        for rel in rels.iter(f'{NS_PKG_REL}Relationship')
+    }
+    parts = {}
+    for sheet in workbook.iter(f'{NS_MAIN}sheet'):
+        target = targets.get(sheet.get(f'{NS_REL}id'))
+        if target is None:
+            continue
+        if target.startswith('/'):
+            parts[sheet.get('name')] = target.lstrip('/')
+        else:
+            parts[sheet.get('name')] = posixpath.normpath(posixpath.join('xl', target))
+    return parts
+
+
+def _shared_strings(zf):
+    try:
+        root = ET.fromstring(zf.read('xl/sharedStrings.xml'))
+    except KeyError:
+        return []
+    return [''.join(si.itertext()).encode() for si in root.iter(f'{NS_MAIN}si')]
+
+
+def sheet_digests(file_path):
+    """
+    Compute a sha256 per sheet of an xlsx workbook without parsing its cells :
+    the worksheet XML part plus the shared strings it references.
+
+    Returns:
+        dict (sheet_name -> digest), or None if the file is not an xlsx archive.
+    """
+    if not zipfile.is_zipfile(file_path):
+        return None
+    with zipfile.ZipFile(file_path) as zf:
+        try:
+            parts = _sheet_parts(zf)
+        except KeyError:
+            return None
+        shared = _shared_strings(zf)
+        digests = {}
+        for name, part in parts.items():
+            xml = zf.read(part)
+            digest = hashlib.sha256(xml)
+            for ref in SHARED_STRING_REF.findall(xml):
+                i = int(ref)
+                digest.update(b'\x00')
+                digest.update(shared[i] if i < len(shared) else b'')
+            digests[name] = digest.hexdigest()
+    return digests
@@ -1,18 +1,63 @@
 import pandas as pd
 import numpy as np
 import numbers
+import multiprocessing
+from collections import deque
+from queue import Empty
+from concurrent.futures import ProcessPoolExecutor
 from datetime import date, datetime
 from django.db import transaction
 
-from core.order_raw.models import OrderRaw, SupplierOrderRaw, ClientOrderRaw
+from core.order_raw.models import (
+    OrderRaw, SupplierOrderRaw, ClientOrderRaw, RawImportManifest, RawSheetHeader, RawStatus
+)
+from core.order_raw.services.fingerprint import file_digest, sheet_digests
+from core.common.services.progress import ProgressTracker
+from core.order_raw.services.classify import CLASSIFICATION_FIELDS, classify_row
+from core.common.tools.row import compact_row, hash_row
+from core.order_raw.services.readers import (
+    MIN_MEANINGFUL_VALUES, csv_sheet_name, has_meaningful_data, is_csv_file,
+    parse_sheet, qualify_frame, sheet_names, stream_csv_rows, stream_excel_sheets,
+)
 
 class OrderRawImportService:
     """
-    Import all rows from an Excel into OrderRaw.
+    Import all rows from an Excel (or CSV / TSV) into OrderRaw.
+
+    Rows are upserted on (source_file, sheet_name, row_index) : a row already
+    imported is only rewritten when the hash of its data changed, and the rows
+    no longer in a re-imported sheet are deleted.
+
+    Args:
+        file_path (str): Path of the file to import.
+        order_type (str): Type of order [supplier, client, other].
+        streaming (bool, optional): Read the workbook row by row (openpyxl read-only)
+            instead of loading every sheet with pandas. Defaults to False.
+        batch_size (int, optional): Number of rows saved per `bulk_create`. Defaults to 500.
+        force (bool, optional): Import every sheet, even the ones whose fingerprint
+            is unchanged since the last import. Defaults to False.
+        workers (int, optional): Number of processes parsing the sheets in parallel.
+            The database writes stay in the current process. Defaults to 1.
+        compact (bool, optional): Store the rows as `header` + `cells` (header saved
+            once per sheet, empty cells omitted) instead of a full `data` dict.
+            Defaults to True.
+        source_name (str, optional): Name saved as `source_file` on the rows, e.g. the
+            original name of an uploaded file. Defaults to `file_path`.
+        progress (callable, optional): Receive the progress events of each sheet
+            (see `ProgressTracker`). Defaults to None.
     """
 
-    def __init__(self, file_path: str, order_type: str):
+    def __init__(self, file_path: str, order_type: str, streaming=False, batch_size=500, force=False,
+                 workers=1, compact=True, source_name=None, progress=None):
         self.file_path = file_path
+        self.source_file = source_name or file_path
+        self.streaming = streaming
+        self.batch_size = batch_size
+        self.force = force
+        self.workers = workers
+        self.compact = compact
+        self._headers = {}
+        self.progress = ProgressTracker(progress, stage='import')
         if order_type == 'supplier':
             self.order_model = SupplierOrderRaw 
         elif order_type == 'client':
@@ -25,53 +70,253 @@ class OrderRawImportService:
             return ""
         return str(v)
         
-    def _has_meaningful_data(self, payload: dict, N=3) -> bool:
+    def _has_meaningful_data(self, payload: dict, N=MIN_MEANINGFUL_VALUES) -> bool:
         """
         Check if a row have at least 'N' valuable information. (not empty and not None, null, NaN or 0, .0)
         """
-        n = 0
-        for v in payload.values():
-            if v is None or (isinstance(v, str) and v == ""):
-                continue
-            if isinstance(v, str):
-                try:
-                    if float(v) == 0:
-                        continue
-                    if len(v) < 2:
-                        continue
-                    n+=1
-                except ValueError:
-                    n+=1
-            if isinstance(v, numbers.Number):
-                if v == 0:
+        return has_meaningful_data(payload, N)
+
+    def _qualify_rows(self, rows):
+        for idx, payload in rows:
+            yield idx, (payload if self._has_meaningful_data(payload) else None)
+
+    def _read_sheets(self, skip):
+        with pd.ExcelFile(self.file_path) as xls:
+            for sheet_name in xls.sheet_names:
+                if skip(sheet_name):
                     continue
-                n+=1
-            if n >=N:
-                return True
-        return False
-    
-    
+                yield sheet_name, qualify_frame(xls.parse(sheet_name))
+
+    def _pool_rows(self, queue, future):
+        while (batch := queue.get()) is not None:
+            columns, rows = batch
+            for idx, values in rows:
+                yield idx, (dict(zip(columns, values)) if values is not None else None)
+        # Erreur du worker levée ici
+        future.result()
+
+    def _drain(self, queue, future):
+        while not future.done():
+            try:
+                if queue.get(timeout=0.1) is None:
+                    return
+            except Empty:
+                pass
+
+    def _parse_sheets_in_pool(self, skip):
+        """
+        Sheets parsed by the workers and sent back by batches of `batch_size` rows,
+        read in the sheet order. At most 2 x workers sheets are in flight, each with
+        a queue of 2 batches : the parent never holds more than a few batches.
+        """
+        names = iter([name for name in sheet_names(self.file_path) if not skip(name)])
+        ctx = multiprocessing.get_context('spawn')
+        with ctx.Manager() as manager, ProcessPoolExecutor(max_workers=self.workers, mp_context=ctx) as pool:
+            stop = manager.Event()
+            in_flight = deque()
+            current = None
+
+            def submit():
+                sheet_name = next(names, None)
+                if sheet_name is not None:
+                    queue = manager.Queue(maxsize=2)
+                    future = pool.submit(parse_sheet, self.file_path, sheet_name, queue, stop,
+                                         self.streaming, self.batch_size)
+                    in_flight.append((sheet_name, queue, future))
+
+            try:
+                for _ in range(2 * self.workers):
+                    submit()
+                while in_flight:
+                    current = in_flight.popleft()
+                    submit()
+                    yield current[0], self._pool_rows(*current[1:])
+                current = None
+            finally:
+                # Import interrompu : les workers bloqués sur leur queue pleine s'arrêtent
+                stop.set()
+                for _, queue, future in ([current] if current else []) + list(in_flight):
+                    if not future.cancel():
+                        self._drain(queue, future)
+
+    def _iter_sheets(self, skip):
+        """
+        Yields:
+            (sheet_name, rows) where `rows` is an iterator of (row_index, payload),
+            `payload` being None for the rows without enough meaningful data.
+        """
+        if is_csv_file(self.file_path):
+            sheet_name = csv_sheet_name(self.source_file)
+            if not skip(sheet_name):
+                yield sheet_name, stream_csv_rows(self.file_path, chunk_size=self.batch_size)
+        elif self.workers > 1:
+            yield from self._parse_sheets_in_pool(skip)
+        elif self.streaming:
+            for sheet_name, rows in stream_excel_sheets(self.file_path, skip=skip):
+                yield sheet_name, self._qualify_rows(rows)
+        else:
+            yield from self._read_sheets(skip)
+
+    def _load_fingerprints(self):
+        self._file_hash = file_digest(self.file_path)
+        self._manifest = {
+            m.sheet_name: m
+            for m in RawImportManifest.objects.filter(
+                raw_model=self.order_model._meta.model_name,
+                source_file=self.source_file,
+            )
+        }
+        if self._manifest and all(m.file_hash == self._file_hash for m in self._manifest.values()):
+            # Same file : no need to look inside the workbook
+            self._sheet_hashes = {name: m.sheet_hash for name, m in self._manifest.items()}
+        else:
+            # Formats without sheet fingerprint fall back on the file hash
+            self._sheet_hashes = sheet_digests(self.file_path) or {}
+
+    def _sheet_hash(self, sheet_name):
+        return self._sheet_hashes.get(sheet_name, self._file_hash)
+
+    def _is_unchanged(self, sheet_name):
+        if self.force:
+            return False
+        manifest = self._manifest.get(sheet_name)
+        return manifest is not None and manifest.sheet_hash == self._sheet_hash(sheet_name)
+
+    def _save_fingerprint(self, sheet_name):
+        RawImportManifest.objects.update_or_create(
+            raw_model=self.order_model._meta.model_name,
+            source_file=self.source_file,
+            sheet_name=sheet_name,
+            defaults={
+                'file_hash': self._file_hash,
+                'sheet_hash': self._sheet_hash(sheet_name),
+            },
+        )
+
+    def _storage_fields(self, payload):
+        if not self.compact:
+            return {'data': payload, 'header': None, 'cells': None}
+        columns, cells = compact_row(payload)
+        key = tuple(columns)
+        header = self._headers.get(key)
+        if header is None:
+            header = self._headers[key] = RawSheetHeader.for_columns(columns)
+        return {'data': None, 'header': header, 'cells': cells}
+
+    def _flush(self, sheet_name, batch, report, has_existing=True):
+        if not batch:
+            return
+        existing = {}
+        if has_existing:
+            existing = {
+                row_index: (pk, data_hash, status)
+                for pk, row_index, data_hash, status in self.order_model.objects.filter(
+                    source_file=self.source_file,
+                    sheet_name=sheet_name,
+                    row_index__in=[idx for idx, _ in batch],
+                ).values_list('id', 'row_index', 'data_hash', 'status')
+            }
+        to_create, to_update = [], []
+        for idx, payload in batch:
+            data_hash = hash_row(payload)
+            if idx not in existing:
+                to_create.append(self.order_model(
+                    source_file=self.source_file,
+                    sheet_name=sheet_name,
+                    row_index=idx,
+                    data_hash=data_hash,
+                    **self._storage_fields(payload),
+                    **classify_row(payload),
+                ))
+            elif existing[idx][1] != data_hash:
+                pk, _, status = existing[idx]
+                # Ligne modifiée : à transformer de nouveau, sa commande éventuelle est périmée
+                if status in (RawStatus.TRANSFORMED, RawStatus.STALE):
+                    status = RawStatus.STALE
+                    report['stale_transformed'] += 1
+                else:
+                    status = RawStatus.PENDING
+                to_update.append(self.order_model(
+                    id=pk,
+                    data_hash=data_hash,
+                    status=status,
+                    **self._storage_fields(payload),
+                    **classify_row(payload),
+                ))
+            else:
+                report['unchanged'] += 1
+
+        with transaction.atomic():
+            self.order_model.objects.bulk_create(to_create, batch_size=self.batch_size)
+            self.order_model.objects.bulk_update(
+                to_update, ['data', 'header', 'cells', 'data_hash', 'status', *CLASSIFICATION_FIELDS],
+                batch_size=self.batch_size)
+        report['inserted'] += len(to_create)
+        report['updated'] += len(to_update)
+        report['imported'] += len(to_create) + len(to_update)
+        self.progress.add(batches_flushed=1)
+        batch.clear()
+
+    def _remove_missing_rows(self, sheet_name, seen, report, chunk_size=500):
+        """
+        Delete the raws of a re-imported sheet whose row is gone or no longer has
+        meaningful data, with the orders transformed from them.
+        """
+        removed = [
+            pk for pk, row_index in self.order_model.objects.filter(
+                source_file=self.source_file, sheet_name=sheet_name,
+            ).values_list('id', 'row_index').iterator()
+            if row_index not in seen
+        ]
+        # Les commandes protègent leur raw (on_delete=PROTECT) : supprimées d'abord
+        orders = [rel for rel in self.order_model._meta.related_objects if rel.one_to_one]
+        with transaction.atomic():
+            for start in range(0, len(removed), chunk_size):
+                chunk = removed[start:start + chunk_size]
+                for rel in orders:
+                    deleted, _ = rel.related_model.objects.filter(**{f"{rel.field.name}__in": chunk}).delete()
+                    report['removed_orders'] += deleted
+                self.order_model.objects.filter(pk__in=chunk).delete()
+        report['removed'] += len(removed)
+
     def run(self) -> dict:
-        report = {'imported': 0, 'skipped': 0, 'failed': []}
-        sheets = pd.read_excel(self.file_path, sheet_name=None)
-
-        for sheet_name, df in sheets.items():
-            instances = []
-            for idx, row in df.iterrows():
-                payload = {k: self._serialize_value(v) for k, v in row.to_dict().items()}
-                if self._has_meaningful_data(payload):
-                    instances.append(self.order_model(
-                        source_file=self.file_path,
-                        sheet_name=sheet_name,
-                        row_index=idx,
-                        data=payload
-                    ))
+        report = {
+            'imported': 0, 'inserted': 0, 'updated': 0, 'unchanged': 0,
+            # Updated rows whose order is out of date (status STALE, transformed again)
+            'stale_transformed': 0,
+            # Rows of a re-imported sheet that are gone (or now skipped), and their orders
+            'removed': 0, 'removed_orders': 0,
+            'skipped': 0, 'failed': [], 'unchanged_sheets': [],
+        }
+        self._load_fingerprints()
+
+        def skip(sheet_name):
+            if self._is_unchanged(sheet_name):
+                report['unchanged_sheets'].append(sheet_name)
+                return True
+            return False
+
+        for sheet_name, rows in self._iter_sheets(skip):
+            has_existing = self.order_model.objects.filter(
+                source_file=self.source_file, sheet_name=sheet_name
+            ).exists()
+            self.progress.start_sheet(sheet_name)
+            batch = []
+            seen = set()
+            for idx, payload in rows:
+                if payload is not None:
+                    batch.append((idx, payload))
+                    seen.add(idx)
+                    self.progress.add(rows_read=1, rows_qualified=1)
                 else:
                     report['skipped']+=1
-            with transaction.atomic():
-                self.order_model.objects.bulk_create(instances, batch_size=500)
-            report['imported'] += len(instances)
+                    self.progress.add(rows_read=1)
+                if len(batch) >= self.batch_size:
+                    self._flush(sheet_name, batch, report, has_existing)
+            self._flush(sheet_name, batch, report, has_existing)
+            if has_existing:
+                self._remove_missing_rows(sheet_name, seen, report)
+            self._save_fingerprint(sheet_name)
+        self.progress.finish()
 
         return report
-
-
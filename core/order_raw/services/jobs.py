@@ -0,0 +1,113 @@
+import logging
+import os
+import uuid
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from core.order_raw.models import ImportJob, RawStatus, SupplierOrderRaw
+from core.order_raw.services.imports import OrderRawImportService
+from core.supplier_order.services.transform import SupplierOrderTransformer
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue_import(uploaded_file, order_type='supplier') -> ImportJob:
+    """
+    Save an uploaded file on disk and queue its import.
+    """
+    directory = settings.IMPORT_UPLOAD_DIR
+    os.makedirs(directory, exist_ok=True)
+    original_name = os.path.basename(uploaded_file.name)
+    file_path = os.path.join(directory, f"{uuid.uuid4().hex}_{original_name}")
+    with open(file_path, 'wb') as f:
+        for chunk in uploaded_file.chunks():
+            f.write(chunk)
+
+    return ImportJob.objects.create(
+        file_path=file_path,
+        original_name=original_name,
+        order_type=order_type,
+        lock_key=f"{order_type}:{original_name}",
+    )
+
+
+def claim_next_job():
+    """
+    Mark the oldest pending job as running and return it.
+    Jobs whose file is already being imported by another worker are left pending.
+
+    Returns:
+        ImportJob or None if there is nothing to run.
+    """
+    pending = ImportJob.objects.filter(status=ImportJob.Status.PENDING).order_by('created_at', 'id')
+    for job in pending:
+        try:
+            with transaction.atomic():
+                claimed = ImportJob.objects.filter(
+                    pk=job.pk, status=ImportJob.Status.PENDING
+                ).update(status=ImportJob.Status.RUNNING, started_at=timezone.now())
+        except IntegrityError:
+            # Same file already running
+            continue
+        if claimed:
+            job.refresh_from_db()
+            return job
+    return None
+
+
+def _remove_upload(file_path):
+    try:
+        os.remove(file_path)
+    except FileNotFoundError:
+        pass
+
+
+def _update_job(job, **fields):
+    for name, value in fields.items():
+        setattr(job, name, value)
+    job.save(update_fields=list(fields))
+
+
+def run_job(job: ImportJob) -> ImportJob:
+    """
+    Import the raw rows of the job file, then transform them for supplier orders.
+    The progress events of both steps are saved on `job.progress` (throttled by `ProgressTracker`).
+    The uploaded file is deleted once the job is done, and kept when it failed so the
+    job can be run again.
+    """
+    def publish(event):
+        _update_job(job, progress=event)
+
+    try:
+        _update_job(job, progress={'stage': 'import'})
+        service = OrderRawImportService(
+            job.file_path, job.order_type, source_name=job.original_name, progress=publish
+        )
+        report = {'import': service.run()}
+
+        if job.order_type == 'supplier':
+            _update_job(job, progress={'stage': 'transform'})
+            queryset = SupplierOrderRaw.objects.filter(
+                status__in=[RawStatus.PENDING, RawStatus.STALE], source_file=job.original_name
+            )
+            report['transform'] = SupplierOrderTransformer(progress=publish).run(queryset=queryset)
+
+        _update_job(
+            job,
+            status=ImportJob.Status.DONE,
+            progress={'stage': 'done'},
+            report=report,
+            finished_at=timezone.now(),
+        )
+        _remove_upload(job.file_path)
+    except Exception as e:
+        logger.exception("Import job #%s (%s) failed", job.id, job.original_name)
+        _update_job(
+            job,
+            status=ImportJob.Status.FAILED,
+            error=str(e),
+            finished_at=timezone.now(),
+        )
+    return job
@@ -0,0 +1,294 @@
+import codecs
+import csv
+import math
+import numbers
+import os
+from itertools import zip_longest
+
+import numpy as np
+import openpyxl
+import pandas as pd
+from charset_normalizer import from_bytes
+from openpyxl.cell.cell import ERROR_CODES
+
+# Minimum number of valuable cells for a row to be imported.
+MIN_MEANINGFUL_VALUES = 3
+
+CSV_EXTENSIONS = {'.csv', '.tsv', '.tab', '.txt'}
+
+# Text cells pandas turns into NaN when reading a sheet (default `na_values`).
+NA_STRINGS = {
+    "", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan",
+    "1.#IND", "1.#QNAN", "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a",
+    "nan", "null",
+}
+
+
+def is_meaningful_value(v) -> bool:
+    """
+    Check if a cell hold a valuable information (not empty and not None, null, NaN or 0, .0).
+    Numeric strings need at least 2 characters.
+    """
+    if v is None or (isinstance(v, str) and v == ""):
+        return False
+    if isinstance(v, str):
+        try:
+            return float(v) != 0 and len(v) >= 2
+        except ValueError:
+            return True
+    if isinstance(v, numbers.Number):
+        return v != 0
+    return False
+
+
+def has_meaningful_data(payload: dict, min_values=MIN_MEANINGFUL_VALUES) -> bool:
+    """Check if a row have at least `min_values` valuable information."""
+    n = 0
+    for v in payload.values():
+        if is_meaningful_value(v):
+            n += 1
+            if n >= min_values:
+                return True
+    return False
+
+
+def _qualify_values(df, min_values):
+    values = df.astype(object).astype(str).to_numpy()
+    values[df.isna().to_numpy()] = ""
+
+    if values.size:
+        codes, uniques = pd.factorize(values.ravel())
+        meaningful = np.fromiter(
+            (is_meaningful_value(u) for u in uniques), dtype=bool, count=len(uniques)
+        )
+        counts = meaningful[codes].reshape(values.shape).sum(axis=1)
+        keep = counts >= min_values
+    else:
+        keep = np.zeros(len(df), dtype=bool)
+    return values, keep
+
+
+def qualify_frame(df, min_values=MIN_MEANINGFUL_VALUES):
+    """
+    Serialize a whole sheet column-wise and keep the rows with at least
+    `min_values` meaningful cells.
+
+    Cells are converted with `str` (NaN -> ""), then the meaningful test is
+    evaluated once per distinct value and broadcast back with NumPy.
+
+    Yields:
+        (row_index, payload) where `payload` is None for skipped rows.
+    """
+    columns = list(df.columns)
+    values, keep = _qualify_values(df, min_values)
+    for idx, kept, row in zip(df.index, keep, values):
+        yield idx, (dict(zip(columns, row)) if kept else None)
+
+
+def _make_header(values):
+    """
+    Build column names the same way `pd.read_excel` does :
+    empty header -> 'Unnamed: i', duplicated header -> 'name.1', 'name.2', ...
+    """
+    header = []
+    seen = {}
+    for i, v in enumerate(values):
+        name = f"Unnamed: {i}" if v is None else str(v)
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        else:
+            seen[name] = 0
+        header.append(name)
+    return header
+
+
+def _convert_cell(v):
+    """Normalize an openpyxl cell value like pandas' openpyxl reader does."""
+    if v is None:
+        return None
+    if isinstance(v, str):
+        if v in NA_STRINGS or v in ERROR_CODES:
+            return None
+        return v
+    if isinstance(v, float):
+        if math.isnan(v):
+            return None
+        if v.is_integer():
+            return int(v)
+    return v
+
+
+def _stream_rows(ws):
+    rows = ws.iter_rows(values_only=True)
+    first = next(rows, None)
+    if first is None:
+        return
+    header = _make_header(first)
+
+    # Blank rows are kept only if a non blank row follows (pandas trims the tail)
+    blanks = []
+    for idx, values in enumerate(rows):
+        cells = [_convert_cell(v) for v in values]
+        if len(cells) > len(header):
+            header.extend(
+                f"Unnamed: {i}" for i in range(len(header), len(cells))
+            )
+        payload = {
+            k: ("" if v is None else str(v))
+            for k, v in zip_longest(header, cells)
+        }
+        if all(v is None for v in cells):
+            blanks.append((idx, payload))
+            continue
+        if blanks:
+            yield from blanks
+            blanks.clear()
+        yield idx, payload
+
+
+def stream_excel_sheets(file_path, skip=None):
+    """
+    Read an Excel workbook sheet by sheet without loading it in memory.
+
+    Args:
+        file_path (str): Path of the workbook.
+        skip (callable, optional): Predicate on the sheet name, the sheets for
+            which it returns True are not read. Defaults to None.
+
+    Yields:
+        (sheet_name, rows) where `rows` is an iterator of (row_index, payload),
+        `payload` being the serialized row (dict column -> str).
+    """
+    wb = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        for ws in wb.worksheets:
+            if skip is not None and skip(ws.title):
+                continue
+            yield ws.title, _stream_rows(ws)
+    finally:
+        wb.close()
+
+
+def sheet_names(file_path):
+    """List the sheets of a workbook without reading their rows."""
+    with pd.ExcelFile(file_path) as xls:
+        return list(xls.sheet_names)
+
+
+def _sheet_batches(file_path, sheet_name, streaming, batch_size, min_values):
+    """(columns, rows) of a sheet by `batch_size` rows, see `parse_sheet`."""
+    if streaming:
+        wb = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+        try:
+            columns = []
+            rows = []
+            for idx, payload in _stream_rows(wb[sheet_name]):
+                # L'en-tête ne fait que s'allonger : chaque ligne en est un préfixe
+                if not columns or len(payload) > len(columns):
+                    columns = list(payload)
+                kept = has_meaningful_data(payload, min_values)
+                rows.append((idx, tuple(payload.values()) if kept else None))
+                if len(rows) >= batch_size:
+                    yield columns, rows
+                    rows = []
+            if rows:
+                yield columns, rows
+        finally:
+            wb.close()
+        return
+
+    df = pd.read_excel(file_path, sheet_name=sheet_name)
+    values, keep = _qualify_values(df, min_values)
+    columns = list(df.columns)
+    for start in range(0, len(df), batch_size):
+        stop = start + batch_size
+        yield columns, [
+            (idx, tuple(row) if kept else None)
+            for idx, kept, row in zip(df.index[start:stop], keep[start:stop], values[start:stop])
+        ]
+
+
+def parse_sheet(file_path, sheet_name, queue, stop=None, streaming=False, batch_size=500,
+                min_values=MIN_MEANINGFUL_VALUES):
+    """
+    Read and qualify a single sheet, meant to run in a worker process
+    (no database access). The rows are put on `queue` by batches of `batch_size`
+    as (columns, rows), `rows` being a list of (row_index, values) with `values`
+    the tuple of serialized cells or None for skipped rows. A bounded queue makes
+    the worker wait for the parent. None is put at the end, even on error or
+    when the `stop` event is set.
+    """
+    try:
+        for batch in _sheet_batches(file_path, sheet_name, streaming, batch_size, min_values):
+            if stop is not None and stop.is_set():
+                break
+            queue.put(batch)
+    finally:
+        queue.put(None)
+
+
+def is_csv_file(file_path) -> bool:
+    return os.path.splitext(file_path)[1].lower() in CSV_EXTENSIONS
+
+
+def detect_encoding(sample: bytes) -> str:
+    """Guess the encoding of a text file from its first bytes (BOM first)."""
+    if sample.startswith(codecs.BOM_UTF8):
+        return 'utf-8-sig'
+    if sample.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        return 'utf-16'
+    try:
+        sample.decode('utf-8')
+        return 'utf-8'
+    except UnicodeDecodeError as e:
+        # A multi-byte character cut at the end of the sample is not an error
+        if e.start >= len(sample) - 3 and e.reason == 'unexpected end of data':
+            return 'utf-8'
+    best = from_bytes(sample).best()
+    return best.encoding if best is not None else 'latin-1'
+
+
+def detect_delimiter(file_path, text_sample: str) -> str:
+    if os.path.splitext(file_path)[1].lower() in {'.tsv', '.tab'}:
+        return '\t'
+    try:
+        return csv.Sniffer().sniff(text_sample, delimiters=',;\t|').delimiter
+    except csv.Error:
+        return ','
+
+
+def stream_csv_rows(file_path, chunk_size=500, min_values=MIN_MEANINGFUL_VALUES):
+    """
+    Read a CSV (or TSV) file by chunks of `chunk_size` rows.
+
+    Every cell is kept as text, empty and NA cells become "" like in the Excel path.
+
+    Yields:
+        (row_index, payload) where `payload` is None for skipped rows.
+    """
+    with open(file_path, 'rb') as f:
+        sample = f.read(64 * 1024)
+    encoding = detect_encoding(sample)
+    text_sample = sample.decode(encoding, errors='ignore')
+    delimiter = detect_delimiter(file_path, text_sample)
+
+    reader = pd.read_csv(
+        file_path,
+        sep=delimiter,
+        encoding=encoding,
+        dtype=str,
+        chunksize=chunk_size,
+        skip_blank_lines=False,
+    )
+    with reader:
+        for chunk in reader:
+            chunk.columns = [
+                str(c).strip().replace('\ufeff', '').replace('"', '') for c in chunk.columns
+            ]
+            yield from qualify_frame(chunk, min_values)
+
+
+def csv_sheet_name(file_path) -> str:
+    """A CSV has a single 'sheet', named after the file."""
+    return os.path.splitext(os.path.basename(file_path))[0]
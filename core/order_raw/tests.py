@@ -1,38 +1,58 @@
+import io
 import os
+import shutil
 import tempfile
 from decimal import Decimal
 from datetime import datetime
 import pandas as pd
 import numpy as np
 
-from django.test import TestCase
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
 
 from core.order_raw.services.imports import OrderRawImportService
-from core.order_raw.models import OrderRaw, SupplierOrderRaw, ClientOrderRaw
+from core.order_raw.services.readers import qualify_frame
+from core.common.tools.row import hash_row
+from core.order_raw.models import OrderRaw, SupplierOrderRaw, ClientOrderRaw, RawSheetHeader, RawStatus, ImportJob
+from core.order_raw.services.jobs import claim_next_job, enqueue_import, run_job
+from core.common.views.import_ import import_job_events
+from core.supplier_order.services.transform import SupplierOrderTransformer
+from core.supplier_order.models import SupplierOrder, TransformError
+from django.core.management import call_command
 
 
 class OrderRawImportServiceTests(TestCase):
     def setUp(self):
         # Create a temporary Excel file with two sheets
         self.tmpfile = tempfile.NamedTemporaryFile(suffix=".xlsx", delete=False)
-        df1 = pd.DataFrame([
+        self.df1 = pd.DataFrame([
             {"A": np.nan, "B": None}, # Invalid
             {"A": 1,     "B": "foo"}, # Invalid
         ])
-        df2 = pd.DataFrame([
+        self.df2 = pd.DataFrame([
             {"X": 5.01, "Y": 3.14, "Z": "bar"}, # Valid
             {"X": 5.02, "Y": 3.14, "Z": "bar"}, # Valid
         ])
         # 2 valid | 2 skipped
         
-        with pd.ExcelWriter(self.tmpfile.name, engine="openpyxl") as writer:
-            df1.to_excel(writer, sheet_name="Sheet1", index=False)
-            df2.to_excel(writer, sheet_name="Sheet2", index=False)
+        self.write_sheets({"Sheet1": self.df1, "Sheet2": self.df2})
         self.tmpfile.close()
 
+    def write_sheets(self, sheets):
+        with pd.ExcelWriter(self.tmpfile.name, engine="openpyxl") as writer:
+            for name, df in sheets.items():
+                df.to_excel(writer, sheet_name=name, index=False)
+
     def tearDown(self):
         os.unlink(self.tmpfile.name)
 
+    def stored_rows(self):
+        return [
+            (raw.sheet_name, raw.row_index, raw.payload)
+            for raw in SupplierOrderRaw.objects.order_by('sheet_name', 'row_index')
+        ]
+
     def test_serialize_value(self):
         svc = OrderRawImportService(self.tmpfile.name, order_type="supplier")
         # NaN -> empty
@@ -51,6 +71,21 @@ class OrderRawImportServiceTests(TestCase):
         self.assertTrue(svc._has_meaningful_data({"a": "SomeOneReallyImportant", "b": "HaveOrder", "c": "SOMETHING", "d": 0.0}))
         self.assertTrue(svc._has_meaningful_data({"a": "SomeOneReallyImportant", "b": "1", "c": "1", "d": 0.0}, N=1))
 
+    def test_qualify_frame_matches_row_check(self):
+        svc = OrderRawImportService(self.tmpfile.name, order_type="supplier")
+        df = pd.DataFrame([
+            {"a": "1", "b": "0.0", "c": "x", "d": np.nan},
+            {"a": "12", "b": "-0", "c": "x", "d": "y"},
+            {"a": 0, "b": 1.5, "c": "AB", "d": pd.Timestamp("2025-05-06")},
+            {"a": None, "b": "", "c": "nan", "d": "00"},
+        ])
+        for idx, payload in qualify_frame(df):
+            expected = {k: svc._serialize_value(v) for k, v in df.loc[idx].to_dict().items()}
+            if svc._has_meaningful_data(expected):
+                self.assertEqual(payload, expected)
+            else:
+                self.assertIsNone(payload)
+
     def test_run_supplier_import(self):
         svc = OrderRawImportService(self.tmpfile.name, order_type="supplier")
         report = svc.run()
@@ -58,6 +93,127 @@ class OrderRawImportServiceTests(TestCase):
         self.assertEqual(report["skipped"], 2)
         self.assertEqual(SupplierOrderRaw.objects.count(), 2)
 
+    def test_run_publishes_progress_per_sheet(self):
+        events = []
+        OrderRawImportService(self.tmpfile.name, order_type="supplier", progress=events.append).run()
+        done = [e for e in events if e['done']]
+        self.assertEqual([e['sheet'] for e in done], ["Sheet1", "Sheet2"])
+        self.assertEqual([(e['rows_read'], e['rows_qualified']) for e in done], [(2, 0), (2, 2)])
+        self.assertEqual(done[1]['batches_flushed'], 1)
+        self.assertEqual(done[1]['stage'], "import")
+
+    def test_run_with_workers_matches_serial(self):
+        for streaming in (False, True):
+            SupplierOrderRaw.objects.all().delete()
+            serial = OrderRawImportService(self.tmpfile.name, order_type="supplier",
+                                           streaming=streaming, force=True).run()
+            expected = self.stored_rows()
+            SupplierOrderRaw.objects.all().delete()
+            parallel = OrderRawImportService(self.tmpfile.name, order_type="supplier",
+                                             streaming=streaming, force=True, workers=2).run()
+            rows = self.stored_rows()
+            self.assertEqual(parallel, serial)
+            self.assertEqual(rows, expected)
+
+    def test_workers_send_sheets_by_batches(self):
+        serial = OrderRawImportService(self.tmpfile.name, order_type="supplier").run()
+        expected = self.stored_rows()
+        SupplierOrderRaw.objects.all().delete()
+        for streaming in (False, True):
+            events = []
+            report = OrderRawImportService(self.tmpfile.name, order_type="supplier", streaming=streaming,
+                                           force=True, workers=2, batch_size=1, progress=events.append).run()
+            self.assertEqual(report["inserted"] + report["unchanged"], serial["inserted"])
+            self.assertEqual(self.stored_rows(), expected)
+            # Une ligne par batch : chaque batch est écrit à son arrivée
+            self.assertEqual([e['batches_flushed'] for e in events if e['done']][-1], 2)
+
+    def test_workers_interrupted_import_does_not_hang(self):
+        sheets = {f"Sheet{i}": self.df2 for i in range(4)}
+        self.write_sheets(sheets)
+        svc = OrderRawImportService(self.tmpfile.name, order_type="supplier", workers=2, batch_size=1)
+        iterator = svc._iter_sheets(lambda name: False)
+        sheet_name, rows = next(iterator)
+        self.assertEqual(next(rows)[0], 0)
+        iterator.close()
+
+    def test_rerun_unchanged_file_is_noop(self):
+        OrderRawImportService(self.tmpfile.name, order_type="supplier").run()
+        report = OrderRawImportService(self.tmpfile.name, order_type="supplier").run()
+        self.assertEqual(report["imported"], 0)
+        self.assertEqual(report["unchanged_sheets"], ["Sheet1", "Sheet2"])
+        self.assertEqual(SupplierOrderRaw.objects.count(), 2)
+
+    def test_reimport_after_delete_raw(self):
+        OrderRawImportService(self.tmpfile.name, order_type="supplier").run()
+        call_command('delete_raw', '--type', 'supplier', stdout=io.StringIO())
+        report = OrderRawImportService(self.tmpfile.name, order_type="supplier").run()
+        self.assertEqual(report["unchanged_sheets"], [])
+        self.assertEqual(report["imported"], 2)
+        self.assertEqual(SupplierOrderRaw.objects.count(), 2)
+
+    def test_rerun_only_changed_sheet(self):
+        OrderRawImportService(self.tmpfile.name, order_type="supplier").run()
+        df3 = pd.DataFrame([{"X": 5.03, "Y": 3.14, "Z": "baz"}])
+        self.write_sheets({"Sheet1": self.df1, "Sheet2": self.df2, "Sheet3": df3})
+        report = OrderRawImportService(self.tmpfile.name, order_type="supplier").run()
+        self.assertEqual(report["unchanged_sheets"], ["Sheet1", "Sheet2"])
+        self.assertEqual(report["imported"], 1)
+        self.assertEqual(SupplierOrderRaw.objects.count(), 3)
+
+    def test_rerun_upserts_changed_rows(self):
+        OrderRawImportService(self.tmpfile.name, order_type="supplier").run()
+        first = SupplierOrderRaw.objects.get(sheet_name="Sheet2", row_index=0)
+        df2 = pd.DataFrame([
+            {"X": 5.01, "Y": 3.14, "Z": "bar"},
+            {"X": 5.02, "Y": 3.15, "Z": "bar"}, # Edited
+            {"X": 5.03, "Y": 3.14, "Z": "bar"}, # Appended
+        ])
+        self.write_sheets({"Sheet1": self.df1, "Sheet2": df2})
+        report = OrderRawImportService(self.tmpfile.name, order_type="supplier").run()
+        self.assertEqual(report["inserted"], 1)
+        self.assertEqual(report["updated"], 1)
+        self.assertEqual(report["unchanged"], 1)
+        self.assertEqual(SupplierOrderRaw.objects.count(), 3)
+        self.assertEqual(SupplierOrderRaw.objects.get(sheet_name="Sheet2", row_index=1).payload["Y"], "3.15")
+        first.refresh_from_db()
+        self.assertEqual(first.data_hash, hash_row(first.payload))
+
+    def test_rerun_deletes_rows_gone_from_the_sheet(self):
+        df = pd.DataFrame([
+            {"Client Memo": "P", "No.": str(i), "Date": "2025-05-06", "Client": "TEST",
+             "Stone": "Ruby", "PC": "2", "Carats": "1.00"}
+            for i in range(1, 4)
+        ])
+        self.write_sheets({"Sheet1": self.df1, "Sheet2": df})
+        OrderRawImportService(self.tmpfile.name, order_type="supplier").run()
+        SupplierOrderTransformer().run(queryset=SupplierOrderRaw.objects.all())
+        self.assertEqual(SupplierOrder.objects.count(), 3)
+        # 3e ligne supprimée, 2e ligne vidée
+        edited = df.iloc[:2].copy()
+        edited.loc[1, ["Date", "Client", "Stone", "PC", "Carats", "No."]] = ""
+        self.write_sheets({"Sheet1": self.df1, "Sheet2": edited})
+        report = OrderRawImportService(self.tmpfile.name, order_type="supplier").run()
+        self.assertEqual((report["removed"], report["removed_orders"]), (2, 2))
+        self.assertEqual(list(SupplierOrderRaw.objects.values_list('row_index', flat=True)), [0])
+        self.assertEqual(SupplierOrder.objects.get().raw.row_index, 0)
+
+    def test_rerun_requeues_changed_rows(self):
+        OrderRawImportService(self.tmpfile.name, order_type="supplier").run()
+        SupplierOrderRaw.objects.update(status=RawStatus.FAILED)
+        SupplierOrderRaw.objects.filter(row_index=0).update(status=RawStatus.TRANSFORMED)
+        df2 = pd.DataFrame([
+            {"X": 5.01, "Y": 3.15, "Z": "bar"}, # Edited, already transformed
+            {"X": 5.02, "Y": 3.15, "Z": "bar"}, # Edited
+        ])
+        self.write_sheets({"Sheet1": self.df1, "Sheet2": df2})
+        report = OrderRawImportService(self.tmpfile.name, order_type="supplier").run()
+        self.assertEqual(
+            list(SupplierOrderRaw.objects.order_by('row_index').values_list('status', flat=True)),
+            [RawStatus.STALE, RawStatus.PENDING],
+        )
+        self.assertEqual(report["stale_transformed"], 1)
+
     def test_run_client_import(self):
         svc = OrderRawImportService(self.tmpfile.name, order_type="client")
         report = svc.run()
@@ -65,6 +221,19 @@ class OrderRawImportServiceTests(TestCase):
         self.assertEqual(report["skipped"], 2)
         self.assertEqual(ClientOrderRaw.objects.count(), 2)
 
+    def test_run_compact_storage(self):
+        OrderRawImportService(self.tmpfile.name, order_type="supplier").run()
+        compact = self.stored_rows()
+        raw = SupplierOrderRaw.objects.get(sheet_name="Sheet2", row_index=0)
+        self.assertIsNone(raw.data)
+        self.assertEqual(raw.header.columns, ["X", "Y", "Z"])
+        self.assertEqual(raw.cells, {"0": "5.01", "1": "3.14", "2": "bar"})
+        self.assertEqual(RawSheetHeader.objects.count(), 1)
+
+        SupplierOrderRaw.objects.all().delete()
+        OrderRawImportService(self.tmpfile.name, order_type="supplier", force=True, compact=False).run()
+        self.assertEqual(self.stored_rows(), compact)
+
     def test_run_default_import(self):
         svc = OrderRawImportService(self.tmpfile.name, order_type="other")
         report = svc.run()
@@ -72,6 +241,84 @@ class OrderRawImportServiceTests(TestCase):
         self.assertEqual(report.get("skipped", 0), 2)
         self.assertEqual(OrderRaw.objects.count(), 2)
 
+    def test_run_streaming_import(self):
+        svc = OrderRawImportService(self.tmpfile.name, order_type="supplier", streaming=True, batch_size=1)
+        report = svc.run()
+        self.assertEqual(report["imported"], 2)
+        self.assertEqual(report["skipped"], 2)
+        streamed = self.stored_rows()
+        SupplierOrderRaw.objects.all().delete()
+
+        OrderRawImportService(self.tmpfile.name, order_type="supplier", force=True).run()
+        loaded = self.stored_rows()
+        self.assertEqual(streamed, loaded)
+
+
+class RawClassificationTests(TestCase):
+    def setUp(self):
+        tmp = tempfile.NamedTemporaryFile(suffix=".xlsx", delete=False)
+        tmp.close()
+        self.addCleanup(os.unlink, tmp.name)
+        base = {"Client Memo": "P", "No.": "1", "Date": "2025-05-06", "Client": "TEST",
+                "Stone": "Ruby", "PC": "2", "Carats": "1.00", "Remarks": "", "Note": "", "Ref": ""}
+        pd.DataFrame([
+            base,
+            {**base, "No.": "2", "Client Memo": "M"},
+            {**base, "No.": "3", "Remarks": "Canceled"},
+            {**{k: "" for k in base}, "Remarks": "moved", "Note": "x", "Ref": "y"},
+        ]).to_excel(tmp.name, sheet_name="2025", index=False)
+        OrderRawImportService(tmp.name, order_type="supplier").run()
+
+    def flags(self):
+        return list(SupplierOrderRaw.objects.order_by('row_index').values_list(
+            'is_purchase', 'is_canceled', 'is_empty'
+        ))
+
+    def test_flags_set_at_import_and_skipped_in_sql(self):
+        self.assertEqual(self.flags(), [
+            (True, False, False), (False, False, False), (True, True, False), (True, False, True),
+        ])
+        stats = SupplierOrderTransformer().run(queryset=SupplierOrderRaw.objects.all())
+        self.assertEqual(stats['skipped'], {'not_purchase': 1, 'canceled': 1, 'empty': 1})
+        self.assertEqual(stats['total_raws'], 1)
+        self.assertEqual(stats['orders_created'], 1)
+        # Une TransformError par raw écarté, visible dans `transform_errors --by code`
+        self.assertEqual(
+            list(TransformError.objects.order_by('row_index').values_list('row_index', 'code', 'filter', 'message')),
+            [(1, 'not_purchase', 'import_flags', 'Not a purchase'), (2, 'canceled', 'import_flags', 'Row canceled'),
+             (3, 'empty', 'import_flags', 'Row is empty')],
+        )
+
+    def test_classify_command_backfills_old_raws(self):
+        SupplierOrderRaw.objects.update(is_purchase=None, is_canceled=None, is_empty=None)
+        call_command('classify_raw', '--type', 'supplier', stdout=io.StringIO())
+        self.assertEqual(self.flags()[1], (False, False, False))
+        self.assertEqual(self.flags()[2], (True, True, False))
+
+
+class OrderRawCsvImportTests(TestCase):
+    def make_file(self, suffix, content, encoding):
+        tmp = tempfile.NamedTemporaryFile(suffix=suffix, delete=False)
+        tmp.write(content.encode(encoding))
+        tmp.close()
+        self.addCleanup(os.unlink, tmp.name)
+        return tmp.name
+
+    def test_run_csv_import_with_bom(self):
+        path = self.make_file(".csv", "\ufeffX,Y,Z\n5.01,3.14,bar\n,,\n5.02,3.14,bar\n1,,foo\n", "utf-8")
+        report = OrderRawImportService(path, order_type="supplier", batch_size=2).run()
+        self.assertEqual(report["imported"], 2)
+        self.assertEqual(report["skipped"], 2)
+        raw = SupplierOrderRaw.objects.get(row_index=2)
+        self.assertEqual(raw.sheet_name, os.path.splitext(os.path.basename(path))[0])
+        self.assertEqual(raw.payload, {"X": "5.02", "Y": "3.14", "Z": "bar"})
+
+    def test_run_tsv_import_latin1(self):
+        path = self.make_file(".tsv", "Stone\tColor\tCarats\nRubis\tRouge foncé\t1.50\n", "latin-1")
+        report = OrderRawImportService(path, order_type="supplier").run()
+        self.assertEqual(report["imported"], 1)
+        self.assertEqual(SupplierOrderRaw.objects.get().payload["Color"], "Rouge foncé")
+
 
 class OrderRawModelTests(TestCase):
     def test_str_methods(self):
@@ -82,3 +329,77 @@ class OrderRawModelTests(TestCase):
         co = ClientOrderRaw(source_file="f", sheet_name="S2", row_index=5, data={})
         co.save()
         self.assertEqual(str(co), f"RawClient #{co.id} – row {co.row_index}")
+
+
+class ImportJobTests(TestCase):
+    def setUp(self):
+        self.upload_dir = tempfile.mkdtemp()
+        self.settings_override = override_settings(IMPORT_UPLOAD_DIR=self.upload_dir)
+        self.settings_override.enable()
+        self.addCleanup(self.settings_override.disable)
+        self.addCleanup(shutil.rmtree, self.upload_dir)
+
+        buffer = io.BytesIO()
+        pd.DataFrame([
+            {"Client Memo": "P", "No.": "1", "Date": "2025-05-06", "Client": "TEST",
+             "Stone": "Ruby", "PC": "2", "Carats": "1.00"},
+        ]).to_excel(buffer, sheet_name="2025", index=False)
+        self.content = buffer.getvalue()
+
+    def upload(self, name="orders.xlsx"):
+        return enqueue_import(SimpleUploadedFile(name, self.content), order_type="supplier")
+
+    def test_run_queued_job(self):
+        job = self.upload()
+        self.assertTrue(os.path.exists(job.file_path))
+        claimed = claim_next_job()
+        self.assertEqual(claimed.id, job.id)
+        self.assertEqual(claimed.status, ImportJob.Status.RUNNING)
+
+        run_job(claimed)
+        claimed.refresh_from_db()
+        self.assertEqual(claimed.status, ImportJob.Status.DONE)
+        self.assertEqual(claimed.report['import']['imported'], 1)
+        self.assertEqual(claimed.report['transform']['orders_created'], 1)
+        self.assertEqual(SupplierOrderRaw.objects.get().source_file, "orders.xlsx")
+        self.assertFalse(os.path.exists(job.file_path))
+
+        response = self.client.get(reverse('supplier_orders_import_job', args=[job.id]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['status'], 'done')
+
+        response = self.client.get(reverse('supplier_orders_import_job_events', args=[job.id]))
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        stream = b"".join(response.streaming_content).decode()
+        self.assertIn("event: progress", stream)
+        self.assertIn("event: end", stream)
+
+    def test_upload_kept_and_error_logged_when_job_fails(self):
+        self.content = b"not a spreadsheet"
+        self.upload(name="broken.xlsx")
+        with self.assertLogs('core.order_raw.services.jobs', level='ERROR') as logs:
+            job = run_job(claim_next_job())
+        self.assertEqual(job.status, ImportJob.Status.FAILED)
+        self.assertIn("Traceback", logs.output[0])
+        # Gardé pour relancer le job
+        self.assertTrue(os.path.exists(job.file_path))
+
+    def test_events_stream_of_a_pending_job_ends(self):
+        job = self.upload()
+        response = import_job_events(RequestFactory().get('/'), job.id, interval=0.01, max_duration=0.05)
+        stream = b"".join(response.streaming_content).decode()
+        # Aucun worker : le flux se ferme et le navigateur se reconnecte
+        self.assertIn("event: progress", stream)
+        self.assertNotIn("event: end", stream)
+        self.assertTrue(stream.endswith("retry: 2000\n\n"))
+
+    def test_same_file_not_run_twice_at_once(self):
+        first = self.upload()
+        second = self.upload()
+        other = self.upload(name="other.xlsx")
+        self.assertEqual(claim_next_job().id, first.id)
+        # The second upload of orders.xlsx waits for the first one
+        self.assertEqual(claim_next_job().id, other.id)
+        self.assertIsNone(claim_next_job())
+        second.refresh_from_db()
+        self.assertEqual(second.status, ImportJob.Status.PENDING)
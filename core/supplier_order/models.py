@@ -1,6 +1,8 @@
 from django.db import models
 from django.core.exceptions import ValidationError
 
+from core.common.tools.row import key_digest
+
 
 UNIQUE_SUPPLIER_LOT = (
     'date','supplier','order_no','number',
@@ -8,19 +10,16 @@ UNIQUE_SUPPLIER_LOT = (
     'weight_per_piece','price_usd_per_ct',
 )
 
+
+def lot_fingerprint(values) -> str:
+    """Hash (32 hex) of the values of UNIQUE_SUPPLIER_LOT, normalized like the seen keys of the transform."""
+    return key_digest(values).hex()
+
+
 class SupplierOrder(models.Model):
     """
     Supplier order, it is a purchase.
     """
-    class Meta:
-        unique_together = UNIQUE_SUPPLIER_LOT
-        constraints = [
-            models.UniqueConstraint(
-                fields=list(UNIQUE_SUPPLIER_LOT),
-                name='unique_supplier_lot'
-            )
-        ]
-        
     raw = models.OneToOneField(
         'SupplierOrderRaw',
         on_delete=models.PROTECT,
@@ -50,20 +49,122 @@ class SupplierOrder(models.Model):
     price_usd_per_piece = models.DecimalField(max_digits=13, decimal_places=3, blank=True, null=True)
     price_usd_per_ct    = models.DecimalField(max_digits=13, decimal_places=3, blank=True, null=True)
     total_usd           = models.DecimalField(max_digits=13, decimal_places=3, blank=True, null=True)
+
+    # Unicité du lot (UNIQUE_SUPPLIER_LOT) sur un index étroit, NULL pour les doublons antérieurs
+    lot_fingerprint     = models.CharField(
+                            max_length=32, unique=True, blank=True, null=True, editable=False,
+                            help_text="Hash of the normalized UNIQUE_SUPPLIER_LOT fields")
     
     def __str__(self):
         return f"SupplierOrder {self.order_no} – {self.supplier} – {self.date.date()}"
 
+    def make_lot_fingerprint(self) -> str:
+        return lot_fingerprint(tuple(getattr(self, f) for f in UNIQUE_SUPPLIER_LOT))
+
+    def save(self, *args, **kwargs):
+        """
+        Set the fingerprint of the lot. A duplicate left without one by the migration
+        cannot be saved unchanged (IntegrityError) : `clean()` reports it, see
+        `check_integrity_supplier_order`.
+        """
+        self.lot_fingerprint = self.make_lot_fingerprint()
+        super().save(*args, **kwargs)
+
     def clean(self):
         super().clean()
         
-        filters = {f: getattr(self, f) for f in UNIQUE_SUPPLIER_LOT}
-        qs = SupplierOrder.objects.filter(**filters)
-        if self.pk:
-            qs = qs.exclude(pk=self.pk)
-        if qs.exists():
+        duplicate_of = (
+            SupplierOrder.objects.filter(lot_fingerprint=self.make_lot_fingerprint())
+            .exclude(pk=self.pk).values_list('pk', flat=True).first()
+        )
+        if duplicate_of is None:
+            return
+        if self.pk and self.lot_fingerprint is None:
+            # Doublon antérieur à l'index (fingerprint NULL) : à corriger avant toute modification
             raise ValidationError({
-                '__all__': 'A supplier order with this combination of fields already exists.'
+                '__all__': f'This supplier order duplicates the lot of order #{duplicate_of} : change '
+                           'its lot fields or delete it (see check_integrity_supplier_order).'
             })
+        raise ValidationError({
+            '__all__': 'A supplier order with this combination of fields already exists.'
+        })
+
+
+class SupplierTransformConfig(models.Model):
+    """
+    Mappings and filters used by a transform, identified by the `version` stamped
+    on the raws it processed (see `config_version.transform_config`).
+    """
+    class Meta:
+        verbose_name = "Supplier Transform Config"
+        verbose_name_plural = "Supplier Transform Configs"
 
+    version         = models.CharField(max_length=16, unique=True)
+    mapping         = models.JSONField(help_text="Column mappings of the transform")
+    parsers_digest  = models.CharField(max_length=64, help_text="Sha256 of the filters and parsers source")
+    created_at      = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Transform config {self.version}"
 
+
+class TransformCheckpoint(models.Model):
+    """
+    Progress of a transform run, saved with each committed batch so an interrupted
+    run can be resumed (`transform_supplier_orders --resume`).
+    """
+    class Meta:
+        verbose_name = "Transform Checkpoint"
+        verbose_name_plural = "Transform Checkpoints"
+
+    started_at      = models.DateTimeField(auto_now_add=True)
+    updated_at      = models.DateTimeField(auto_now=True)
+    finished_at     = models.DateTimeField(blank=True, null=True)
+    config_version  = models.CharField(max_length=16)
+    selection       = models.JSONField(
+                        default=dict, blank=True,
+                        help_text="Options selecting the raws of the run, the same are required to resume it")
+    last_raw_id     = models.BigIntegerField(
+                        blank=True, null=True,
+                        help_text="Every raw up to this id has been processed (the raws are read by id)")
+    counters        = models.JSONField(default=dict, help_text="Counters and error aggregates of the report")
+    seen_count      = models.IntegerField(default=0)
+    seen_digest     = models.CharField(
+                        max_length=64, blank=True,
+                        help_text="Digest of the unique keys accepted, checked when resuming")
+
+    def __str__(self):
+        return f"Transform checkpoint #{self.id} (raw {self.last_raw_id})"
+
+
+class TransformError(models.Model):
+    """
+    Error of the last transform attempt of a raw, saved with each batch
+    (see `transform_errors` for the counts by code, field, sheet...).
+    """
+    class Meta:
+        indexes = [
+            models.Index(fields=['code', 'field'], name='transform_error_code_idx'),
+            models.Index(fields=['sheet_name', 'field'], name='transform_error_sheet_idx'),
+            models.Index(fields=['filter', 'field'], name='transform_error_filter_idx'),
+        ]
+        verbose_name = "Transform Error"
+        verbose_name_plural = "Transform Errors"
+
+    raw             = models.ForeignKey(
+                        'SupplierOrderRaw',
+                        on_delete=models.CASCADE,
+                        related_name='transform_errors')
+    source_file     = models.CharField(max_length=255)
+    sheet_name      = models.CharField(max_length=255, blank=True, null=True)
+    row_index       = models.IntegerField(blank=True, null=True)
+    code            = models.CharField(max_length=32, help_text="Stable code, see `errors.error_code`")
+    filter          = models.CharField(max_length=64, blank=True, null=True, help_text="Filter or step that rejected the raw")
+    field           = models.CharField(max_length=255, blank=True, null=True)
+    value           = models.CharField(max_length=255, blank=True, null=True, help_text="Offending value, as text")
+    message         = models.TextField()
+    config_version  = models.CharField(max_length=16, blank=True, null=True)
+    created_at      = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"TransformError {self.code} – raw {self.raw_id}"
@@ -0,0 +1,101 @@
+import hashlib
+import importlib
+import inspect
+import json
+
+from django.db.models import Q
+
+from core.order_raw.models import RawSheetHeader, RawStatus
+from core.supplier_order.mapping import SUPPLIER_COLUMN_MAPPING, RAW_SUPPLIER_COLUMN_MAPPING
+from core.supplier_order.models import SupplierTransformConfig
+
+# Modules whose code decides the outcome of a raw, besides the filters (added in `transform_config`) :
+# parsing, date formats, column resolution, frame engine, error codes and the batch checks of the transform
+PARSER_MODULES = (
+    'core.common.tools.parse',
+    'core.common.tools.row',
+    'core.common.services.date_formats',
+    'core.common.services.bulk',
+    'core.common.services.filters.plan',
+    'core.common.services.filters.context',
+    'core.common.services.filters.frame',
+    'core.common.services.filters.errors',
+    'core.supplier_order.services.transform',
+    'core.supplier_order.services.transform_workers',
+)
+
+
+def _digest(value) -> str:
+    return hashlib.sha256(value.encode()).hexdigest()
+
+
+def parsers_digest(filters) -> str:
+    """Sha256 of the source of the filters and of the parsers they use : changes with any fix."""
+    modules = sorted({*PARSER_MODULES, *(type(filt).__module__ for filt in filters)})
+    # Import à l'appel : `transform` importe ce module
+    return _digest("\n".join(inspect.getsource(importlib.import_module(name)) for name in modules))
+
+
+def transform_config(filters) -> dict:
+    """
+    Configuration of a transform : the column mappings, the digest of the filters and
+    the `version` stamped on the raws it processes.
+    """
+    mapping = {'supplier': SUPPLIER_COLUMN_MAPPING, 'raw': RAW_SUPPLIER_COLUMN_MAPPING}
+    parsers = parsers_digest(filters)
+    dumped = json.dumps({'mapping': mapping, 'parsers': parsers}, sort_keys=True)
+    return {'version': _digest(dumped)[:16], 'mapping': mapping, 'parsers': parsers}
+
+
+def register_config(config) -> SupplierTransformConfig:
+    """Save the configuration, so the raws stamped with its version can be compared later."""
+    obj, _ = SupplierTransformConfig.objects.get_or_create(
+        version=config['version'],
+        defaults={'mapping': config['mapping'], 'parsers_digest': config['parsers']},
+    )
+    return obj
+
+
+def _aliases(mapping) -> set:
+    return {
+        (name, field, alias)
+        for name, fields in mapping.items()
+        for field, aliases in fields.items()
+        for alias in aliases
+    }
+
+
+def changed_aliases(old_mapping, new_mapping) -> set:
+    """Column names added to or removed from a mapping."""
+    return {alias for _, _, alias in _aliases(old_mapping) ^ _aliases(new_mapping)}
+
+
+def failed_since_change(queryset, config):
+    """
+    Failed raws of `queryset` that the current configuration may transform differently :
+    every raw failed with other parsers (or an unknown version), and only the raws having
+    a column among the changed aliases when only the mappings changed.
+    """
+    failed = queryset.filter(status=RawStatus.FAILED).exclude(config_version=config['version'])
+    versions = list(failed.order_by().values_list('config_version', flat=True).distinct())
+    known = SupplierTransformConfig.objects.in_bulk(
+        [v for v in versions if v is not None], field_name='version'
+    )
+    headers = None
+    selected = Q()
+    for version in versions:
+        rows = Q(config_version=version) if version is not None else Q(config_version__isnull=True)
+        old = known.get(version)
+        if old is None or old.parsers_digest != config['parsers']:
+            selected |= rows
+            continue
+        aliases = changed_aliases(old.mapping, config['mapping'])
+        if not aliases:
+            continue
+        if headers is None:
+            headers = list(RawSheetHeader.objects.values_list('id', 'columns'))
+        touched = [pk for pk, columns in headers if aliases.intersection(columns)]
+        selected |= rows & (Q(header_id__in=touched) | Q(data__has_any_keys=sorted(aliases)))
+    if not selected:
+        return failed.none()
+    return failed.filter(selected)
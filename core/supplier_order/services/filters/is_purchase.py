@@ -2,19 +2,48 @@ import pandas as pd
 
 from django.db.models import Field
 
-from core.common.tools.row import get_value_mapped
+from core.common.tools.row import get_value_mapped, resolve_columns
 from core.common.services.filters.base import BaseTransformFilter
+from core.common.services.filters.frame import map_unique
 from core.supplier_order.mapping import RAW_SUPPLIER_COLUMN_MAPPING
-    
-    
+
+
+def memo_error(memo):
+    """Error of a client memo value that is not a purchase (P or empty), else None."""
+    memo = memo or ""
+    memo = memo.strip().upper()
+    if memo in {"", "P"}:
+        return None
+    return f"Not a purchase : client memo [{memo}]"
+
+
 class IsPurchaseFilter(BaseTransformFilter):
     """Filter the 'Order' that are actual purchased."""
+    def _memo_error(self, memo):
+        return memo_error(memo)
+
     def apply(self, ctx):
-        memo = get_value_mapped(ctx.raw.data, "client_memo", RAW_SUPPLIER_COLUMN_MAPPING) or ""
-        memo = memo.strip().upper()
-        if memo in {"", "P"}:
+        memo = get_value_mapped(ctx.raw.payload, "client_memo", RAW_SUPPLIER_COLUMN_MAPPING)
+        error = self._memo_error(memo)
+        if error is None:
             return True
-        ctx.error = f"Not a purchase : client memo [{memo}]"
+        ctx.error = error
+        ctx.failure = {'field': 'client_memo', 'value': memo}
         return False
+
+    def apply_frame(self, frame):
+        groups = frame.groups(lambda raw, payload: raw.header_id or tuple(payload))
+        for rows in groups.values():
+            resolved, _ = resolve_columns(frame.payloads[rows[0]], ["client_memo"], RAW_SUPPLIER_COLUMN_MAPPING)
+            if not resolved:
+                continue
+            values = [
+                None if type(v) is float and v != v else v
+                for v in frame.column(rows, resolved[0][1])
+            ]
+            for i, value, (error, exc) in zip(rows, values, map_unique(values, self._memo_error)):
+                if exc is not None:
+                    frame.fail(i, exc, field='client_memo', value=value)
+                elif error is not None:
+                    frame.reject(i, error, self, field='client_memo', value=value)
         
-        
\ No newline at end of file
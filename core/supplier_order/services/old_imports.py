@@ -6,6 +6,7 @@ from core.supplier_order.mapping import SUPPLIER_COLUMN_MAPPING
 from core.supplier_order.models import SupplierOrder
 from core.common.tools.parse import parse_date, parse_decimal, parse_int, parse_currency, parse_unit
 from core.common.tools.row import get_value_mapped, is_fully_invalid_row, is_duplicate_object
+from core.common.services.bulk import bulk_create_isolating
 
 # fields that define uniqueness for SupplierOrder
 UNIQUE_FIELDS = [
@@ -61,6 +62,8 @@ def import_supplier_orders(file_path):
     seen_keys = set()
     sheets = pd.read_excel(file_path, sheet_name=None)
     achats = []
+    # id(achat) -> (sheet, row index), to report the conflicts of the insert
+    origins = {}
 
     for sheet_name, df in sheets.items():
         valid_count = 0
@@ -124,6 +127,7 @@ def import_supplier_orders(file_path):
 
                 # instantiate but don't save yet
                 achat = SupplierOrder(**kwargs)
+                achat.lot_fingerprint = achat.make_lot_fingerprint()
 
                 # check DB-level duplicates
                 if is_duplicate_object(achat):
@@ -133,6 +137,7 @@ def import_supplier_orders(file_path):
                 # mark this key as seen and queue for bulk_create
                 seen_keys.add(key)
                 achats.append(achat)
+                origins[id(achat)] = (sheet_name, idx)
                 report['imported'] += 1
                 valid_count += 1
 
@@ -160,9 +165,9 @@ def import_supplier_orders(file_path):
         + report['skipped_duplicates']
     )
 
-    # bulk insert, ignoring any remaining DB conflicts
+    # bulk insert, the rows still in conflict in DB are isolated and reported
     try:
-        SupplierOrder.objects.bulk_create(achats, ignore_conflicts=True)
+        rejected = bulk_create_isolating(SupplierOrder, achats)
     except Exception as e:
         # in case of unexpected error, log summary then re-raise
         sys.stdout.write(f"[INFO] Imported: {report['imported']}\n")
@@ -174,4 +179,17 @@ def import_supplier_orders(file_path):
             sys.stdout.write(msg + "\n")
         raise
 
+    for achat, e in rejected:
+        sheet_name, idx = origins[id(achat)]
+        report['imported'] -= 1
+        report['skipped_duplicates'] += 1
+        report['failed_rows'].append({
+            "sheet": sheet_name,
+            "row_index": idx,
+            "error": f"Insert conflict : {e}",
+        })
+        report['messages'].append(
+            f"[WARNING] Row {idx} in '{sheet_name}' not inserted: {e}"
+        )
+
     return report
@@ -0,0 +1,96 @@
+import sqlite3
+
+from core.common.tools.row import key_digest
+
+
+class SeenDigest:
+    """
+    Order independent digest of a set of unique keys (xor of their digests), kept up
+    to date as keys are added : a resumed run checks it against the saved orders.
+    """
+    def __init__(self):
+        self.value = 0
+        self.count = 0
+
+    def add(self, digest: bytes):
+        self.value ^= int.from_bytes(digest, 'big')
+        self.count += 1
+
+    def discard(self, digest: bytes):
+        """Remove a key added before (xor is its own inverse)."""
+        self.value ^= int.from_bytes(digest, 'big')
+        self.count -= 1
+
+    def hexdigest(self) -> str:
+        return f"{self.value:032x}"
+
+
+class SeenKeys:
+    """Unique keys already accepted by a run, kept as digests (see `key_digest`)."""
+    def __init__(self):
+        self._digests = set()
+
+    def __contains__(self, digest):
+        return digest in self._digests
+
+    def __len__(self):
+        return len(self._digests)
+
+    def add(self, digest: bytes):
+        self._digests.add(digest)
+
+    def discard(self, digest: bytes):
+        self._digests.discard(digest)
+
+    def close(self):
+        self._digests.clear()
+
+
+class SpilledSeenKeys(SeenKeys):
+    """
+    Digests kept in a temporary SQLite database (deleted on `close`) for the runs whose
+    keys do not fit in memory. The last `buffer_size` digests stay in memory and are
+    written by `executemany`.
+    """
+    def __init__(self, buffer_size=10000):
+        super().__init__()
+        self.buffer_size = buffer_size
+        self._count = 0
+        # Nom vide : base temporaire sur disque, supprimée à la fermeture
+        self._db = sqlite3.connect('')
+        self._db.execute("CREATE TABLE seen (digest BLOB PRIMARY KEY) WITHOUT ROWID")
+
+    def __contains__(self, digest):
+        if digest in self._digests:
+            return True
+        return self._db.execute("SELECT 1 FROM seen WHERE digest = ?", (digest,)).fetchone() is not None
+
+    def __len__(self):
+        return self._count
+
+    def add(self, digest: bytes):
+        if digest in self:
+            return
+        self._digests.add(digest)
+        self._count += 1
+        if len(self._digests) >= self.buffer_size:
+            self._spill()
+
+    def discard(self, digest: bytes):
+        if digest in self._digests:
+            self._digests.discard(digest)
+        elif not self._db.execute("DELETE FROM seen WHERE digest = ?", (digest,)).rowcount:
+            return
+        self._count -= 1
+
+    def _spill(self):
+        self._db.executemany("INSERT INTO seen (digest) VALUES (?)", ((d,) for d in self._digests))
+        self._digests.clear()
+
+    def close(self):
+        super().close()
+        self._db.close()
+
+
+def seen_keys_store(spill=False) -> SeenKeys:
+    return SpilledSeenKeys() if spill else SeenKeys()
@@ -1,14 +1,31 @@
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
 from django.db import transaction
+from django.db.models import Count, Q
+from django.utils import timezone
 
 from core.common.services.filters.mapping import FieldMappingFilter
 from core.common.services.filters.type_parsing import TypeParsingFilter
 from core.common.services.filters.context import FilterContext
+from core.common.services.filters.frame import run_frame
 from core.common.services.filters.canceled import CanceledFieldFilter
 from core.common.services.filters.required import RequiredFieldFilter
+from core.common.services.filters.errors import ERROR_CODES, error_code, error_status, failure_details
+from core.common.services.date_formats import DATE_SAMPLE_SIZE, infer_sheet_date_formats
+from core.common.services.bulk import bulk_create_isolating
+from core.common.services.filters.plan import get_field_plan
+from core.common.services.progress import ProgressTracker
+from core.common.tools.parse import column_date_parser, parse_cache_stats
 
-from core.supplier_order.models import SupplierOrder
+from core.order_raw.models import RawSheetHeader, RawStatus, SupplierOrderRaw
+from core.supplier_order.models import UNIQUE_SUPPLIER_LOT, SupplierOrder, TransformError, lot_fingerprint
 from core.supplier_order.mapping import SUPPLIER_COLUMN_MAPPING, RAW_SUPPLIER_COLUMN_MAPPING
 from core.supplier_order.services.filters.is_purchase import IsPurchaseFilter
+from core.supplier_order.services import transform_workers
+from core.supplier_order.services.config_version import register_config, transform_config
+from core.supplier_order.services.seen_keys import SeenDigest, key_digest, seen_keys_store
 
 class SupplierContext(FilterContext):
     """
@@ -17,90 +34,521 @@ class SupplierContext(FilterContext):
     def __init__(self, raw):
         super().__init__(raw, SupplierOrder)
         
+# Raws classified at import as never transformable (see `classify_row`)
+SKIPPED_RAWS = Q(is_purchase=False) | Q(is_canceled=True) | Q(is_empty=True)
+
+# Error code of each flag, the first flag wins (in the order of the filters)
+SKIP_FLAGS = {
+    'not_purchase': Q(is_purchase=False),
+    'canceled': Q(is_canceled=True) & ~Q(is_purchase=False),
+    'empty': Q(is_empty=True) & ~Q(is_purchase=False) & ~Q(is_canceled=True),
+}
+# Message of the TransformError of each flag, as the filters word it
+SKIP_MESSAGES = {code: message for message, code in ERROR_CODES if code in SKIP_FLAGS}
+
+
+# Parts of the report saved by the checkpoints and restored on resume
+CHECKPOINT_COUNTERS = ('total_raws', 'orders_created', 'raws_failed', 'errors', 'skipped')
+
+
+class CheckpointMismatch(Exception):
+    """The orders saved since a checkpoint do not match it : the run cannot be resumed."""
+
+
 class SupplierOrderTransformer:
-    def __init__(self, dry_run=False):
+    """
+    Transform SupplierOrderRaw rows into SupplierOrder.
+
+    Args:
+        dry_run (bool, optional): Do not save the orders. Defaults to False.
+        progress (callable, optional): Receive the progress events (see `ProgressTracker`).
+        batch_validation (bool, optional): Validate the fields per row, but check the
+            uniqueness against the database once per batch (one query) instead of
+            `full_clean()` queries on every row. Defaults to True.
+        date_sample_size (int, optional): Rows of each sheet read to infer the format
+            of its date columns. Defaults to DATE_SAMPLE_SIZE.
+    """
+    def __init__(self, dry_run=False, progress=None, batch_validation=True, date_sample_size=DATE_SAMPLE_SIZE):
         self.dry_run = dry_run
+        self.batch_validation = batch_validation
+        self.date_sample_size = date_sample_size
+        self.progress = ProgressTracker(progress, stage='transform')
+        # TransformError of the failed rows not saved yet
+        self._failures = []
+        self._checkpoint = None
+        self._seen = SeenDigest()
+        self.mapping_filter = FieldMappingFilter(field_mapping=SUPPLIER_COLUMN_MAPPING)
+        self.type_filter = TypeParsingFilter(order_model=SupplierOrder)
         self.filters = [
             IsPurchaseFilter(),
-            FieldMappingFilter(field_mapping=SUPPLIER_COLUMN_MAPPING),
-            TypeParsingFilter(order_model=SupplierOrder),
+            self.mapping_filter,
+            self.type_filter,
             CanceledFieldFilter(),
             RequiredFieldFilter(),
         ]
-        ut = SupplierOrder._meta.unique_together
-        if ut:
-            first = ut[0] if isinstance(ut[0], (list, tuple)) else ut
-            self.unique_fields = list(first)
-        else:
-            self.unique_fields = []
+        # Version of the mappings / filters, stamped on the raws processed
+        self.config = transform_config(self.filters)
+        self.unique_fields = list(UNIQUE_SUPPLIER_LOT)
 
-    def transform_one(self, raw):
+    def transform_one(self, raw, validate_unique=True):
         ctx = FilterContext(raw, SupplierOrder)
+        filt = None
         try:
             for filt in self.filters:
                 if not filt.apply(ctx):
                     raise ValueError(f"{ctx.error} from {filt}")
+            filt = None
             ctx.instantiate_order()
-            ctx.order.full_clean()
+            if validate_unique:
+                ctx.order.full_clean()
+            else:
+                # Sans requête : `raw` vient de la base, l'unicité est vérifiée par batch
+                ctx.order.clean_fields(exclude=['raw'])
         except Exception as e:
             ctx.error = str(e)
+            ctx.failure = failure_details(e, ctx, filt)
         return ctx
 
+    def _unique_key(self, order):
+        return tuple(getattr(order, f) for f in self.unique_fields)
+
+    def _existing_conflicts(self, pending):
+        """
+        Index of the pending rows whose raw or lot fingerprint is already in database,
+        with one query on the narrow indexes for the whole batch.
+        """
+        raw_ids = [ctx.raw.pk for ctx, _ in pending]
+        fingerprints = [lot_fingerprint(key) for _, key in pending]
+        existing = SupplierOrder.objects.filter(
+            Q(raw_id__in=raw_ids) | Q(lot_fingerprint__in=fingerprints)
+        ).values_list('raw_id', 'lot_fingerprint')
+        existing_raws, existing_fingerprints = set(), set()
+        for raw_id, fingerprint in existing:
+            existing_raws.add(raw_id)
+            existing_fingerprints.add(fingerprint)
+        return {
+            i for i, (ctx, _) in enumerate(pending)
+            if ctx.raw.pk in existing_raws or fingerprints[i] in existing_fingerprints
+        }
+
+    def _accept(self, ctx, key, seen_keys, orders_to_create, reports, error_key_lenght):
+        # Seul le digest de la clé est gardé (voir SeenKeys)
+        digest = key_digest(key)
+        if digest in seen_keys:
+            ctx.error = f"Duplicated row : {key}"
+            ctx.failure = {'filter': 'duplicate', 'field': None, 'value': None}
+            self._manage_new_error(ctx, reports, error_key_lenght)
+            reports['raws_failed'] += 1
+        else:
+            seen_keys.add(digest)
+            self._seen.add(digest)
+            # bulk_create n'appelle pas save() : le fingerprint est posé ici
+            ctx.order.lot_fingerprint = digest.hex()
+            orders_to_create.append(ctx.order)
+            reports['orders_created'] += 1
+            self.progress.add(rows_qualified=1)
+
+    def _validate_batch(self, pending, seen_keys, orders_to_create, reports, error_key_lenght):
+        """Check the uniqueness of the pending rows, in their order, then accept them."""
+        if not pending:
+            return
+        conflicts = self._existing_conflicts(pending)
+        for i, (ctx, key) in enumerate(pending):
+            if i in conflicts:
+                # Même message qu'avant : full_clean() seulement sur les lignes en conflit
+                try:
+                    ctx.order.full_clean()
+                except Exception as e:
+                    ctx.error = str(e)
+                    ctx.failure = failure_details(e, ctx)
+                if ctx.error is not None:
+                    reports['raws_failed'] += 1
+                    self._manage_new_error(ctx, reports, error_key_lenght)
+                    continue
+            self._accept(ctx, key, seen_keys, orders_to_create, reports, error_key_lenght)
+        pending.clear()
+
+    def _transform_error(self, ctx):
+        failure = ctx.failure or {}
+        value = failure.get('value')
+        raw = ctx.raw
+        return TransformError(
+            raw_id=raw.pk,
+            source_file=raw.source_file,
+            sheet_name=raw.sheet_name,
+            row_index=raw.row_index,
+            code=error_code(ctx.error),
+            filter=failure.get('filter'),
+            field=failure.get('field'),
+            value=None if value is None else str(value)[:255],
+            message=ctx.error,
+            config_version=self.config['version'],
+        )
+
     def _manage_new_error(self, ctx, reports, error_key_lenght):
+        self._failures.append(self._transform_error(ctx))
         error_key = ctx.error[:error_key_lenght]
         if error_key not in reports['errors']:
             reports['errors'][error_key] = [1, f"Sheet {ctx.raw.sheet_name} - Index {ctx.raw.row_index} : {ctx.error}"]
         else:
             reports['errors'][error_key][0] += 1
 
-    def run(self, queryset=None, batch_size=1000, error_key_lenght=40):
+    def _parse_cache_report(self, before):
+        """Hits / misses of the memoized parsers during the run."""
+        report = {}
+        for name, (hits, misses) in parse_cache_stats().items():
+            hits -= before.get(name, (0, 0))[0]
+            misses -= before.get(name, (0, 0))[1]
+            if hits + misses:
+                report[name] = {
+                    'hits': hits,
+                    'misses': misses,
+                    'hit_rate': round(hits / (hits + misses), 3),
+                }
+        return report
+
+    def _prepare_date_parsers(self, queryset, reports):
+        """One date format per sheet column, inferred from its values before the transform."""
+        formats = infer_sheet_date_formats(
+            queryset, SUPPLIER_COLUMN_MAPPING, get_field_plan(SupplierOrder).date_fields,
+            sample_size=self.date_sample_size,
+        )
+        # (source_file, sheet_name) -> {field: (format, converted dates)}, sent to the workers
+        self._sheet_dates = {}
+        for (source_file, sheet_name), fields in formats.items():
+            parsers = {}
+            for field, (fmt, ambiguous, converted) in fields.items():
+                if fmt is None:
+                    continue
+                # Les valeurs hors de l'échantillon sont lues avec le même format
+                parsers[field] = column_date_parser(converted, fmt)
+                self._sheet_dates.setdefault((source_file, sheet_name), {})[field] = (fmt, converted)
+                # Par fichier puis par feuille : deux fichiers ont souvent une feuille "2016"
+                reports['date_formats'].setdefault(source_file, {}).setdefault(sheet_name, {})[field] = fmt
+                if ambiguous:
+                    reports['ambiguous_dates'].setdefault(source_file, {}).setdefault(sheet_name, []).append(field)
+            self.type_filter.set_sheet_parsers(source_file, sheet_name, parsers)
+
+    def _skipped_counts(self, queryset):
+        """Raws left out by their import flags, counted in one aggregate."""
+        return queryset.order_by().aggregate(
+            **{code: Count('pk', filter=flag) for code, flag in SKIP_FLAGS.items()}
+        )
+
+    def _save_skipped_errors(self, errors):
+        TransformError.objects.filter(raw_id__in=[error.raw_id for error in errors]).delete()
+        TransformError.objects.bulk_create(errors)
+
+    def _drop_stale_orders(self, queryset):
+        """
+        Delete the orders of the raws changed since their transform (status STALE) :
+        the raws are transformed again like the pending ones.
+        """
+        return SupplierOrder.objects.filter(raw__in=queryset.filter(status=RawStatus.STALE)).delete()[0]
+
+    def _mark_skipped(self, queryset, chunk_size=2000):
+        """
+        Take the raws left out by their import flags out of the queue, with the
+        TransformError of their code (filter 'import_flags').
+        """
+        now = timezone.now()
+        version = self.config['version']
+        with transaction.atomic():
+            for code, flag in SKIP_FLAGS.items():
+                skipped = queryset.filter(flag)
+                errors = []
+                rows = skipped.order_by('pk').values_list('pk', 'source_file', 'sheet_name', 'row_index')
+                for raw_id, source_file, sheet_name, row_index in rows.iterator(chunk_size=chunk_size):
+                    errors.append(TransformError(
+                        raw_id=raw_id, source_file=source_file, sheet_name=sheet_name, row_index=row_index,
+                        code=code, filter='import_flags', message=SKIP_MESSAGES[code], config_version=version,
+                    ))
+                    if len(errors) >= chunk_size:
+                        self._save_skipped_errors(errors)
+                        errors = []
+                if errors:
+                    self._save_skipped_errors(errors)
+                skipped.update(
+                    status=RawStatus.SKIPPED, error_code=code, last_attempt_at=now, config_version=version,
+                )
+
+    def _save_outcomes(self, orders):
+        """
+        Status of the raws of a batch : transformed, or failed / skipped with their error
+        code. Their errors replace those of their previous attempt.
+        """
+        now = timezone.now()
+        version = self.config['version']
+        transformed = [order.raw_id for order in orders]
+        SupplierOrderRaw.objects.filter(pk__in=transformed).update(
+            status=RawStatus.TRANSFORMED, error_code=None, last_attempt_at=now, config_version=version
+        )
+        by_code = {}
+        for error in self._failures:
+            by_code.setdefault(error.code, []).append(error.raw_id)
+        TransformError.objects.filter(raw_id__in=[*transformed, *(e.raw_id for e in self._failures)]).delete()
+        TransformError.objects.bulk_create(self._failures)
+        for code, raw_ids in by_code.items():
+            SupplierOrderRaw.objects.filter(pk__in=raw_ids).update(
+                status=error_status(code), error_code=code, last_attempt_at=now, config_version=version
+            )
+
+    def _reject_conflicts(self, rejected, seen_keys, reports, error_key_lenght):
+        """
+        Orders refused by the database at insert : their raw fails instead of the batch.
+        Unless the lot itself is in conflict, a later row of the same lot can still give the order.
+        """
+        for order, exc in rejected:
+            ctx = FilterContext(order.raw, SupplierOrder)
+            ctx.order = order
+            ctx.error = f"Insert conflict : {exc}"
+            ctx.failure = {'filter': 'insert', 'field': None, 'value': None}
+            digest = bytes.fromhex(order.lot_fingerprint)
+            # Absente de la base : hors du digest du point de reprise
+            self._seen.discard(digest)
+            if 'lot_fingerprint' not in str(exc):
+                seen_keys.discard(digest)
+            reports['orders_created'] -= 1
+            reports['raws_failed'] += 1
+            self._manage_new_error(ctx, reports, error_key_lenght)
+
+    def _flush(self, orders_to_create, seen_keys, batch_size, reports, last_raw_id, error_key_lenght):
+        """
+        Insert the orders and save the status of the raws in the same transaction,
+        with the checkpoint of the run (every raw up to `last_raw_id` is done).
+        The orders in conflict are isolated (see `bulk_create_isolating`), the others are kept.
+        """
+        if not self.dry_run:
+            with transaction.atomic():
+                rejected = bulk_create_isolating(SupplierOrder, orders_to_create, batch_size)
+                if rejected:
+                    self._reject_conflicts(rejected, seen_keys, reports, error_key_lenght)
+                    refused = {id(order) for order, _ in rejected}
+                    orders_to_create = [order for order in orders_to_create if id(order) not in refused]
+                self._save_outcomes(orders_to_create)
+                if self._checkpoint is not None and last_raw_id is not None:
+                    self._save_checkpoint(reports, last_raw_id)
+        self._failures.clear()
+
+    def _save_checkpoint(self, reports, last_raw_id):
+        checkpoint = self._checkpoint
+        checkpoint.last_raw_id = last_raw_id
+        checkpoint.counters = {name: reports[name] for name in CHECKPOINT_COUNTERS}
+        checkpoint.seen_count = self._seen.count
+        checkpoint.seen_digest = self._seen.hexdigest()
+        checkpoint.save()
+
+    def _resume(self, checkpoint, reports, seen_keys):
+        """
+        Restore the report and the unique keys of an interrupted run : the keys are read
+        back from the orders it saved, and checked against the digest of the checkpoint.
+        """
+        counters = checkpoint.counters
+        for name in ('total_raws', 'orders_created', 'raws_failed'):
+            reports[name] = counters.get(name, 0)
+        reports['errors'] = {key: list(error) for key, error in counters.get('errors', {}).items()}
+        fingerprints = SupplierOrder.objects.filter(
+            raw__status=RawStatus.TRANSFORMED,
+            raw__last_attempt_at__gte=checkpoint.started_at,
+            raw_id__lte=checkpoint.last_raw_id,
+        ).values_list('lot_fingerprint', flat=True)
+        for fingerprint in fingerprints:
+            digest = bytes.fromhex(fingerprint)
+            seen_keys.add(digest)
+            self._seen.add(digest)
+        if self._seen.count != checkpoint.seen_count or self._seen.hexdigest() != checkpoint.seen_digest:
+            raise CheckpointMismatch(
+                f"Checkpoint #{checkpoint.pk} does not match the saved orders : run the transform without resuming"
+            )
+
+    def _iter_serial(self, queryset, headers):
+        for raw in queryset.iterator():
+            if raw.header_id is not None:
+                raw.header = headers[raw.header_id]
+            yield self.transform_one(raw, validate_unique=not self.batch_validation)
+
+    def _iter_frame(self, queryset, headers, chunk_size):
+        """Filters run column-wise on chunks of `chunk_size` raws (see `run_frame`)."""
+        chunk = []
+        for raw in queryset.iterator(chunk_size=chunk_size):
+            if raw.header_id is not None:
+                raw.header = headers[raw.header_id]
+            chunk.append(raw)
+            if len(chunk) >= chunk_size:
+                yield from run_frame(self.filters, chunk, SupplierOrder)
+                chunk = []
+        if chunk:
+            yield from run_frame(self.filters, chunk, SupplierOrder)
+
+    def _iter_shards(self, queryset, shard_size):
+        """Rows of the queryset as plain tuples, by ranges of `shard_size` ids."""
+        ids = list(queryset.values_list('id', flat=True))
+        for start in range(0, len(ids), shard_size):
+            shard = ids[start:start + shard_size]
+            yield list(queryset.filter(id__gte=shard[0], id__lte=shard[-1]).values_list(
+                'id', 'source_file', 'sheet_name', 'row_index', 'data', 'header_id', 'cells'
+            ))
+
+    def _iter_parallel(self, queryset, headers, workers, shard_size):
+        """
+        Run the filters of each shard in a worker process and yield the contexts
+        in the order of the ids, as the serial run does.
+        """
+        columns = {pk: header.columns for pk, header in headers.items()}
+        mp_context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(
+            max_workers=workers, mp_context=mp_context,
+            initializer=transform_workers.init_worker, initargs=(self._sheet_dates, columns),
+        ) as pool:
+            in_flight = deque()
+            shards = self._iter_shards(queryset, shard_size)
+            for shard in shards:
+                in_flight.append((shard, pool.submit(transform_workers.transform_shard, shard)))
+                if len(in_flight) >= workers * 2:
+                    yield from self._shard_contexts(*in_flight.popleft())
+            while in_flight:
+                yield from self._shard_contexts(*in_flight.popleft())
+
+    def _shard_contexts(self, shard, future):
+        results, missing_columns = future.result()
+        self.mapping_filter.merge_missing(missing_columns)
+        for (raw_id, source_file, sheet_name, row_index, *_), (_, error, attrs, failure) in zip(shard, results):
+            raw = SupplierOrderRaw(id=raw_id, source_file=source_file, sheet_name=sheet_name, row_index=row_index)
+            ctx = FilterContext(raw, SupplierOrder)
+            ctx.error = error
+            ctx.failure = failure
+            if error is None:
+                ctx.attrs.update(attrs)
+                ctx.instantiate_order()
+            yield ctx
+
+    def run(self, queryset=None, batch_size=1000, error_key_lenght=40, workers=1, engine='row',
+            checkpoint=None, spill_seen_keys=False):
         """
 
         Args:
             queryset (_type_, optional): Iterable of SupplierOrderRaw. Defaults to None.
             batch_size (int, optional): Size of the batch for saving bucket. Defaults to 1000.
             error_ket_lenght (int, optional): Key lenght for report message error : big implies mores keys. Defaults to 40.
+            workers (int, optional): Number of processes running the filters, by shards of
+                `batch_size` raws. The duplicates, the uniqueness check and the inserts stay
+                in this process, in the order of the ids : the result is the same as a serial run.
+                Uses the batch validation. Defaults to 1.
+            engine (str, optional): 'row' runs the filters one raw at a time, 'frame' runs
+                them column-wise on DataFrames of `batch_size` raws (same results, uses the
+                batch validation). Ignored with workers. Defaults to 'row'.
+            checkpoint (TransformCheckpoint, optional): Saved with each batch, in its
+                transaction. If it has a `last_raw_id` the run resumes after it, with its
+                counters and unique keys. The raws are read by id. Ignored in dry run.
+            spill_seen_keys (bool, optional): Keep the digests of the unique keys already
+                seen in a temporary SQLite database instead of memory. Defaults to False.
 
         Returns:
             reports (dict) : A report of the transfer
         """
         orders_to_create = []
+        pending = []
         reports = {
             'total_raws': 0,
             'orders_created': 0,
             'raws_failed': 0,
-            'errors': {}
+            'errors': {},
+            # File -> sheet -> fields of the mapping without any column in one of its headers
+            'missing_columns': {},
+            # File -> sheet -> {field: format} inferred for the date columns
+            'date_formats': {},
+            # File -> sheet -> date fields where day and month can be swapped (read month-first)
+            'ambiguous_dates': {},
+            # Orders of the raws changed since their transform (STALE), deleted before it
+            'stale_orders_deleted': 0,
         }
-        seen_keys = set()
+        seen_keys = seen_keys_store(spill=spill_seen_keys)
+        self._seen = SeenDigest()
+        self._checkpoint = None if self.dry_run else checkpoint
+        if self._checkpoint is not None and checkpoint.last_raw_id is not None:
+            self._resume(checkpoint, reports, seen_keys)
+            queryset = queryset.filter(pk__gt=checkpoint.last_raw_id)
+        # Flags set at import : these raws are not even loaded
+        reports['skipped'] = self._skipped_counts(queryset)
+        if self._checkpoint is not None:
+            for code, count in checkpoint.counters.get('skipped', {}).items():
+                reports['skipped'][code] += count
+        reports['config_version'] = self.config['version']
+        if not self.dry_run:
+            register_config(self.config)
+            # Avant les flags : un raw périmé peut être devenu annulé ou vide
+            reports['stale_orders_deleted'] = self._drop_stale_orders(queryset)
+            self._mark_skipped(queryset)
+        queryset = queryset.exclude(SKIPPED_RAWS)
+        self._failures.clear()
+        if workers > 1 or self._checkpoint is not None or not queryset.ordered:
+            # Même ordre (les ids) en série, avec les workers et pour la reprise
+            queryset = queryset.order_by('pk')
+        self.mapping_filter.reset_missing()
+        self._prepare_date_parsers(queryset, reports)
+        cache_before = parse_cache_stats()
+        # Compact raws share a few headers : load them once instead of once per row
+        headers = RawSheetHeader.objects.in_bulk(
+            queryset.filter(header__isnull=False).order_by().values_list('header_id', flat=True).distinct()
+        )
 
-        for raw in queryset.iterator():
+        batched = self.batch_validation
+        if workers > 1:
+            contexts = self._iter_parallel(queryset, headers, workers, batch_size)
+            batched = True
+        elif engine == 'frame':
+            contexts = self._iter_frame(queryset, headers, batch_size)
+            batched = True
+        else:
+            contexts = self._iter_serial(queryset, headers)
+
+        last_raw_id = None
+        for ctx in contexts:
+            raw = ctx.raw
+            last_raw_id = raw.pk
+            if raw.sheet_name != self.progress.sheet:
+                self.progress.start_sheet(raw.sheet_name)
             reports['total_raws'] += 1
-            ctx = self.transform_one(raw)
 
             if ctx.error is None:
                 # Construction de la clé de doublon depuis les champs uniques
-                key = tuple(getattr(ctx.order, f) for f in self.unique_fields)
-                if key in seen_keys:
-                    ctx.error = f"Duplicated row : {key}"
-                    self._manage_new_error(ctx, reports, error_key_lenght)
-                    reports['raws_failed'] += 1
+                key = self._unique_key(ctx.order)
+                if batched:
+                    pending.append((ctx, key))
                 else:
-                    seen_keys.add(key)
-                    orders_to_create.append(ctx.order)
-                    reports['orders_created'] += 1
+                    self._accept(ctx, key, seen_keys, orders_to_create, reports, error_key_lenght)
             else:
                 reports['raws_failed'] += 1
                 self._manage_new_error(ctx, reports, error_key_lenght)
-            # Bulk insert par batch
-            if len(orders_to_create) >= batch_size:
-                if not self.dry_run:
-                    with transaction.atomic():
-                        SupplierOrder.objects.bulk_create(orders_to_create, batch_size)
+            self.progress.add(rows_read=1)
+            if len(pending) >= batch_size:
+                self._validate_batch(pending, seen_keys, orders_to_create, reports, error_key_lenght)
+            # Bulk insert par batch (avec les statuts des raws)
+            if len(orders_to_create) >= batch_size or len(self._failures) >= batch_size:
+                # Toutes les lignes lues sont traitées avant le point de reprise
+                self._validate_batch(pending, seen_keys, orders_to_create, reports, error_key_lenght)
+                if orders_to_create:
+                    self.progress.add(batches_flushed=1)
+                self._flush(orders_to_create, seen_keys, batch_size, reports, last_raw_id, error_key_lenght)
                 orders_to_create.clear()
 
         # Flush final
+        self._validate_batch(pending, seen_keys, orders_to_create, reports, error_key_lenght)
         if not self.dry_run and orders_to_create:
-            with transaction.atomic():
-                SupplierOrder.objects.bulk_create(orders_to_create, batch_size)
+            self.progress.add(batches_flushed=1)
+        self._flush(orders_to_create, seen_keys, batch_size, reports, last_raw_id, error_key_lenght)
+        orders_to_create.clear()
+        if self._checkpoint is not None:
+            self._checkpoint.finished_at = timezone.now()
+            self._checkpoint.save(update_fields=['finished_at', 'updated_at'])
+        seen_keys.close()
+        self.progress.finish()
+
+        reports['missing_columns'] = {
+            source_file: missing
+            for source_file, sheets in self.mapping_filter.missing_columns.items()
+            if (missing := {sheet: fields for sheet, fields in sheets.items() if fields})
+        }
+        reports['parse_cache'] = self._parse_cache_report(cache_before)
 
         return reports
@@ -0,0 +1,60 @@
+"""
+Worker processes of `SupplierOrderTransformer.run(workers=N)`.
+
+The workers only run the filter pipeline on plain rows sent by the parent : they
+never touch the database. Django models are imported after `django.setup()`, as
+this module is imported by the spawned processes before the apps are loaded.
+"""
+_transformer = None
+_headers = {}
+
+
+def init_worker(sheet_dates, headers):
+    """
+    Args:
+        sheet_dates (dict): (source_file, sheet_name) -> {field: (format, converted dates)}, see
+            `SupplierOrderTransformer._prepare_date_parsers`.
+        headers (dict): RawSheetHeader id -> columns.
+    """
+    import django
+    django.setup()
+
+    from core.common.tools.parse import column_date_parser
+    from core.supplier_order.services.transform import SupplierOrderTransformer
+
+    global _transformer, _headers
+    _transformer = SupplierOrderTransformer(dry_run=True)
+    for (source_file, sheet_name), fields in sheet_dates.items():
+        _transformer.type_filter.set_sheet_parsers(source_file, sheet_name, {
+            field: column_date_parser(converted, fmt) for field, (fmt, converted) in fields.items()
+        })
+    _headers = headers
+
+
+def transform_shard(rows):
+    """
+    Args:
+        rows (list): (id, source_file, sheet_name, row_index, data, header_id, cells) of raws.
+
+    Returns:
+        (results, missing_columns) : `results` is a list of (raw_id, error, attrs, failure)
+        in the order of `rows`, `attrs` being the order fields (without `raw`) when valid.
+    """
+    from core.order_raw.models import RawSheetHeader, SupplierOrderRaw
+
+    _transformer.mapping_filter.reset_missing()
+    results = []
+    for raw_id, source_file, sheet_name, row_index, data, header_id, cells in rows:
+        raw = SupplierOrderRaw(
+            id=raw_id, source_file=source_file, sheet_name=sheet_name, row_index=row_index,
+            data=data, cells=cells,
+        )
+        if header_id is not None:
+            raw.header = RawSheetHeader(id=header_id, columns=_headers[header_id])
+        ctx = _transformer.transform_one(raw, validate_unique=False)
+        if ctx.error is None:
+            attrs = {name: value for name, value in ctx.attrs.items() if name != 'raw'}
+            results.append((raw_id, None, attrs, None))
+        else:
+            results.append((raw_id, ctx.error, None, ctx.failure))
+    return results, _transformer.mapping_filter.missing_columns
@@ -1,7 +1,26 @@
+import importlib
+import inspect
+import io
+import json
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from unittest import mock
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.apps import apps
+from django.forms import modelform_factory
+from django.db import IntegrityError, connection, transaction
 from django.test import TestCase
-from core.order_raw.models import SupplierOrderRaw
-from core.supplier_order.services.transform import SupplierOrderTransformer
-from core.supplier_order.models import SupplierOrder
+from django.test.utils import CaptureQueriesContext
+from core.order_raw.models import SupplierOrderRaw, RawSheetHeader, RawStatus
+from core.common.tools.row import compact_row, is_duplicate_object
+from core.common.services.bulk import bulk_create_isolating
+from core.supplier_order.services.transform import CheckpointMismatch, SupplierOrderTransformer
+from core.supplier_order.models import SupplierOrder, TransformCheckpoint, TransformError
+from core.supplier_order.mapping import SUPPLIER_COLUMN_MAPPING
+from core.supplier_order.services.config_version import failed_since_change
+from core.supplier_order.services.seen_keys import SpilledSeenKeys, key_digest
 
 class TransformErrorAndDuplicateTests(TestCase):
     def setUp(self):
@@ -74,3 +93,479 @@ class TransformErrorAndDuplicateTests(TestCase):
         stats2 = t.run(queryset=SupplierOrderRaw.objects.filter(id=raw2.id))
         self.assertEqual(stats2['raws_failed'], 1)
         self.assertEqual(stats2['orders_created'], 0)
+
+    def test_raw_status_work_queue(self):
+        ok = self.make_raw({'No.': '1'})
+        bad = self.make_raw({'Carats': 'abc'})
+        memo = self.make_raw({'Client Memo': 'M'})
+        dup = self.make_raw({'No.': '1'})
+        pending = SupplierOrderRaw.objects.filter(status=RawStatus.PENDING)
+        stats = SupplierOrderTransformer().run(queryset=pending, batch_size=2)
+        self.assertEqual(stats['total_raws'], 4)
+        outcomes = {
+            pk: (status, code)
+            for pk, status, code in SupplierOrderRaw.objects.values_list('id', 'status', 'error_code')
+        }
+        self.assertEqual(outcomes[ok.id], (RawStatus.TRANSFORMED, None))
+        self.assertEqual(outcomes[bad.id][0], RawStatus.FAILED)
+        self.assertEqual(outcomes[memo.id], (RawStatus.SKIPPED, 'not_purchase'))
+        self.assertEqual(outcomes[dup.id], (RawStatus.FAILED, 'duplicate'))
+        self.assertTrue(all(raw.last_attempt_at for raw in SupplierOrderRaw.objects.all()))
+
+        # Rien n'est repris sans demander les lignes en échec
+        self.assertEqual(SupplierOrderTransformer().run(queryset=pending)['total_raws'], 0)
+        retry = SupplierOrderRaw.objects.filter(status__in=[RawStatus.PENDING, RawStatus.FAILED])
+        self.assertEqual(SupplierOrderTransformer().run(queryset=retry)['total_raws'], 2)
+
+    def test_retry_failed_since_config_change(self):
+        vendor = self.make_raw({'Vendor': 'TEST'})
+        vendor.data.pop('Client')
+        vendor.save()
+        self.make_raw({'Carats': 'abc'})
+        first = SupplierOrderTransformer()
+        first.run(queryset=SupplierOrderRaw.objects.all())
+        self.assertEqual(SupplierOrderRaw.objects.filter(status=RawStatus.FAILED).count(), 2)
+        self.assertFalse(failed_since_change(SupplierOrderRaw.objects.all(), first.config).exists())
+
+        # Nouvel alias : seule la ligne qui a cette colonne est reprise
+        aliases = [*SUPPLIER_COLUMN_MAPPING['supplier'], 'Vendor']
+        with mock.patch.dict(SUPPLIER_COLUMN_MAPPING, {'supplier': aliases}):
+            transformer = SupplierOrderTransformer()
+            retry = failed_since_change(SupplierOrderRaw.objects.all(), transformer.config)
+            self.assertEqual(list(retry.values_list('id', flat=True)), [vendor.id])
+            stats = transformer.run(queryset=retry)
+        self.assertEqual(stats['orders_created'], 1)
+
+        # Filtres modifiés : toutes les lignes en échec sont reprises
+        fixed = {**first.config, 'version': 'fixed', 'parsers': 'fixed'}
+        retry = failed_since_change(SupplierOrderRaw.objects.all(), fixed)
+        self.assertEqual(retry.count(), 1)
+
+        # Correctif des formats de date ou du transformer : nouvelle version
+        getsource = inspect.getsource
+        for module in ('core.common.services.date_formats', 'core.supplier_order.services.transform'):
+            def patched(obj, module=module):
+                return getsource(obj) + ('# fix' if obj.__name__ == module else '')
+            with mock.patch('inspect.getsource', patched):
+                self.assertNotEqual(SupplierOrderTransformer().config['version'], first.config['version'])
+
+    def test_resume_from_checkpoint_after_crash(self):
+        for overrides in ({'No.': '1'}, {'No.': '2'}, {'Carats': 'abc'}, {'No.': '1'}, {'No.': '4'}):
+            self.make_raw(overrides)
+        transformer = SupplierOrderTransformer()
+        checkpoint = TransformCheckpoint.objects.create(config_version=transformer.config['version'])
+        save_outcomes = SupplierOrderTransformer._save_outcomes
+        calls = []
+
+        def crash_on_second_batch(self, orders):
+            calls.append(orders)
+            if len(calls) == 2:
+                raise RuntimeError("crash")
+            return save_outcomes(self, orders)
+
+        pending = SupplierOrderRaw.objects.filter(status=RawStatus.PENDING)
+        with mock.patch.object(SupplierOrderTransformer, '_save_outcomes', crash_on_second_batch):
+            with self.assertRaises(RuntimeError):
+                transformer.run(queryset=pending, batch_size=2, checkpoint=checkpoint)
+        checkpoint.refresh_from_db()
+        raw_ids = list(SupplierOrderRaw.objects.order_by('id').values_list('id', flat=True))
+        self.assertEqual(checkpoint.last_raw_id, raw_ids[1])
+        self.assertEqual(checkpoint.counters['orders_created'], 2)
+
+        resumed = SupplierOrderTransformer().run(queryset=pending, batch_size=2, checkpoint=checkpoint)
+        checkpoint.refresh_from_db()
+        self.assertIsNotNone(checkpoint.finished_at)
+
+        # Même rapport qu'un passage sans interruption
+        SupplierOrder.objects.all().delete()
+        SupplierOrderRaw.objects.update(status=RawStatus.PENDING)
+        full = SupplierOrderTransformer().run(queryset=pending, batch_size=2)
+        counters = ('total_raws', 'orders_created', 'raws_failed', 'errors', 'skipped')
+        self.assertEqual({k: resumed[k] for k in counters}, {k: full[k] for k in counters})
+        self.assertEqual((full['total_raws'], full['orders_created']), (5, 3))
+
+        # Clés modifiées depuis le point de reprise : la reprise est refusée
+        checkpoint.finished_at = None
+        checkpoint.seen_digest = '0'
+        checkpoint.save()
+        with self.assertRaises(CheckpointMismatch):
+            SupplierOrderTransformer().run(queryset=pending, checkpoint=checkpoint)
+
+    def test_resume_requires_the_same_selection(self):
+        self.make_raw({})
+        version = SupplierOrderTransformer().config['version']
+        selection = {'retry_failed': True, 'retry_failed_since_change': False, 'engine': 'row'}
+        TransformCheckpoint.objects.create(config_version=version, selection=selection, last_raw_id=0, seen_digest='0' * 32)
+        with self.assertRaisesMessage(CommandError, "started with other options"):
+            call_command('transform_supplier_orders', '--resume', '--no-progress', stdout=io.StringIO())
+        call_command('transform_supplier_orders', '--resume', '--retry-failed', '--no-progress', stdout=io.StringIO())
+        self.assertEqual(SupplierOrder.objects.count(), 1)
+
+    def test_errors_of_the_run_keep_their_traceback(self):
+        self.make_raw({})
+        with mock.patch.object(SupplierOrderTransformer, '_flush', side_effect=ValueError("bug")):
+            with self.assertRaisesMessage(ValueError, "bug"):
+                call_command('transform_supplier_orders', '--no-progress', stdout=io.StringIO())
+
+    def test_errors_saved_with_field_and_value(self):
+        carats = self.make_raw({'Carats': 'abc'})
+        memo = self.make_raw({'Client Memo': 'M'})
+        empty = self.make_raw({'Client': ''})
+        self.make_raw({})
+        SupplierOrderTransformer().run(queryset=SupplierOrderRaw.objects.all())
+        errors = {
+            error.raw_id: (error.code, error.filter, error.field, error.value, error.sheet_name)
+            for error in TransformError.objects.all()
+        }
+        self.assertEqual(errors, {
+            carats.id: ('parse', 'TypeParsingFilter', 'carats', 'abc', 'S1'),
+            memo.id: ('not_purchase', 'IsPurchaseFilter', 'client_memo', 'M', 'S1'),
+            empty.id: ('required', 'RequiredFieldFilter', 'supplier', None, 'S1'),
+        })
+
+        # Nouvelle tentative : les erreurs remplacent les précédentes
+        SupplierOrderRaw.objects.filter(id=carats.id).update(data={**carats.data, 'Carats': '2.5'})
+        SupplierOrderTransformer().run(queryset=SupplierOrderRaw.objects.filter(id=carats.id))
+        self.assertFalse(TransformError.objects.filter(raw_id=carats.id).exists())
+
+        out = io.StringIO()
+        call_command('transform_errors', '--by', 'sheet_name', 'field', '--samples', '1', stdout=out)
+        self.assertIn("sheet_name=S1 | field=client_memo", out.getvalue())
+        self.assertIn("[M] Not a purchase", out.getvalue())
+        self.assertIn("2 errors", out.getvalue())
+
+        # Plusieurs champs manquants : le premier est enregistré, le message les liste tous
+        both = self.make_raw({'Client': '', 'Date': None})
+        SupplierOrderTransformer().run(queryset=SupplierOrderRaw.objects.filter(id=both.id))
+        error = TransformError.objects.get(raw_id=both.id)
+        self.assertEqual(error.field, 'date')
+        self.assertTrue(error.message.startswith('Required field missing : date, supplier'))
+
+    def test_spilled_seen_keys_report_same_duplicates(self):
+        for i in range(9):
+            self.make_raw({'No.': str(i % 4)})
+        reports = []
+        for spill in (False, True):
+            stats = SupplierOrderTransformer(dry_run=True).run(
+                queryset=SupplierOrderRaw.objects.all(), batch_size=3, spill_seen_keys=spill
+            )
+            reports.append((stats['orders_created'], stats['raws_failed'], stats['errors']))
+        self.assertEqual(reports[0], reports[1])
+        self.assertEqual(reports[0][:2], (4, 5))
+
+    def test_seen_keys_digests(self):
+        utc = datetime(2025, 5, 6, 3, tzinfo=dt_timezone.utc)
+        bangkok = utc.astimezone(dt_timezone(timedelta(hours=7)))
+        self.assertEqual(key_digest((utc, Decimal('1.0'), 'Ruby')), key_digest((bangkok, Decimal('1.000'), 'Ruby')))
+        self.assertNotEqual(key_digest((None,)), key_digest(('None',)))
+        seen = SpilledSeenKeys(buffer_size=2)
+        for i in range(5):
+            seen.add(key_digest((i,)))
+        seen.add(key_digest((0,)))
+        self.assertEqual(len(seen), 5)
+        self.assertIn(key_digest((0,)), seen)
+        self.assertNotIn(key_digest((5,)), seen)
+        # Une clé écrite sur disque et une encore en mémoire
+        seen.discard(key_digest((0,)))
+        seen.discard(key_digest((4,)))
+        seen.discard(key_digest((5,)))
+        self.assertEqual(len(seen), 3)
+        self.assertNotIn(key_digest((0,)), seen)
+        self.assertNotIn(key_digest((4,)), seen)
+        seen.close()
+
+    def test_lot_fingerprint_unique(self):
+        raw = self.make_raw({})
+        SupplierOrderTransformer().run(queryset=SupplierOrderRaw.objects.all())
+        order = SupplierOrder.objects.get()
+        self.assertEqual(len(order.lot_fingerprint), 32)
+        self.assertEqual(order.lot_fingerprint, order.make_lot_fingerprint())
+
+        copy = SupplierOrder.objects.get()
+        copy.pk, copy.raw = None, None
+        self.assertTrue(is_duplicate_object(copy))
+        copy.carats += 1
+        self.assertFalse(is_duplicate_object(copy))
+        copy.carats -= 1
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            copy.save()
+
+    def test_lot_fingerprint_backfill_leaves_duplicates_null(self):
+        migration = importlib.import_module('core.migrations.0016_supplier_lot_fingerprint')
+        SupplierOrderTransformer().run(queryset=SupplierOrderRaw.objects.filter(id=self.make_raw({}).id))
+        order = SupplierOrder.objects.get()
+        fingerprint = order.lot_fingerprint
+        # Deux commandes du même lot, enregistrées avant le fingerprint
+        SupplierOrder.objects.update(lot_fingerprint=None)
+        order.pk, order.raw, order.lot_fingerprint = None, None, None
+        SupplierOrder.objects.bulk_create([order])
+        migration.backfill_fingerprints(apps, None)
+        self.assertEqual(
+            list(SupplierOrder.objects.order_by('pk').values_list('lot_fingerprint', flat=True)),
+            [fingerprint, None],
+        )
+
+        # Modifié dans l'admin sans changer le lot : erreur de validation, pas d'IntegrityError
+        duplicate = SupplierOrder.objects.get(lot_fingerprint__isnull=True)
+        form = modelform_factory(SupplierOrder, fields=['book_no'])({'book_no': 7}, instance=duplicate)
+        self.assertFalse(form.is_valid())
+        self.assertIn(f"order #{SupplierOrder.objects.get(lot_fingerprint=fingerprint).pk}", form.non_field_errors()[0])
+        form = modelform_factory(SupplierOrder, fields=['carats'])({'carats': '9.5'}, instance=duplicate)
+        self.assertTrue(form.is_valid())
+        self.assertEqual(form.save().lot_fingerprint, duplicate.make_lot_fingerprint())
+
+    def test_bulk_create_isolating_keeps_good_rows(self):
+        existing = SupplierOrder.objects.create(date=datetime(2025, 5, 6, tzinfo=dt_timezone.utc), supplier='A', order_no=3)
+        orders = [
+            SupplierOrder(date=existing.date, supplier='A', order_no=i)
+            for i in range(64)
+        ]
+        for order in orders:
+            order.lot_fingerprint = order.make_lot_fingerprint()
+        orders.append(SupplierOrder(date=existing.date, supplier='A', order_no=40, lot_fingerprint=orders[40].lot_fingerprint))
+        with CaptureQueriesContext(connection) as ctx:
+            rejected = bulk_create_isolating(SupplierOrder, orders)
+        self.assertEqual([order.order_no for order, _ in rejected], [3, 40])
+        self.assertTrue(all(isinstance(e, IntegrityError) for _, e in rejected))
+        self.assertEqual(sorted(SupplierOrder.objects.values_list('order_no', flat=True)), list(range(64)))
+        self.assertTrue(all(order.pk is None for order, _ in rejected))
+        inserts = [q for q in ctx.captured_queries if q['sql'].startswith('INSERT')]
+        # 2 conflits parmi 65 lignes : O(k log n) inserts
+        self.assertLessEqual(len(inserts), 2 * 2 * 7)
+
+    def test_insert_conflict_fails_only_its_raw(self):
+        raws = [self.make_raw({'No.': str(i)}) for i in range(4)]
+        SupplierOrderTransformer().run(queryset=SupplierOrderRaw.objects.filter(id=raws[2].id))
+        SupplierOrderRaw.objects.filter(id=raws[2].id).update(status=RawStatus.PENDING)
+        other = self.make_raw({'No.': '2'})
+        # Commande insérée entre la vérification et l'insert (autre processus)
+        with mock.patch.object(SupplierOrderTransformer, '_existing_conflicts', return_value=set()):
+            stats = SupplierOrderTransformer().run(
+                queryset=SupplierOrderRaw.objects.exclude(id=raws[2].id), batch_size=10
+            )
+        self.assertEqual((stats['orders_created'], stats['raws_failed']), (3, 1))
+        self.assertEqual(SupplierOrder.objects.count(), 4)
+        other.refresh_from_db()
+        self.assertEqual((other.status, other.error_code), (RawStatus.FAILED, 'conflict'))
+        error = TransformError.objects.get(raw=other)
+        self.assertIn('Insert conflict', error.message)
+        self.assertEqual(error.row_index, other.row_index)
+
+    def test_stale_raw_replaces_its_order(self):
+        raw = self.make_raw({})
+        SupplierOrderTransformer().run(queryset=SupplierOrderRaw.objects.all())
+        # Ligne modifiée par un nouvel import après sa transformation
+        SupplierOrderRaw.objects.filter(id=raw.id).update(data={**raw.data, 'Carats': '2.50'}, status=RawStatus.STALE)
+        call_command('transform_supplier_orders', '--no-progress', stdout=io.StringIO())
+        order = SupplierOrder.objects.get()
+        self.assertEqual((order.raw_id, order.carats), (raw.id, Decimal('2.5')))
+        raw.refresh_from_db()
+        self.assertEqual(raw.status, RawStatus.TRANSFORMED)
+
+    def test_raw_conflict_leaves_the_lot_to_later_rows(self):
+        first = self.make_raw({})
+        second = self.make_raw({})
+        for spill in (False, True):
+            SupplierOrder.objects.all().delete()
+            SupplierOrderRaw.objects.update(status=RawStatus.PENDING)
+            # Le raw a déjà une commande (autre lot) insérée entre la vérification et l'insert
+            SupplierOrder.objects.create(raw=first, date=datetime(2024, 1, 1, tzinfo=dt_timezone.utc), supplier='Other')
+            with mock.patch.object(SupplierOrderTransformer, '_existing_conflicts', return_value=set()):
+                stats = SupplierOrderTransformer().run(
+                    queryset=SupplierOrderRaw.objects.order_by('id'), batch_size=1, spill_seen_keys=spill
+                )
+            self.assertEqual((stats['orders_created'], stats['raws_failed']), (1, 1))
+            self.assertEqual(SupplierOrder.objects.get(supplier='TEST#!#!').raw_id, second.id)
+
+    def test_compact_raw_transformed_like_dict_raw(self):
+        columns, cells = compact_row(self.valid_payload)
+        raw = SupplierOrderRaw.objects.create(
+            source_file='f.xlsx', sheet_name='S1', row_index=99,
+            header=RawSheetHeader.for_columns(columns), cells=cells,
+        )
+        stats = SupplierOrderTransformer(dry_run=False).run(
+            queryset=SupplierOrderRaw.objects.filter(id=raw.id)
+        )
+        self.assertEqual(stats['orders_created'], 1)
+        self.assertEqual(SupplierOrder.objects.get().raw_id, raw.id)
+
+    def test_columns_resolved_per_header(self):
+        self.make_raw({'Colour': 'Red'})
+        self.make_raw({'Colour': 'Blue', 'Shape': 'Oval', 'No.': '2'})
+        SupplierOrderRaw.objects.create(
+            source_file='f.xlsx', sheet_name='S2', row_index=0,
+            data={**self.valid_payload, 'Color': 'Pink', 'No.': '3'},
+        )
+        transformer = SupplierOrderTransformer(dry_run=False)
+        stats = transformer.run(queryset=SupplierOrderRaw.objects.order_by('id'))
+        self.assertEqual(stats['orders_created'], 3)
+        self.assertEqual(
+            list(SupplierOrder.objects.order_by('raw_id').values_list('color', 'shape')),
+            [('Red', None), ('Blue', 'Oval'), ('Pink', None)],
+        )
+        # Manquants de la feuille : union de ses en-têtes (Shape absent de la 1re ligne de S1)
+        missing = stats['missing_columns']['f.xlsx']
+        self.assertIn('shape', missing['S1'])
+        self.assertNotIn('color', missing['S1'])
+        self.assertIn('shape', missing['S2'])
+        self.assertEqual(len(transformer.mapping_filter._resolved), 3)
+
+    def test_missing_columns_per_file_and_header(self):
+        full = {**self.valid_payload, 'Shape': 'Oval', 'Colour': 'Red'}
+        SupplierOrderRaw.objects.create(source_file='a.xlsx', sheet_name='2016', row_index=0, data=full)
+        SupplierOrderRaw.objects.create(
+            source_file='b.xlsx', sheet_name='2016', row_index=0,
+            data={k: v for k, v in full.items() if k != 'Carats'},
+        )
+        SupplierOrderRaw.objects.create(
+            source_file='b.xlsx', sheet_name='2016', row_index=1,
+            data={k: v for k, v in full.items() if k != 'Colour'},
+        )
+        for kwargs in ({}, {'engine': 'frame'}, {'workers': 2}):
+            stats = SupplierOrderTransformer(dry_run=True).run(queryset=SupplierOrderRaw.objects.all(), **kwargs)
+            missing = stats['missing_columns']
+            self.assertNotIn('carats', missing['a.xlsx']['2016'])
+            self.assertIn('carats', missing['b.xlsx']['2016'])
+            self.assertIn('color', missing['b.xlsx']['2016'])
+
+    def test_report_parse_cache_hits(self):
+        for i in range(3):
+            self.make_raw({'No.': str(i)})
+        stats = SupplierOrderTransformer(dry_run=True).run(queryset=SupplierOrderRaw.objects.all())
+        # Les mêmes carats sur les 3 lignes : parsés une seule fois
+        self.assertGreaterEqual(stats['parse_cache']['to_decimal']['hits'], 2)
+
+    def test_date_format_inferred_per_sheet(self):
+        self.make_raw({'No.': '1', 'Date': '06/05/2025'})
+        self.make_raw({'No.': '2', 'Date': '13/05/2025'})
+        SupplierOrderRaw.objects.create(
+            source_file='f.xlsx', sheet_name='S2', row_index=0,
+            data={**self.valid_payload, 'Date': '06/05/2025'},
+        )
+        columns, cells = compact_row({**self.valid_payload, 'No.': '4', 'Date': 45783})
+        SupplierOrderRaw.objects.create(
+            source_file='f.xlsx', sheet_name='S3', row_index=0,
+            header=RawSheetHeader.for_columns(columns), cells=cells,
+        )
+        stats = SupplierOrderTransformer(dry_run=False).run(queryset=SupplierOrderRaw.objects.all())
+        self.assertEqual(stats['orders_created'], 4)
+        self.assertEqual(stats['date_formats'], {'f.xlsx': {
+            'S1': {'date': '%d/%m/%Y'}, 'S2': {'date': '%m/%d/%Y'}, 'S3': {'date': 'excel'},
+        }})
+        self.assertEqual(stats['ambiguous_dates'], {'f.xlsx': {'S2': ['date']}})
+        dates = {
+            (o.raw.sheet_name, o.raw.row_index): (o.date.month, o.date.day)
+            for o in SupplierOrder.objects.select_related('raw')
+        }
+        # S1 : jour en premier sur toute la colonne
+        self.assertEqual(dates[('S1', 0)], (5, 6))
+        self.assertEqual(dates[('S1', 1)], (5, 13))
+        # S2 ambigu : mois en premier, comme pd.to_datetime
+        self.assertEqual(dates[('S2', 0)], (6, 5))
+        self.assertEqual(dates[('S3', 0)], (5, 6))
+
+    def test_date_formats_reported_per_file(self):
+        self.make_raw({'Date': '13/05/2025'})
+        SupplierOrderRaw.objects.create(
+            source_file='g.xlsx', sheet_name='S1', row_index=0,
+            data={**self.valid_payload, 'No.': '2', 'Date': '06/05/2025'},
+        )
+        stats = SupplierOrderTransformer(dry_run=True).run(queryset=SupplierOrderRaw.objects.all())
+        # Même nom de feuille dans deux fichiers : pas d'écrasement
+        self.assertEqual(stats['date_formats'], {
+            'f.xlsx': {'S1': {'date': '%d/%m/%Y'}}, 'g.xlsx': {'S1': {'date': '%m/%d/%Y'}},
+        })
+        self.assertEqual(stats['ambiguous_dates'], {'g.xlsx': {'S1': ['date']}})
+        json.dumps(stats)
+
+    def test_dates_out_of_the_sample_use_the_sheet_format(self):
+        self.make_raw({'No.': '1', 'Date': '13/05/2025'})
+        # Hors de l'échantillon (une ligne) : ambigu seul, lu jour en premier comme la feuille
+        self.make_raw({'No.': '2', 'Date': '05/03/2024'})
+        for workers in (1, 2):
+            SupplierOrder.objects.all().delete()
+            stats = SupplierOrderTransformer(date_sample_size=1).run(
+                queryset=SupplierOrderRaw.objects.all(), workers=workers
+            )
+            self.assertEqual(stats['date_formats'], {'f.xlsx': {'S1': {'date': '%d/%m/%Y'}}})
+            dates = [(d.year, d.month, d.day) for d in SupplierOrder.objects.order_by('raw_id').values_list('date', flat=True)]
+            self.assertEqual(dates, [(2025, 5, 13), (2024, 3, 5)])
+
+    def count_queries(self, n_rows, **kwargs):
+        SupplierOrderRaw.objects.all().delete()
+        for i in range(n_rows):
+            self.make_raw({'No.': str(i)})
+        with CaptureQueriesContext(connection) as ctx:
+            stats = SupplierOrderTransformer(dry_run=True, **kwargs).run(
+                queryset=SupplierOrderRaw.objects.all()
+            )
+        self.assertEqual(stats['orders_created'], n_rows)
+        return len(ctx.captured_queries)
+
+    def test_batch_validation_queries_do_not_grow_with_rows(self):
+        self.assertEqual(self.count_queries(3), self.count_queries(12))
+        self.assertGreater(
+            self.count_queries(12, batch_validation=False), self.count_queries(12)
+        )
+
+    def test_batch_validation_reports_same_conflicts(self):
+        raw1 = self.make_raw({'No.': '10'})
+        SupplierOrderTransformer().run(queryset=SupplierOrderRaw.objects.filter(id=raw1.id))
+        raw2 = self.make_raw({'No.': '10'})
+        reports = [
+            SupplierOrderTransformer(dry_run=True, batch_validation=batch).run(
+                queryset=SupplierOrderRaw.objects.filter(id=raw2.id)
+            )['errors']
+            for batch in (True, False)
+        ]
+        self.assertEqual(reports[0], reports[1])
+        self.assertIn('already exists', list(reports[0].values())[0][1])
+
+    def test_workers_match_serial_run(self):
+        for i in range(7):
+            self.make_raw({'No.': str(i % 4), 'Date': '13/05/2025' if i % 2 else '01/05/2025'})
+        self.make_raw({'Carats': 'abc'})
+        columns, cells = compact_row({**self.valid_payload, 'No.': '9'})
+        SupplierOrderRaw.objects.create(
+            source_file='f.xlsx', sheet_name='S2', row_index=0,
+            header=RawSheetHeader.for_columns(columns), cells=cells,
+        )
+        results = []
+        for workers in (1, 2):
+            SupplierOrder.objects.all().delete()
+            stats = SupplierOrderTransformer().run(
+                queryset=SupplierOrderRaw.objects.all(), batch_size=3, workers=workers
+            )
+            stats.pop('parse_cache')
+            orders = list(SupplierOrder.objects.order_by('raw_id').values_list('raw_id', 'order_no', 'date', 'carats'))
+            errors = list(TransformError.objects.order_by('raw_id').values_list('raw_id', 'code', 'filter', 'field', 'value'))
+            results.append((stats, orders, errors))
+        self.assertEqual(results[0], results[1])
+        self.assertEqual(results[0][0]['raws_failed'], 4)
+
+    def test_frame_engine_matches_row_engine(self):
+        for i, overrides in enumerate([
+            {}, {'No.': '1'}, {'Client Memo': 'M'}, {'Remarks': 'Cancelled !'},
+            {'Client': ''}, {'Carats': 'abc'}, {'Date': '13/13/2000'}, {'PC': '3 pcs', 'Colour': 'Red'},
+            {'Date': '', 'Client': '', 'Stone': '', 'PC': '', 'Carats': '', 'No.': ''},
+        ]):
+            self.make_raw({'No.': str(i), **overrides})
+        for i in range(3):
+            columns, cells = compact_row({**self.valid_payload, 'No.': str(20 + i % 2), 'Carats': 1.5})
+            SupplierOrderRaw.objects.create(
+                source_file='f.xlsx', sheet_name='S2', row_index=i,
+                header=RawSheetHeader.for_columns(columns), cells=cells,
+            )
+        transformer = SupplierOrderTransformer()
+        results = []
+        for engine in ('row', 'frame'):
+            SupplierOrder.objects.all().delete()
+            stats = transformer.run(queryset=SupplierOrderRaw.objects.all(), batch_size=4, engine=engine)
+            stats.pop('parse_cache')
+            orders = list(SupplierOrder.objects.order_by('raw_id').values_list(
+                'raw_id', 'order_no', 'date', 'supplier', 'number', 'color', 'carats'
+            ))
+            errors = list(TransformError.objects.order_by('raw_id').values_list('raw_id', 'code', 'filter', 'field', 'value'))
+            results.append((stats, orders, errors))
+        self.assertEqual(results[0], results[1])
+        self.assertEqual(results[0][0]['orders_created'], 5)
@@ -1,10 +1,16 @@
-
-from core.supplier_order.services.old_imports import import_supplier_orders
-from core.common.views.import_ import orders_import_upload
+from core.common.views.import_ import orders_import_enqueue, import_job_status, import_job_events
 
 def supplier_orders_import_upload(request):
-    return orders_import_upload(
+    return orders_import_enqueue(
         request=request,
-        import_order_func=import_supplier_orders,
+        order_type="supplier",
         order_name="supplier"
     )
+
+
+def supplier_orders_import_job(request, job_id):
+    return import_job_status(request, job_id)
+
+
+def supplier_orders_import_job_events(request, job_id):
+    return import_job_events(request, job_id)
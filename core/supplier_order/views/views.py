@@ -11,7 +11,8 @@ def supplier_orders_list(request):
 
 
 def supplier_orders_import_page(request):
-    return render(request, 'core/supplier_order/import.html')
+    job_id = request.GET.get('job', '')
+    return render(request, 'core/supplier_order/import.html', {'job_id': job_id if job_id.isdigit() else None})
 
 @csrf_exempt
 def fill_missing_prices(request):
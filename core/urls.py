@@ -11,6 +11,8 @@ urlpatterns = [
     path('supplier-orders/export/', supplier_orders_export, name='supplier_orders_export'),
     path('supplier-orders/import/', supplier_orders_import_page, name='supplier_orders_import_page'),
     path('supplier-orders/import/upload/', supplier_orders_import_upload, name='supplier_orders_import_upload'),
+    path('supplier-orders/import/jobs/<int:job_id>/', supplier_orders_import_job, name='supplier_orders_import_job'),
+    path('supplier-orders/import/jobs/<int:job_id>/events/', supplier_orders_import_job_events, name='supplier_orders_import_job_events'),
     path('supplier-orders/fill-prices/', fill_missing_prices, name='supplier_orders_fill_prices'),
     
     